@@ -0,0 +1,197 @@
+import json
+import os
+import re
+import threading
+import unicodedata
+from django.conf import settings
+
+GAZETTEER_PATH = os.path.join(os.path.dirname(__file__), 'data', 'ph_gazetteer.json')
+POSTAL_CODE_PATTERN = re.compile(r'^\d{4}$')
+DEFAULT_AUTOCOMPLETE_LIMIT = 10
+MAX_AUTOCOMPLETE_LIMIT = 50
+LEVELS = ('region', 'province', 'city')
+
+
+class AddressValidationError(ValueError):
+    pass
+
+
+def normalize_name(value):
+    """Case-, accent- and punctuation-insensitive form used for every lookup ("Parañaque" == "paranaque")."""
+    value = unicodedata.normalize('NFKD', value or '')
+    value = ''.join(c for c in value if not unicodedata.combining(c))
+    return ' '.join(re.sub(r'[^0-9a-z]+', ' ', value.lower()).split())
+
+
+class PrefixTrie:
+    """
+    Character trie mapping name prefixes to entries. Each node keeps the entries whose
+    names start with its prefix, so a lookup is a walk down the prefix and never a
+    subtree search.
+    """
+
+    __slots__ = ('root',)
+
+    def __init__(self):
+        self.root = {}
+
+    def insert(self, key, entry):
+        node = self.root
+        for char in key:
+            node = node.setdefault(char, {})
+            matches = node.setdefault('', [])
+            if not any(match is entry for match in matches):
+                matches.append(entry)
+
+    def search(self, prefix):
+        node = self.root
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return []
+        return node.get('', [])
+
+
+class Gazetteer:
+    def __init__(self, data):
+        self.regions = []
+        self._regions_by_key = {}
+        self._provinces_by_key = {}
+        self._cities_by_key = {}
+        self.trie = PrefixTrie()
+
+        for region in data['regions']:
+            region_entry = {'level': 'region', 'name': region['name'], 'code': region['code'], 'provinces': []}
+            self.regions.append(region_entry)
+            self._add(region_entry, [region['name'], region['code'], f"Region {region['code']}", *region['aliases']],
+                      self._regions_by_key, None)
+            for province in region['provinces']:
+                province_entry = {
+                    'level': 'province', 'name': province['name'], 'region': region['name'],
+                    'former_regions': province.get('former_regions', []), 'cities': [],
+                }
+                region_entry['provinces'].append(province_entry)
+                self._add(province_entry, [province['name'], *province.get('aliases', [])],
+                          self._provinces_by_key, None)
+                for city in province['cities']:
+                    city_entry = {
+                        'level': 'city', 'name': city, 'province': province['name'], 'region': region['name'],
+                    }
+                    province_entry['cities'].append(city_entry)
+                    self._add(city_entry, self._city_aliases(city), self._cities_by_key, province['name'])
+
+        self._regions_by_code = {region['code']: region for region in self.regions}
+        for entries in (self._regions_by_key, self._provinces_by_key, self._cities_by_key):
+            for key, entry in entries.items():
+                # Index every word start too, so "fernando" finds "San Fernando".
+                name = key[1] if isinstance(key, tuple) else key
+                words = name.split(' ')
+                for i in range(len(words)):
+                    self.trie.insert(' '.join(words[i:]), entry)
+
+    @staticmethod
+    def _city_aliases(city):
+        base = city[:-len(' City')] if city.endswith(' City') else city
+        return [city, base, f"{base} City", f"City of {base}"]
+
+    @staticmethod
+    def _add(entry, names, index, scope):
+        for name in names:
+            key = normalize_name(name)
+            index.setdefault((scope, key) if scope is not None else key, entry)
+
+    def find_region(self, value):
+        return self._regions_by_key.get(normalize_name(value))
+
+    def find_province(self, value):
+        return self._provinces_by_key.get(normalize_name(value))
+
+    def find_city(self, province, value):
+        return self._cities_by_key.get((province, normalize_name(value)))
+
+    def autocomplete(self, query, level=None, region=None, province=None, limit=DEFAULT_AUTOCOMPLETE_LIMIT):
+        """Names starting with `query` (at any word), optionally limited to one level and parent."""
+        region_entry = self.find_region(region) if region else None
+        province_entry = self.find_province(province) if province else None
+        results = []
+        for entry in self.trie.search(normalize_name(query)):
+            if level and entry['level'] != level:
+                continue
+            if region_entry and entry.get('region') != region_entry['name']:
+                continue
+            if province_entry and entry.get('province') != province_entry['name']:
+                continue
+            results.append(_public(entry))
+            if len(results) >= limit:
+                break
+        return results
+
+    def provinces(self, region):
+        region_entry = self.find_region(region)
+        return [_public(province) for province in region_entry['provinces']] if region_entry else None
+
+    def cities(self, province):
+        province_entry = self.find_province(province)
+        return [_public(city) for city in province_entry['cities']] if province_entry else None
+
+    def normalize_address(self, region, province, city, postal_code):
+        """
+        Returns canonical region, province, city and postal code for an address, or raises
+        AddressValidationError. Region and province must be known and consistent. Cities the
+        bundled data doesn't list (municipalities) are kept as typed unless
+        ADDRESS_STRICT_VALIDATION is on.
+        """
+        region_entry = self.find_region(region)
+        if region_entry is None:
+            raise AddressValidationError(f"Unknown region '{region}'")
+        province_entry = self.find_province(province)
+        if province_entry is None:
+            raise AddressValidationError(f"Unknown province '{province}'")
+        former_region_names = [
+            self._regions_by_code[code]['name'] for code in province_entry['former_regions']
+        ]
+        if province_entry['region'] != region_entry['name']:
+            if region_entry['name'] not in former_region_names:
+                raise AddressValidationError(f"{province_entry['name']} is not in {region_entry['name']}")
+            # Clients still using the province's former region keep validating; store the current one.
+            region_entry = self.find_region(province_entry['region'])
+
+        city_entry = self.find_city(province_entry['name'], city)
+        if city_entry is not None:
+            city_name = city_entry['name']
+        elif getattr(settings, 'ADDRESS_STRICT_VALIDATION', False):
+            raise AddressValidationError(f"Unknown city or municipality '{city}' in {province_entry['name']}")
+        else:
+            city_name = ' '.join((city or '').split())
+            if not city_name:
+                raise AddressValidationError("City or municipality is required")
+
+        postal_code = (postal_code or '').strip()
+        if not POSTAL_CODE_PATTERN.match(postal_code):
+            raise AddressValidationError("Postal code must be 4 digits")
+
+        return {
+            'region': region_entry['name'],
+            'province': province_entry['name'],
+            'city': city_name,
+            'postal_code': postal_code,
+        }
+
+
+def _public(entry):
+    return {key: entry[key] for key in ('level', 'name', 'code', 'region', 'province') if key in entry}
+
+
+_gazetteer = None
+_gazetteer_lock = threading.Lock()
+
+
+def get_gazetteer():
+    """Loads the bundled gazetteer once per process."""
+    global _gazetteer
+    if _gazetteer is None:
+        with _gazetteer_lock:
+            if _gazetteer is None:
+                with open(GAZETTEER_PATH, encoding='utf-8') as f:
+                    _gazetteer = Gazetteer(json.load(f))
+    return _gazetteer
@@ -2,16 +2,168 @@ from django.contrib import admin
 from .models import *
 
 # Register your models here.
- 
-admin.site.register(CustomUser)
-admin.site.register(CustomerDesign)
-admin.site.register(Category)
-admin.site.register(Product)
-admin.site.register(Order)
-admin.site.register(OrderItem)
-admin.site.register(Cart)
-admin.site.register(CartItem)
-admin.site.register(Payment)
-admin.site.register(ShippingAddress)
-admin.site.register(Review)
-admin.site.register(CustomerAddress)
\ No newline at end of file
+
+
+class BaseAdmin(admin.ModelAdmin):
+    # Skips the unfiltered COUNT(*) the changelist runs next to the filtered one.
+    show_full_result_count = False
+    list_per_page = 50
+
+
+@admin.register(CustomUser)
+class CustomUserAdmin(BaseAdmin):
+    list_display = ('email', 'username', 'first_name', 'last_name', 'is_staff', 'date_joined')
+    list_filter = ('is_staff', 'is_active')
+    search_fields = ('=id', '^email', '^username')
+    ordering = ('-date_joined',)
+
+
+@admin.register(CustomerDesign)
+class CustomerDesignAdmin(BaseAdmin):
+    list_display = ('id', 'user', 'design_description', 'material', 'status', 'final_price', 'updated_at')
+    list_filter = ('status', 'material')
+    list_select_related = ('user',)
+    raw_id_fields = ('user', 'generation')
+    search_fields = ('=id', '=user__email')
+
+
+@admin.register(Category)
+class CategoryAdmin(BaseAdmin):
+    list_display = ('name', 'updated_at')
+    search_fields = ('^name',)
+
+
+@admin.register(Product)
+class ProductAdmin(BaseAdmin):
+    list_display = ('name', 'category', 'price', 'stock', 'purchase_count', 'featured')
+    list_filter = ('featured', 'category')
+    list_select_related = ('category',)
+    autocomplete_fields = ('category',)
+    search_fields = ('=id', '^name')
+
+
+class OrderItemInline(admin.TabularInline):
+    model = OrderItem
+    extra = 0
+    fields = ('item_name', 'is_custom_design', 'item_material', 'quantity', 'price', 'product', 'customer_design')
+    raw_id_fields = ('product', 'customer_design')
+
+
+@admin.register(Order)
+class OrderAdmin(BaseAdmin):
+    list_display = ('id', 'user', 'status', 'total_price', 'currency', 'payment_method', 'created_at')
+    list_filter = ('status', 'payment_method', 'currency')
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
+    search_fields = ('=id', '=user__email')
+    date_hierarchy = 'created_at'
+    inlines = (OrderItemInline,)
+
+
+@admin.register(OrderItem)
+class OrderItemAdmin(BaseAdmin):
+    list_display = ('id', 'order', 'item_name', 'is_custom_design', 'quantity', 'price')
+    list_filter = ('is_custom_design',)
+    list_select_related = ('order',)
+    raw_id_fields = ('order', 'product', 'customer_design')
+    search_fields = ('=id', '=order__id')
+
+
+@admin.register(Cart)
+class CartAdmin(BaseAdmin):
+    list_display = ('id', 'user', 'created_at')
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
+    search_fields = ('=id', '=user__email')
+
+
+@admin.register(CartItem)
+class CartItemAdmin(BaseAdmin):
+    list_display = ('id', 'cart', 'product', 'customer_design', 'quantity')
+    list_select_related = ('cart__user', 'product', 'customer_design__user')
+    raw_id_fields = ('cart', 'product', 'customer_design')
+    search_fields = ('=id', '=cart__user__email')
+
+
+@admin.register(Payment)
+class PaymentAdmin(BaseAdmin):
+    list_display = ('id', 'order', 'payment_method', 'payment_status', 'transaction_id', 'created_at')
+    list_filter = ('payment_status', 'payment_method')
+    list_select_related = ('order',)
+    raw_id_fields = ('order',)
+    search_fields = ('=id', '=order__id', '=transaction_id')
+
+
+@admin.register(ShippingAddress)
+class ShippingAddressAdmin(BaseAdmin):
+    list_display = ('id', 'order', 'user', 'city', 'state', 'country')
+    list_filter = ('country',)
+    list_select_related = ('order', 'user')
+    raw_id_fields = ('user', 'order')
+    search_fields = ('=id', '=order__id', '=user__email')
+
+
+@admin.register(Review)
+class ReviewAdmin(BaseAdmin):
+    list_display = ('id', 'product', 'user', 'rating', 'created_at')
+    list_filter = ('rating',)
+    list_select_related = ('product', 'user')
+    raw_id_fields = ('user',)
+    autocomplete_fields = ('product',)
+    search_fields = ('=id', '=user__email')
+
+
+@admin.register(CustomerAddress)
+class CustomerAddressAdmin(BaseAdmin):
+    list_display = ('id', 'user', 'customer_name', 'region', 'province', 'city', 'is_default')
+    list_filter = ('is_default', 'region')
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
+    search_fields = ('=id', '=user__email')
+
+
+@admin.register(MaterialMultiplier)
+class MaterialMultiplierAdmin(BaseAdmin):
+    list_display = ('material', 'multiplier', 'updated_at')
+    search_fields = ('^material',)
+
+
+@admin.register(GenerationTask)
+class GenerationTaskAdmin(BaseAdmin):
+    list_display = ('id', 'generation_type', 'task_id', 'status', 'updated_at')
+    list_filter = ('status', 'generation_type')
+    search_fields = ('=id', '=task_id', '=prompt_hash')
+
+
+@admin.register(RateLimitBucket)
+class RateLimitBucketAdmin(BaseAdmin):
+    list_display = ('name', 'tokens', 'refilled_at', 'blocked_until')
+
+
+@admin.register(DailySalesRollup)
+class DailySalesRollupAdmin(BaseAdmin):
+    list_display = ('day', 'currency', 'payment_method', 'orders', 'units', 'revenue')
+    list_filter = ('currency', 'payment_method')
+    date_hierarchy = 'day'
+
+
+@admin.register(DailyProductSalesRollup)
+class DailyProductSalesRollupAdmin(BaseAdmin):
+    list_display = ('day', 'currency', 'product_name', 'category_name', 'is_custom_design', 'units', 'revenue')
+    list_filter = ('currency', 'is_custom_design')
+    raw_id_fields = ('product', 'category')
+    date_hierarchy = 'day'
+
+
+@admin.register(StaleRollupDay)
+class StaleRollupDayAdmin(BaseAdmin):
+    list_display = ('day', 'marked_at')
+
+
+@admin.register(OrderStatusHistory)
+class OrderStatusHistoryAdmin(BaseAdmin):
+    list_display = ('id', 'order', 'from_status', 'to_status', 'changed_by', 'created_at')
+    list_filter = ('to_status',)
+    list_select_related = ('order', 'changed_by')
+    raw_id_fields = ('order', 'changed_by')
+    search_fields = ('=order__id',)
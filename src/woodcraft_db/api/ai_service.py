@@ -1,31 +1,302 @@
-import requests 
 import os
-import time
+import re
+import hashlib
 import logging
-from dotenv import load_dotenv
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from . import http_client
+from .mirroring import schedule_mirror
+from .models import CustomerDesign, GenerationTask
+from .rate_limit import block, take_token, token_wait
+from .tracing import span
 
-load_dotenv()
 logger = logging.getLogger(__name__)
 
+TRIPO_TASK_URL = f"{settings.TRIPO_API_BASE}/task"
+TRIPO_RATE_LIMIT_BUCKET = 'tripo'
+
+# A finished generation is reused for identical prompts for this long.
+GENERATION_CACHE_TTL = timedelta(hours=24)
+# An unfinished generation older than this is assumed lost and may be resubmitted.
+GENERATION_INFLIGHT_TIMEOUT = timedelta(minutes=10)
+
+TRIPO_FAILED_STATUSES = {'failed', 'banned', 'expired', 'cancelled', 'unknown'}
+
+
+def generation_cache_key(generation_type, prompt, preview_task_id=None):
+    """Hashes a normalized prompt so that trivially different submissions share a generation."""
+    normalized = re.sub(r'\s+', ' ', prompt).strip().lower()
+    normalized = re.sub(r'(\d+)\.0+(?!\d)', r'\1', normalized)
+    key = f"{generation_type}|{preview_task_id or ''}|{normalized}"
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def _generation_result(generation, cached):
+    return {
+        'task_id': generation.task_id,
+        'generation_id': generation.prompt_hash,
+        'model_url': generation.model_url,
+        'thumbnail_url': generation.thumbnail_url,
+        'cached': cached,
+    }
+
+
+def _queued_result(generation, wait=None):
+    return {
+        'task_id': None,
+        'queued': True,
+        'generation_id': generation.prompt_hash,
+        'estimated_wait': int(estimate_queue_wait(generation, wait)),
+    }
+
+
+def _rate_per_second():
+    return settings.TRIPO_RATE_LIMIT_PER_MINUTE / 60
+
+
+def _seconds_per_slot():
+    """Average time between generation slots freeing up once the limiter is saturated."""
+    return max(
+        1 / _rate_per_second(),
+        settings.TRIPO_AVERAGE_GENERATION_SECONDS / settings.TRIPO_MAX_IN_FLIGHT,
+    )
+
+
+def estimate_queue_wait(generation, wait=None):
+    """Estimated seconds until a queued generation is submitted to Tripo."""
+    if wait is None:
+        wait = token_wait(TRIPO_RATE_LIMIT_BUCKET, _rate_per_second(), settings.TRIPO_RATE_LIMIT_BURST)
+    ahead = GenerationTask.objects.filter(status='queued', created_at__lt=generation.created_at).count()
+    return wait + ahead * _seconds_per_slot()
+
+
+def _in_flight_count(exclude_pk):
+    return GenerationTask.objects.filter(
+        status__in=('pending', 'running'),
+        updated_at__gte=timezone.now() - GENERATION_INFLIGHT_TIMEOUT,
+    ).exclude(pk=exclude_pk).count()
+
+
+def _admit(generation, respect_queue):
+    """
+    Returns 0 if the generation may be submitted now, otherwise the estimated wait in seconds.
+    New requests also wait behind anything already queued so the queue stays first come, first served.
+    """
+    def admit():
+        if respect_queue and GenerationTask.objects.filter(status='queued').exclude(pk=generation.pk).exists():
+            return _seconds_per_slot()
+        if _in_flight_count(generation.pk) >= settings.TRIPO_MAX_IN_FLIGHT:
+            return _seconds_per_slot()
+        return 0
+
+    return take_token(
+        TRIPO_RATE_LIMIT_BUCKET,
+        _rate_per_second(),
+        settings.TRIPO_RATE_LIMIT_BURST,
+        admit=admit,
+    )
+
+
+def _tripo_open_for():
+    """Seconds until Tripo's circuit breaker lets a call through; 0 while it is closed."""
+    return http_client.breaker_open_for(TRIPO_TASK_URL)
+
+
+def _enqueue(generation, wait):
+    generation.status = 'queued'
+    generation.save(update_fields=['status', 'updated_at'])
+    logger.info(f"Queued generation {generation.prompt_hash[:12]}, estimated wait {int(wait)}s")
+    return _queued_result(generation, wait)
+
+
+def _claim_generation(prompt_hash, prompt, generation_type, preview_task_id=None):
+    """
+    Returns (generation, claimed). When claimed is True the caller must submit the task
+    to Tripo; otherwise the generation is either finished or being handled elsewhere.
+    """
+    generation, created = GenerationTask.objects.get_or_create(
+        prompt_hash=prompt_hash,
+        defaults={'prompt': prompt, 'generation_type': generation_type, 'preview_task_id': preview_task_id},
+    )
+    if created:
+        return generation, True
+
+    now = timezone.now()
+    if generation.status == 'success' and now - generation.updated_at < GENERATION_CACHE_TTL:
+        return generation, False
+    if generation.status == 'queued':
+        return generation, False
+    if generation.status in ('pending', 'running') and now - generation.updated_at < GENERATION_INFLIGHT_TIMEOUT:
+        return generation, False
+
+    # Failed, expired or stale: take it over, unless another worker beats us to it.
+    claimed = GenerationTask.objects.filter(
+        pk=generation.pk, updated_at=generation.updated_at
+    ).update(status='pending', task_id=None, model_url=None, thumbnail_url=None, updated_at=now)
+    generation.refresh_from_db()
+    return generation, bool(claimed)
+
+
+def _join_generation(generation):
+    """
+    Reports a generation another request is handling without waiting on it; the client polls
+    generation_status and the workers finish designs saved against it.
+    """
+    if generation.status == 'failed':
+        return None
+    if generation.task_id:
+        return _generation_result(generation, cached=True)
+    # The first request has not received its task_id yet; report it like a queued generation.
+    return _queued_result(generation, wait=0)
+
+
+def _record_task_status(task_id, status, model_url=None, thumbnail_url=None):
+    if status == 'success':
+        GenerationTask.objects.filter(task_id=task_id).update(
+            status='success', model_url=model_url, thumbnail_url=thumbnail_url, updated_at=timezone.now()
+        )
+        _complete_pending_designs(task_id, model_url, thumbnail_url)
+    elif status in TRIPO_FAILED_STATUSES:
+        GenerationTask.objects.filter(task_id=task_id).update(status='failed', updated_at=timezone.now())
+        _fail_pending_designs(generation__task_id=task_id)
+
+
+def _fail_pending_designs(**generation_filter):
+    """Moves designs still waiting on a generation that failed out of 'generating'."""
+    failed = CustomerDesign.objects.filter(status='generating', **generation_filter).update(
+        status='generation_failed', updated_at=timezone.now()
+    )
+    if failed:
+        logger.warning(f"Marked {failed} design(s) as failed after their generation failed")
+    return failed
+
+
+def _complete_pending_designs(task_id, model_url, thumbnail_url):
+    """Attaches a finished model to designs saved while their generation was still pending."""
+    design_ids = list(CustomerDesign.objects.filter(
+        generation__task_id=task_id, status='generating'
+    ).values_list('id', flat=True))
+    if not design_ids:
+        return 0
+    completed = CustomerDesign.objects.filter(id__in=design_ids, status='generating').update(
+        model_url=model_url, model_image=thumbnail_url, status='pending', updated_at=timezone.now()
+    )
+    for design_id in design_ids:
+        schedule_mirror(design_id)
+    return completed
+
+
+def settle_new_design(design):
+    """
+    Re-reads the generation of a design just saved as 'generating', holding its row lock until the
+    caller's transaction commits. A generation that finished between the caller reading it and saving
+    the design only updated the designs it could see, so this design is completed or failed here.
+    """
+    generation = GenerationTask.objects.select_for_update().get(pk=design.generation_id)
+    if generation.status == 'success':
+        _complete_pending_designs(generation.task_id, generation.model_url, generation.thumbnail_url)
+    elif generation.status == 'failed':
+        _fail_pending_designs(generation=generation)
+
+
+def settle_finished_designs():
+    """Catches up designs still 'generating' although their generation has already succeeded or failed."""
+    finished = GenerationTask.objects.filter(status='success', designs__status='generating').distinct()
+    settled = 0
+    for generation in finished:
+        settled += _complete_pending_designs(generation.task_id, generation.model_url, generation.thumbnail_url)
+    settled += _fail_pending_designs(generation__status='failed')
+    return settled
+
+
+def _submit_generation(generation):
+    """
+    Submits a claimed generation to Tripo once. A 503 pauses the shared limiter and puts the
+    generation back in the queue instead of retrying from the request thread.
+    """
+    import requests
+
+    API_KEY = os.getenv('API_KEY')
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {API_KEY}"
+    }
+    payload = {
+        "type": generation.generation_type,
+        "prompt": generation.prompt,
+    }
+    if generation.generation_type == 'refine':
+        payload["preview_task_id"] = generation.preview_task_id
+
+    try:
+        with span('tripo.create_task', generation_type=generation.generation_type):
+            response = http_client.post(
+                TRIPO_TASK_URL, headers=headers, json=payload,
+                timeout=(settings.HTTP_CONNECT_TIMEOUT, settings.TRIPO_SUBMIT_TIMEOUT),
+            )
+            response.raise_for_status()
+
+        response_data = response.json()
+
+        task_id = response_data.get('data', {}).get('task_id')
+
+        if not task_id:
+            logger.error("No task ID in response")
+        else:
+            generation.task_id = task_id
+            generation.status = 'running'
+            generation.save(update_fields=['task_id', 'status', 'updated_at'])
+            return _generation_result(generation, cached=False)
+
+    except requests.exceptions.HTTPError as e:
+        if e.response.status_code == 503:
+            cooldown = settings.TRIPO_UNAVAILABLE_COOLDOWN
+            logger.warning(f"Tripo unavailable, pausing submissions for {cooldown}s")
+            block(TRIPO_RATE_LIMIT_BUCKET, cooldown, settings.TRIPO_RATE_LIMIT_BURST)
+            return _enqueue(generation, cooldown)
+        if e.response.status_code >= 500:
+            logger.warning(f"Tripo error {e.response.status_code}, queueing generation for later")
+            return _enqueue(generation, settings.TRIPO_UNAVAILABLE_COOLDOWN)
+        logger.error(f"HTTP error: {str(e)}")
+    except (requests.exceptions.ConnectionError, requests.exceptions.Timeout, http_client.CircuitOpenError) as e:
+        # Tripo is slow or down: keep the generation and let the queue worker submit it later.
+        # A read timeout may mean Tripo did create the task; resubmitting costs one duplicate.
+        logger.warning(f"Tripo unreachable, queueing generation for later: {str(e)}")
+        return _enqueue(generation, max(_tripo_open_for(), settings.TRIPO_UNAVAILABLE_COOLDOWN))
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Request failed: {str(e)}")
+
+    generation.status = 'failed'
+    generation.save(update_fields=['status', 'updated_at'])
+    _fail_pending_designs(generation=generation)
+    return None
+
+
 def poll_task_status(task_id):
+    import requests
+
     API_KEY = os.getenv('API_KEY')
     if not API_KEY:
         logger.error("API_KEY environment variable not set")
         return None
 
-    url = f"https://api.tripo3d.ai/v2/openapi/task/{task_id}"
+    url = f"{TRIPO_TASK_URL}/{task_id}"
     headers = {"Authorization": f"Bearer {API_KEY}"}
 
     try:
-        response = requests.get(url, headers=headers, timeout=30)
-        response_data = response.json()
+        with span('tripo.get_task'):
+            response = http_client.get(url, headers=headers)
+            response_data = response.json()
         model_data = response_data.get('data', {})
         output = model_data.get('output', {})
-        return {
+        result = {
             'status': model_data.get('status'),
             'model_url': output.get('pbr_model'),
             'thumbnail_url': output.get('rendered_image'),
         }
+        _record_task_status(task_id, result['status'], result['model_url'], result['thumbnail_url'])
+        return result
 
     except requests.exceptions.RequestException as e:
             return None
@@ -33,69 +304,88 @@ def poll_task_status(task_id):
 
 def initiate_task_id(design_prompt, material, dimensions=None, generation_type='text_to_model', preview_task_id=None):
     API_KEY = os.getenv('API_KEY')
-    url = "https://api.tripo3d.ai/v2/openapi/task"
 
     if not API_KEY:
         logger.error("API_KEY environment variable not set")
         return None
-        
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {API_KEY}"
-    }
-    
-    # Determine payload based on mode
-    if generation_type == 'text_to_model':
+
+    # Determine prompt based on mode
+    if generation_type in ('text_to_model', 'refine'):
         # Prepare the prompt with material and dimensions if provided
         enhanced_prompt = f"A {material} wooden {design_prompt}"
         if dimensions:
-            enhanced_prompt += f" with dimensions: {dimensions.get('length', 0)}x{dimensions.get('width', 0)}x{dimensions.get('thickness', 0)} inches"
-        
-        payload = {
-            "type": generation_type,
-            "prompt": enhanced_prompt,
-        }
-    elif generation_type == 'refine':
-        enhanced_prompt = f"A {material} wooden {design_prompt}"
-        if dimensions:
-            enhanced_prompt += f" with dimensions: {dimensions.get('length', 0)}x{dimensions.get('width', 0)}x{dimensions.get('thickness', 0)} inches"
-        
-        payload = {
-            "type": "refine",
-            "preview_task_id": preview_task_id,
-            "prompt": enhanced_prompt,
-        }
+            enhanced_prompt += f" with dimensions: {dimensions.get('length', dimensions.get('height', 0))}x{dimensions.get('width', 0)}x{dimensions.get('thickness', 0)} inches"
     else:
         logger.error(f"Unsupported mode: {generation_type}")
         return None
 
-    for attempt in range(3):
-        try:
-            response = requests.post(url, headers=headers, json=payload, timeout=30)
-            response.raise_for_status()
-            
-            response_data = response.json()
+    prompt_hash = generation_cache_key(generation_type, enhanced_prompt, preview_task_id)
+    generation, claimed = _claim_generation(prompt_hash, enhanced_prompt, generation_type, preview_task_id)
+    if not claimed:
+        if generation.status == 'success':
+            logger.info(f"Reusing generation {generation.task_id} for identical prompt")
+            return _generation_result(generation, cached=True)
+        if generation.status == 'queued':
+            return _queued_result(generation)
+        logger.info(f"Joining in-flight generation {generation.task_id or prompt_hash[:12]}")
+        return _join_generation(generation)
 
-            task_id = response_data.get('data', {}).get('task_id')
-
-            if not task_id:
-                logger.error("No task ID in response")
-                return None
-            
-            return {
-                'task_id': task_id,
-            }
-
-        except requests.exceptions.HTTPError as e:
-            if e.response.status_code == 503:
-                logger.warning(f"Retrying... (attempt {attempt + 1}/3)")
-                time.sleep(10 * (attempt + 1))
-            else:
-                logger.error(f"HTTP error: {str(e)}")
-                return None
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Request failed: {str(e)}")
-            return None
+    open_for = _tripo_open_for()
+    if open_for:
+        # Tripo is known to be down; don't make the customer wait on it.
+        return _enqueue(generation, open_for)
+    wait = _admit(generation, respect_queue=True)
+    if wait:
+        return _enqueue(generation, wait)
+    return _submit_generation(generation)
 
-    return None
 
+def dispatch_queued_generations(limit=None):
+    """Submits queued generations, oldest first, for as long as the limiter admits them."""
+    dispatched = 0
+    while limit is None or dispatched < limit:
+        if _tripo_open_for():
+            break
+        generation = GenerationTask.objects.filter(status='queued').order_by('created_at').first()
+        if generation is None:
+            break
+        if not GenerationTask.objects.filter(pk=generation.pk, status='queued').update(
+            status='pending', updated_at=timezone.now()
+        ):
+            continue  # Another worker took it.
+        generation.refresh_from_db()
+
+        if _admit(generation, respect_queue=False):
+            GenerationTask.objects.filter(pk=generation.pk).update(status='queued')
+            break
+        result = _submit_generation(generation)
+        if result and result.get('queued'):
+            break  # Tripo pushed back; the generation is queued again.
+        dispatched += 1
+    return dispatched
+
+
+def refresh_pending_designs(limit=20):
+    """Polls Tripo for running generations that saved designs are still waiting on."""
+    task_ids = list(GenerationTask.objects.filter(
+        status='running', designs__status='generating'
+    ).values_list('task_id', flat=True).distinct()[:limit])
+    for task_id in task_ids:
+        poll_task_status(task_id)
+    return len(task_ids)
+
+
+def get_generation_status(generation_id):
+    generation = GenerationTask.objects.filter(prompt_hash=generation_id).first()
+    if generation is None:
+        return None
+    result = {
+        'generation_id': generation.prompt_hash,
+        'status': generation.status,
+        'task_id': generation.task_id,
+        'model_url': generation.model_url,
+        'thumbnail_url': generation.thumbnail_url,
+    }
+    if generation.status == 'queued':
+        result['estimated_wait'] = int(estimate_queue_wait(generation))
+    return result
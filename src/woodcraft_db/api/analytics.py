@@ -0,0 +1,149 @@
+import logging
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from django.db import connection, transaction
+from django.db.models import Case, CharField, Count, DecimalField, ExpressionWrapper, F, Sum, Value, When
+from django.db.models.functions import TruncDate, Upper
+from django.utils import timezone
+from .models import DailyProductSalesRollup, DailySalesRollup, Order, OrderItem, StaleRollupDay
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_BATCH_SIZE = 1000
+# Cancelled orders are not sales; they drop out of the rollups when their day is refreshed.
+EXCLUDED_ORDER_STATUSES = ('cancelled',)
+# First key of the two-key advisory locks that serialize rebuilds of a day; the second is the day's ordinal.
+ROLLUP_LOCK_NAMESPACE = 7301
+
+
+def order_day(order):
+    return timezone.localtime(order.created_at).date()
+
+
+def _day_bounds(start, end):
+    tz = timezone.get_current_timezone()
+    return (
+        timezone.make_aware(datetime.combine(start, time.min), tz),
+        timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min), tz),
+    )
+
+
+def _sales_rows(orders, items):
+    totals = defaultdict(lambda: {'orders': 0, 'units': 0, 'revenue': Decimal('0')})
+    for row in orders.values('day', 'currency_code', 'payment_method').annotate(
+        order_count=Count('id'), revenue=Sum('total_price'),
+    ):
+        key = (row['day'], row['currency_code'], row['payment_method'])
+        totals[key]['orders'] = row['order_count']
+        totals[key]['revenue'] = row['revenue'] or Decimal('0')
+    for row in items.values('day', 'currency_code', 'order__payment_method').annotate(units=Sum('quantity')):
+        key = (row['day'], row['currency_code'], row['order__payment_method'])
+        totals[key]['units'] = row['units'] or 0
+
+    return [
+        DailySalesRollup(day=day, currency=currency, payment_method=payment_method, **values)
+        for (day, currency, payment_method), values in totals.items()
+    ]
+
+
+def _product_rows(items):
+    """
+    Groups lines by their purchase-time snapshot, so products deleted or renamed since are still
+    counted under the name they were sold as. Custom designs share one row per day.
+    """
+    line_total = ExpressionWrapper(F('quantity') * F('price'), output_field=DecimalField(max_digits=14, decimal_places=2))
+    line_name = Case(When(is_custom_design=True, then=Value('')), default=F('item_name'), output_field=CharField())
+    rows = items.annotate(line_name=line_name).values(
+        'day', 'currency_code', 'is_custom_design', 'product_id', 'line_name',
+        'product__category_id', 'product__category__name',
+    ).annotate(
+        order_count=Count('order_id', distinct=True), units=Sum('quantity'), revenue=Sum(line_total),
+    )
+    return [
+        DailyProductSalesRollup(
+            day=row['day'],
+            currency=row['currency_code'],
+            product_id=row['product_id'],
+            product_name=row['line_name'] or '',
+            category_id=row['product__category_id'],
+            category_name=row['product__category__name'] or '',
+            is_custom_design=row['is_custom_design'],
+            orders=row['order_count'],
+            units=row['units'] or 0,
+            revenue=row['revenue'] or Decimal('0'),
+        )
+        for row in rows
+    ]
+
+
+def _lock_days(start, end):
+    """
+    Serializes rebuilds of the same day across workers until the transaction ends, so two
+    rebuilds cannot interleave their delete and insert. Days are locked in order to avoid deadlocks.
+    """
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        for ordinal in range(start.toordinal(), end.toordinal() + 1):
+            cursor.execute('SELECT pg_advisory_xact_lock(%s, %s)', [ROLLUP_LOCK_NAMESPACE, ordinal])
+
+
+def rebuild_rollups(start, end):
+    """
+    Recomputes every rollup row for the days start..end (inclusive) from Order and OrderItem.
+    Rebuilding whole days keeps the rollups idempotent under retries and status changes.
+    """
+    start_at, end_at = _day_bounds(start, end)
+    orders = Order.objects.filter(created_at__gte=start_at, created_at__lt=end_at).exclude(
+        status__in=EXCLUDED_ORDER_STATUSES
+    ).annotate(day=TruncDate('created_at'), currency_code=Upper('currency')).order_by()
+    items = OrderItem.objects.filter(
+        order__created_at__gte=start_at, order__created_at__lt=end_at
+    ).exclude(
+        order__status__in=EXCLUDED_ORDER_STATUSES
+    ).annotate(day=TruncDate('order__created_at'), currency_code=Upper('order__currency')).order_by()
+
+    with transaction.atomic():
+        # Aggregate under the lock, so a rebuild that waited sees the orders committed before it ran.
+        _lock_days(start, end)
+        sales_rows = _sales_rows(orders, items)
+        product_rows = _product_rows(items)
+        DailySalesRollup.objects.filter(day__gte=start, day__lte=end).delete()
+        DailyProductSalesRollup.objects.filter(day__gte=start, day__lte=end).delete()
+        DailySalesRollup.objects.bulk_create(sales_rows, batch_size=ROLLUP_BATCH_SIZE)
+        DailyProductSalesRollup.objects.bulk_create(product_rows, batch_size=ROLLUP_BATCH_SIZE)
+    return len(sales_rows), len(product_rows)
+
+
+def mark_rollups_stale(days):
+    """
+    Records days whose rollups need rebuilding. The mark is written in the caller's transaction,
+    so it commits with the order change; refresh_stale_rollups() rebuilds the days off the request path.
+    """
+    days = set(days)
+    if days:
+        StaleRollupDay.objects.bulk_create([StaleRollupDay(day=day) for day in days], ignore_conflicts=True)
+
+
+def refresh_stale_rollups(limit=None):
+    """Rebuilds the days marked stale, oldest mark first. Returns the number of days rebuilt."""
+    days = StaleRollupDay.objects.order_by('marked_at').values_list('day', flat=True)
+    if limit is not None:
+        days = days[:limit]
+
+    refreshed = 0
+    for day in list(days):
+        # Claim the day by removing its mark before rebuilding; an order that changes during the
+        # rebuild marks the day again, so it is never left stale.
+        deleted, _ = StaleRollupDay.objects.filter(day=day).delete()
+        if not deleted:
+            continue  # Another worker took it.
+        try:
+            rebuild_rollups(day, day)
+        except Exception:
+            logger.exception(f"Failed to refresh sales rollups for {day}")
+            mark_rollups_stale([day])
+            continue
+        refreshed += 1
+    return refreshed
@@ -0,0 +1,49 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+USER_CACHE_TIMEOUT = 15 * 60
+# What the request path reads from request.user. The password hash is never cached; other
+# fields stay deferred and are loaded from the database only if a view reads them.
+CACHED_USER_FIELDS = ('id', 'email', 'username', 'first_name', 'last_name', 'is_active', 'is_staff', 'is_superuser')
+
+
+def user_cache_key(user_id):
+    return f'auth_user:v2:{user_id}'
+
+
+def invalidate_cached_user(user_id):
+    cache.delete(user_cache_key(user_id))
+
+
+def _user_projection(user):
+    projection = {field: getattr(user, field) for field in CACHED_USER_FIELDS}
+    projection['session_auth_hash'] = user.get_session_auth_hash()
+    return projection
+
+
+def _user_from_projection(projection):
+    UserModel = get_user_model()
+    field_names = [field.attname for field in UserModel._meta.concrete_fields if field.attname in CACHED_USER_FIELDS]
+    user = UserModel.from_db('default', field_names, [projection[name] for name in field_names])
+    user.cached_session_auth_hash = projection['session_auth_hash']
+    return user
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend that keeps a projection of the user loaded for each authenticated request in
+    the cache, so a request with a cached session needs no query to identify its user.
+    Entries are dropped whenever the user is saved or deleted (see api.signals).
+    """
+
+    def get_user(self, user_id):
+        key = user_cache_key(user_id)
+        projection = cache.get(key)
+        if projection is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, _user_projection(user), USER_CACHE_TIMEOUT)
+            return user
+        user = _user_from_projection(projection)
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,107 @@
+import json
+import logging
+import time
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from ninja.responses import NinjaJSONEncoder
+from .compression import AVAILABLE_ENCODINGS, compress, negotiate_encoding
+from .models import Product
+from .schemas import ProductSchema
+
+logger = logging.getLogger(__name__)
+
+CATALOG_VERSION_KEY = 'catalog:version'
+CATALOG_SNAPSHOT_KEY = 'catalog:snapshot:{version}'
+CATALOG_SNAPSHOT_TTL = 24 * 60 * 60
+
+# The last snapshot this process used, so a hit costs one cache read for the version.
+_process_snapshot = {}
+
+
+def catalog_version():
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        version = int(time.time() * 1000)
+        if not cache.add(CATALOG_VERSION_KEY, version, None):
+            version = cache.get(CATALOG_VERSION_KEY, version)
+    return version
+
+
+def bump_catalog_version():
+    """Moves the catalog to a new version; the next /get_products request rebuilds the snapshot."""
+    version = max(int(time.time() * 1000), (cache.get(CATALOG_VERSION_KEY) or 0) + 1)
+    cache.set(CATALOG_VERSION_KEY, version, None)
+
+
+def schedule_catalog_bump():
+    # After commit, so a snapshot built under the new version can only see committed data.
+    transaction.on_commit(bump_catalog_version)
+
+
+def catalog_etag(version, encoding=None):
+    """A strong ETag per encoded variant, since each variant's bytes differ."""
+    return f'"catalog-{version}-{encoding}"' if encoding else f'"catalog-{version}"'
+
+
+def build_catalog_snapshot(version):
+    """Serializes the catalog once and returns its JSON bytes with every available compressed variant."""
+    products = list(Product.objects.select_related('category'))
+    best_seller_id = Product.objects.order_by('-purchase_count').values_list('id', flat=True).first()
+    for product in products:
+        product.best_seller_id = best_seller_id
+    data = [ProductSchema.from_orm(product).model_dump() for product in products]
+    body = json.dumps(data, cls=NinjaJSONEncoder).encode('utf-8')
+    snapshot = {
+        'version': version,
+        'identity': body,
+    }
+    for encoding in AVAILABLE_ENCODINGS:
+        snapshot[encoding] = compress(body, encoding)
+    logger.info(f"Built catalog snapshot {version}: {len(products)} products, {len(body)} bytes")
+    return snapshot
+
+
+def get_catalog_snapshot():
+    version = catalog_version()
+    snapshot = _process_snapshot.get('current')
+    if snapshot is not None and snapshot['version'] == version:
+        return snapshot
+    key = CATALOG_SNAPSHOT_KEY.format(version=version)
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = build_catalog_snapshot(version)
+        cache.set(key, snapshot, CATALOG_SNAPSHOT_TTL)
+    _process_snapshot['current'] = snapshot
+    return snapshot
+
+
+def catalog_products():
+    """The snapshot's products keyed by id, parsed once per process and catalog version."""
+    snapshot = get_catalog_snapshot()
+    index = _process_snapshot.get('products')
+    if index is None or index[0] != snapshot['version']:
+        products = {product['id']: product for product in json.loads(snapshot['identity'])}
+        index = (snapshot['version'], products)
+        _process_snapshot['products'] = index
+    return index[1]
+
+
+def catalog_response(request):
+    """Writes the pre-serialized catalog bytes straight into the response, honouring If-None-Match."""
+    snapshot = get_catalog_snapshot()
+    encoding = negotiate_encoding(request.headers.get('Accept-Encoding'))
+    etag = catalog_etag(snapshot['version'], encoding)
+    etags = parse_etags(request.headers.get('If-None-Match', ''))
+    if etag in etags or '*' in etags:
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(snapshot[encoding or 'identity'], content_type='application/json')
+        if encoding:
+            response['Content-Encoding'] = encoding
+    response['ETag'] = etag
+    response['Cache-Control'] = 'no-cache'
+    patch_vary_headers(response, ['Accept-Encoding'])
+    return response
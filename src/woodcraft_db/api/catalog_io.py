@@ -0,0 +1,322 @@
+import csv
+import io
+import json
+import logging
+import os
+import zipfile
+from decimal import Decimal, InvalidOperation
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+from .catalog import schedule_catalog_bump
+from .models import Category, Product
+
+logger = logging.getLogger(__name__)
+
+IMPORT_CHUNK_SIZE = 500
+EXPORT_CHUNK_SIZE = 500
+IMPORT_FORMATS = ('csv', 'json', 'ndjson')
+PRODUCT_FIELDS = ['id', 'name', 'description', 'price', 'stock', 'featured', 'default_material', 'category_id',
+                  'category', 'image']
+UPDATE_FIELDS = ['name', 'description', 'price', 'stock', 'featured', 'default_material', 'category', 'image',
+                 'updated_at']
+TRUE_VALUES = {'true', '1', 'yes', 'y'}
+FALSE_VALUES = {'false', '0', 'no', 'n', ''}
+
+
+def detect_format(filename, default='csv'):
+    extension = os.path.splitext(filename or '')[1].lower().lstrip('.')
+    if extension == 'jsonl':
+        return 'ndjson'
+    return extension if extension in IMPORT_FORMATS else default
+
+
+def iter_rows(stream, file_format):
+    """
+    Yields one dict per product without reading the whole upload into memory. CSV and
+    NDJSON are parsed line by line; a JSON array has to be decoded in one piece.
+    """
+    if file_format == 'csv':
+        yield from csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+    elif file_format == 'ndjson':
+        for line in io.TextIOWrapper(stream, encoding='utf-8'):
+            if line.strip():
+                yield json.loads(line)
+    elif file_format == 'json':
+        rows = json.load(stream)
+        if not isinstance(rows, list):
+            raise ValueError("JSON import must be an array of products")
+        yield from rows
+    else:
+        raise ValueError(f"Unsupported format '{file_format}'")
+
+
+def _is_blank(value):
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def _parse_bool(value):
+    if isinstance(value, bool):
+        return value
+    text = str(value or '').strip().lower()
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    raise ValueError(f"invalid boolean '{value}'")
+
+
+class ProductImporter:
+    """
+    Validates product rows and writes them in chunks: new rows with bulk_create, rows with
+    an id with bulk_update. Every row gets an entry in the report, and a bad row never
+    stops the rest of the import.
+    """
+
+    def __init__(self, images=None, dry_run=False):
+        self.dry_run = dry_run
+        self.report = []
+        self.summary = {'created': 0, 'updated': 0, 'errors': 0}
+        self.images = {}
+        self.archive = None
+        if images is not None:
+            self.archive = zipfile.ZipFile(images)
+            self.images = {
+                os.path.basename(info.filename): info
+                for info in self.archive.infolist()
+                if not info.is_dir() and os.path.basename(info.filename)
+            }
+        # Categories are few; one query resolves every row by id or by name.
+        categories = list(Category.objects.all())
+        self.categories_by_id = {category.id: category for category in categories}
+        self.categories_by_name = {category.name.strip().lower(): category for category in categories}
+
+    def run(self, rows):
+        chunk = []
+        for number, row in enumerate(rows, start=1):
+            chunk.append((number, row))
+            if len(chunk) >= IMPORT_CHUNK_SIZE:
+                self._import_chunk(chunk)
+                chunk = []
+        if chunk:
+            self._import_chunk(chunk)
+        if self.archive is not None:
+            self.archive.close()
+        return {'summary': self.summary, 'rows': self.report}
+
+    def _error(self, number, errors):
+        self.summary['errors'] += 1
+        self.report.append({'row': number, 'status': 'error', 'errors': errors})
+
+    def _resolve_category(self, row, errors):
+        category_id = row.get('category_id')
+        if not _is_blank(category_id):
+            try:
+                category = self.categories_by_id.get(int(category_id))
+            except (TypeError, ValueError):
+                category = None
+            if category is None:
+                errors.append(f"category_id {category_id} not found")
+            return category
+        name = row.get('category')
+        if not _is_blank(name):
+            category = self.categories_by_name.get(str(name).strip().lower())
+            if category is None:
+                errors.append(f"category '{name}' not found")
+            return category
+        return None
+
+    def _clean(self, row, product):
+        """Returns (values, errors) for a row; `product` is the existing product being updated, if any."""
+        errors = []
+        values = {}
+
+        name = row.get('name')
+        if not _is_blank(name):
+            values['name'] = str(name).strip()[:200]
+        elif product is None:
+            errors.append("name is required")
+
+        if not _is_blank(row.get('description')):
+            values['description'] = row['description']
+
+        price = row.get('price')
+        if not _is_blank(price):
+            try:
+                values['price'] = Decimal(str(price))
+                if values['price'] < 0:
+                    errors.append("price must not be negative")
+            except InvalidOperation:
+                errors.append(f"invalid price '{price}'")
+        elif product is None:
+            errors.append("price is required")
+
+        stock = row.get('stock')
+        if not _is_blank(stock):
+            try:
+                values['stock'] = int(stock)
+                if values['stock'] < 0:
+                    errors.append("stock must not be negative")
+            except (TypeError, ValueError):
+                errors.append(f"invalid stock '{stock}'")
+        elif product is None:
+            values['stock'] = 0
+
+        if not _is_blank(row.get('featured')):
+            try:
+                values['featured'] = _parse_bool(row['featured'])
+            except ValueError as e:
+                errors.append(str(e))
+
+        if not _is_blank(row.get('default_material')):
+            values['default_material'] = str(row['default_material']).strip()[:50]
+
+        category = self._resolve_category(row, errors)
+        if category is not None:
+            values['category'] = category
+        elif product is None and not errors:
+            errors.append("category or category_id is required")
+
+        image = row.get('image')
+        if not _is_blank(image):
+            image_name = os.path.basename(str(image).strip())
+            if product is not None and product.image and os.path.basename(product.image.name) == image_name:
+                # An exported catalog names each product's current image; re-importing it is a no-op.
+                pass
+            elif image_name not in self.images:
+                errors.append(f"image '{image_name}' not found in the image archive")
+            else:
+                values['image'] = image_name
+
+        return values, errors
+
+    def _attach_image(self, product, image_name):
+        content = ContentFile(self.archive.read(self.images[image_name]))
+        product.image.save(image_name, content, save=False)
+
+    def _import_chunk(self, chunk):
+        ids = set()
+        for _, row in chunk:
+            if not isinstance(row, dict):
+                continue
+            try:
+                if not _is_blank(row.get('id')):
+                    ids.add(int(row['id']))
+            except (TypeError, ValueError):
+                pass
+        existing = Product.objects.in_bulk(ids) if ids else {}
+
+        to_create, to_update = [], []
+        for number, row in chunk:
+            if not isinstance(row, dict):
+                self._error(number, ["row must be an object"])
+                continue
+            product = None
+            if not _is_blank(row.get('id')):
+                try:
+                    product = existing.get(int(row['id']))
+                except (TypeError, ValueError):
+                    self._error(number, [f"invalid id '{row['id']}'"])
+                    continue
+                if product is None:
+                    self._error(number, [f"product {row['id']} not found"])
+                    continue
+
+            values, errors = self._clean(row, product)
+            if errors:
+                self._error(number, errors)
+                continue
+
+            image_name = values.pop('image', None)
+            if product is None:
+                product = Product(**values)
+                to_create.append((number, product, image_name))
+            else:
+                for field, value in values.items():
+                    setattr(product, field, value)
+                to_update.append((number, product, image_name))
+
+        if self.dry_run:
+            # Counts are what the import would do; nothing is written.
+            self.summary['created'] += len(to_create)
+            self.summary['updated'] += len(to_update)
+            for number, product, _ in to_create:
+                self.report.append({'row': number, 'status': 'valid', 'id': None})
+            for number, product, _ in to_update:
+                self.report.append({'row': number, 'status': 'valid', 'id': product.id})
+            self.report.sort(key=lambda entry: entry['row'])
+            return
+
+        now = timezone.now()
+        for _, product, _ in to_update:
+            # bulk_update() bypasses auto_now.
+            product.updated_at = now
+        with_images = []
+        try:
+            with transaction.atomic():
+                for _, product, image_name in to_create + to_update:
+                    if image_name:
+                        self._attach_image(product, image_name)
+                        with_images.append(product)
+                Product.objects.bulk_create([product for _, product, _ in to_create])
+                if to_update:
+                    Product.objects.bulk_update([product for _, product, _ in to_update], UPDATE_FIELDS)
+        except Exception:
+            # The chunk was rolled back; remove the image files it already wrote to storage.
+            for product in with_images:
+                product.image.delete(save=False)
+            raise
+
+        # bulk_create()/bulk_update() send no signals, so bump the catalog snapshot here.
+        schedule_catalog_bump()
+
+        for number, product, _ in to_create:
+            self.summary['created'] += 1
+            self.report.append({'row': number, 'status': 'created', 'id': product.id})
+        for number, product, _ in to_update:
+            self.summary['updated'] += 1
+            self.report.append({'row': number, 'status': 'updated', 'id': product.id})
+        self.report.sort(key=lambda entry: entry['row'])
+
+
+def import_products(stream, file_format, images=None, dry_run=False):
+    result = ProductImporter(images=images, dry_run=dry_run).run(iter_rows(stream, file_format))
+    logger.info(f"Product import ({'dry run' if dry_run else 'applied'}): {result['summary']}")
+    return result
+
+
+def _export_record(product):
+    return {
+        'id': product.id,
+        'name': product.name,
+        'description': product.description or '',
+        'price': str(product.price),
+        'stock': product.stock,
+        'featured': product.featured,
+        'default_material': product.default_material,
+        'category_id': product.category_id,
+        'category': product.category.name,
+        'image': os.path.basename(product.image.name) if product.image else '',
+    }
+
+
+class _LineBuffer:
+    """File-like object whose write() hands the written line back to the caller."""
+
+    def write(self, value):
+        return value
+
+
+def iter_export(file_format):
+    """Yields the catalog in import-compatible CSV or NDJSON, streaming products from the database in chunks."""
+    products = Product.objects.select_related('category').order_by('id').iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    if file_format == 'csv':
+        writer = csv.DictWriter(_LineBuffer(), fieldnames=PRODUCT_FIELDS)
+        yield writer.writerow({field: field for field in PRODUCT_FIELDS})
+        for product in products:
+            yield writer.writerow(_export_record(product))
+    elif file_format == 'ndjson':
+        for product in products:
+            yield json.dumps(_export_record(product)) + '\n'
+    else:
+        raise ValueError(f"Unsupported format '{file_format}'")
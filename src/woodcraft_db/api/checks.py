@@ -0,0 +1,40 @@
+import os
+import stat
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+
+FILE_CACHE_BACKEND = 'django.core.cache.backends.filebased.FileBasedCache'
+
+
+@register(Tags.security, Tags.caches)
+def check_private_cache_dir(app_configs, **kwargs):
+    """The file cache holds sessions; refuse a directory others can read or own."""
+    errors = []
+    for alias, config in settings.CACHES.items():
+        if config.get('BACKEND') != FILE_CACHE_BACKEND:
+            continue
+        location = os.path.abspath(config['LOCATION'])
+        try:
+            info = os.stat(location)
+        except FileNotFoundError:
+            continue  # Django creates it with mode 0700 on first write.
+        if info.st_uid != os.getuid() or stat.S_IMODE(info.st_mode) & 0o077:
+            errors.append(Error(
+                f"Cache directory {location} must be owned by this user and not accessible to others.",
+                hint="Point CACHE_DIR at a private directory, or chmod 700 this one.",
+                obj=alias,
+                id='api.E001',
+            ))
+    return errors
+
+
+@register()
+def check_generation_queue_worker(app_configs, **kwargs):
+    """Generations queued by the rate limiter are only ever submitted by the process_generation_queue worker."""
+    if settings.GENERATION_QUEUE_WORKER:
+        return []
+    return [Warning(
+        "No generation queue worker is configured; queued 3D model generations will never be submitted.",
+        hint="Run 'manage.py process_generation_queue' alongside the web process and set GENERATION_QUEUE_WORKER=true.",
+        id='api.W001',
+    )]
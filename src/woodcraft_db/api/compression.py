@@ -0,0 +1,97 @@
+import gzip
+import secrets
+import string
+import threading
+from collections import OrderedDict
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; without it only gzip is offered.
+    brotli = None
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Preferred first when the client accepts several with the same weight.
+AVAILABLE_ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == 'gzip':
+        # mtime=0 keeps the output byte-for-byte stable, so a variant is the same on every worker.
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    raise ValueError(f"Unsupported encoding '{encoding}'")
+
+
+def mask_length(body, max_random_bytes):
+    """
+    Adds a random-length file name to a gzip header ("Heal the BREACH"), so the size of a
+    compressed response no longer tracks how well reflected input compressed against a secret.
+    Decoders ignore the name. Cheap enough to apply to a cached variant on every response.
+    """
+    header = bytearray(body[:10])
+    header[3] |= gzip.FNAME
+    length = 1 + secrets.randbelow(max_random_bytes)
+    name = ''.join(secrets.choice(string.ascii_letters) for _ in range(length)).encode('ascii')
+    return bytes(header) + name + b'\x00' + body[10:]
+
+
+def negotiate_encoding(accept_encoding, available=AVAILABLE_ENCODINGS):
+    """Returns the best encoding from `available` the Accept-Encoding header allows, or None."""
+    weights = {}
+    for part in (accept_encoding or '').split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        weight = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[coding] = weight
+
+    best, best_weight = None, 0.0
+    for encoding in available:
+        weight = weights.get(encoding, weights.get('*', 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+class VariantCache:
+    """
+    Small in-process LRU of compressed bodies keyed by (ETag, encoding), bounded by entry
+    count and total bytes, so a hot payload is compressed once per process.
+    """
+
+    def __init__(self, max_entries, max_bytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            body = self.entries.get(key)
+            if body is not None:
+                self.entries.move_to_end(key)
+            return body
+
+    def set(self, key, body):
+        if len(body) > self.max_bytes:
+            return
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self.entries[key] = body
+            self.size += len(body)
+            while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
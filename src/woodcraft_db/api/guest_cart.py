@@ -0,0 +1,139 @@
+import logging
+from django.conf import settings
+from django.core import signing
+from django.db import transaction
+from .catalog import catalog_products
+from .models import Cart, CartItem, Product
+
+logger = logging.getLogger(__name__)
+
+GUEST_CART_COOKIE = 'guest_cart'
+GUEST_CART_SALT = 'api.guest_cart'
+MAX_ITEM_QUANTITY = 99
+
+
+class GuestCartError(ValueError):
+    pass
+
+
+def load_guest_cart(request):
+    """
+    Returns the visitor's cart as {product_id: quantity}. The cookie holds only a signed,
+    compressed list of [product_id, quantity] pairs; a missing, expired or tampered cookie
+    reads as an empty cart.
+    """
+    value = request.COOKIES.get(GUEST_CART_COOKIE)
+    if not value:
+        return {}
+    try:
+        pairs = signing.loads(value, salt=GUEST_CART_SALT, max_age=settings.GUEST_CART_MAX_AGE)
+        return {int(product_id): int(quantity) for product_id, quantity in pairs if int(quantity) > 0}
+    except (signing.BadSignature, TypeError, ValueError):
+        return {}
+
+
+def save_guest_cart(response, items):
+    if not items:
+        response.delete_cookie(GUEST_CART_COOKIE, samesite=settings.SESSION_COOKIE_SAMESITE)
+        return
+    value = signing.dumps(
+        [[product_id, quantity] for product_id, quantity in items.items()], salt=GUEST_CART_SALT, compress=True
+    )
+    response.set_cookie(
+        GUEST_CART_COOKIE,
+        value,
+        max_age=settings.GUEST_CART_MAX_AGE,
+        httponly=True,
+        secure=settings.SESSION_COOKIE_SECURE,
+        samesite=settings.SESSION_COOKIE_SAMESITE,
+    )
+
+
+def set_item_quantity(items, product_id, quantity):
+    """Sets one line of the cart, validated against the catalog snapshot; 0 removes it."""
+    if quantity < 0 or quantity > MAX_ITEM_QUANTITY:
+        raise GuestCartError(f"Quantity must be between 0 and {MAX_ITEM_QUANTITY}")
+    if quantity == 0:
+        items.pop(product_id, None)
+        return items
+    product = catalog_products().get(product_id)
+    if product is None:
+        raise GuestCartError("Product not found")
+    if quantity > product['stock']:
+        raise GuestCartError(f"Only {product['stock']} of {product['name']} in stock")
+    if product_id not in items and len(items) >= settings.GUEST_CART_MAX_ITEMS:
+        raise GuestCartError(f"A cart can hold at most {settings.GUEST_CART_MAX_ITEMS} products")
+    items[product_id] = quantity
+    return items
+
+
+def price_guest_cart(items):
+    """Renders the cart like GET /cart, priced from the catalog snapshot; products no longer listed are dropped."""
+    products = catalog_products()
+    cart_items = []
+    total_price = 0.0
+    total_items = 0
+    for product_id, quantity in items.items():
+        product = products.get(product_id)
+        if product is None:
+            continue
+        price = float(product['price'])
+        cart_items.append({
+            "cart_item_id_num": None,
+            "quantity": quantity,
+            "product": {
+                "id": product['id'],
+                "name": product['name'],
+                "image": product['image'],
+                "price": price,
+                "stock": product['stock'],
+                "featured": product['featured'],
+                "default_material": product['default_material'],
+            },
+            "product_name": product['name'],
+            "product_image": product['image'],
+            "price": price,
+            "total_price": price * quantity,
+            "customer_design": None,
+            "material": None,
+            "final_price": None,
+        })
+        total_price += price * quantity
+        total_items += quantity
+    return {
+        "cart_items": cart_items,
+        "total_price": total_price,
+        "total_items": total_items,
+    }
+
+
+def merge_guest_cart(user, items):
+    """
+    Adds the guest cart to the user's persistent cart: quantities of products already in the
+    cart are summed in one bulk_update and new lines are inserted with one bulk_create.
+    """
+    if not items:
+        return 0
+    with transaction.atomic():
+        cart, _ = Cart.objects.get_or_create(user=user)
+        live_ids = set(Product.objects.filter(id__in=items).values_list('id', flat=True))
+        existing = {}
+        for cart_item in CartItem.objects.filter(cart=cart, product_id__in=live_ids).order_by('id'):
+            existing.setdefault(cart_item.product_id, cart_item)
+
+        to_update, to_create = [], []
+        for product_id, quantity in items.items():
+            if product_id not in live_ids:
+                continue
+            cart_item = existing.get(product_id)
+            if cart_item is not None:
+                cart_item.quantity += quantity
+                to_update.append(cart_item)
+            else:
+                to_create.append(CartItem(cart=cart, product_id=product_id, quantity=quantity))
+        if to_update:
+            CartItem.objects.bulk_update(to_update, ['quantity'])
+        if to_create:
+            CartItem.objects.bulk_create(to_create)
+    logger.info(f"Merged guest cart into cart of user {user.pk}: {len(to_update)} updated, {len(to_create)} added")
+    return len(to_update) + len(to_create)
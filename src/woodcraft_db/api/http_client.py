@@ -0,0 +1,114 @@
+import threading
+from collections import OrderedDict
+from urllib.parse import urlparse
+from django.conf import settings
+
+# requests/urllib3 (api.http_session) and the Stripe SDK are imported on first use, not at startup.
+
+DEFAULT_CONNECT_TIMEOUT = 3.05
+DEFAULT_READ_TIMEOUT = 30
+DEFAULT_POOL_SIZE = 10
+DEFAULT_RETRIES = 2
+DEFAULT_MAX_SESSIONS = 32
+DEFAULT_BREAKER_FAILURE_THRESHOLD = 5
+DEFAULT_BREAKER_RESET_SECONDS = 30
+RETRY_STATUSES = (500, 502, 503, 504)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def __getattr__(name):
+    # CircuitOpenError and HostSession subclass requests types, so they live with requests in http_session.
+    if name in ('CircuitOpenError', 'CircuitBreaker', 'HostSession'):
+        from . import http_session
+        return getattr(http_session, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+_sessions = OrderedDict()
+_sessions_lock = threading.Lock()
+
+
+def _session_key(url_or_host, retries=None):
+    host = urlparse(url_or_host).netloc if '://' in url_or_host else url_or_host
+    if retries is None:
+        retries = _setting('HTTP_RETRIES', DEFAULT_RETRIES)
+    return host, retries
+
+
+def session_for(url_or_host, retries=None):
+    """
+    Returns the shared session for a URL's host and retry policy, creating it on first use.
+    Keying on the policy too keeps a retries=0 session (Stripe) from being reused for other
+    calls when several services sit behind one host, as with the local fakes. At most
+    HTTP_MAX_SESSIONS are kept; the least recently used one is closed to make room.
+    """
+    key = _session_key(url_or_host, retries)
+    evicted = []
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is not None:
+            _sessions.move_to_end(key)
+        else:
+            from .http_session import HostSession
+            session = _sessions[key] = HostSession(*key)
+            while len(_sessions) > max(1, _setting('HTTP_MAX_SESSIONS', DEFAULT_MAX_SESSIONS)):
+                evicted.append(_sessions.popitem(last=False)[1])
+    for old_session in evicted:
+        # Only drops idle pooled connections; a request still using it finishes normally.
+        old_session.close()
+    return session
+
+
+def breaker_open_for(url_or_host, retries=None):
+    """
+    Seconds until the circuit breaker of an existing session lets a call through, or 0 if the
+    host has no session yet. Unlike session_for() it never creates a session or imports requests.
+    """
+    with _sessions_lock:
+        session = _sessions.get(_session_key(url_or_host, retries))
+    return session.breaker.open_for() if session is not None else 0
+
+
+def request(method, url, **kwargs):
+    return session_for(url).request(method, url, **kwargs)
+
+
+def get(url, **kwargs):
+    return request('GET', url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request('POST', url, **kwargs)
+
+
+_stripe = None
+_stripe_lock = threading.Lock()
+
+
+def get_stripe():
+    """
+    Imports and configures the Stripe SDK on first use. SDK calls go through the shared
+    session for STRIPE_API_BASE; the SDK retries on its own with idempotency keys, so the
+    session itself does not retry.
+    """
+    global _stripe
+    if _stripe is None:
+        with _stripe_lock:
+            if _stripe is None:
+                import stripe
+
+                stripe.api_key = settings.STRIPE_SECRET_KEY
+                stripe.api_base = _setting('STRIPE_API_BASE', stripe.api_base)
+                stripe.default_http_client = stripe.RequestsClient(
+                    session=session_for(stripe.api_base, retries=0),
+                    timeout=(
+                        _setting('HTTP_CONNECT_TIMEOUT', DEFAULT_CONNECT_TIMEOUT),
+                        _setting('HTTP_READ_TIMEOUT', DEFAULT_READ_TIMEOUT),
+                    ),
+                )
+                stripe.max_network_retries = _setting('HTTP_RETRIES', DEFAULT_RETRIES)
+                _stripe = stripe
+    return _stripe
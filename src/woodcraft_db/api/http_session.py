@@ -0,0 +1,115 @@
+import logging
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from .http_client import (
+    DEFAULT_BREAKER_FAILURE_THRESHOLD, DEFAULT_BREAKER_RESET_SECONDS, DEFAULT_CONNECT_TIMEOUT, DEFAULT_POOL_SIZE,
+    DEFAULT_READ_TIMEOUT, RETRY_STATUSES, _setting,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised instead of calling an upstream whose circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls until
+    `reset_seconds` have passed; then lets a single trial call through, closing again
+    if it succeeds and reopening if it fails. State is per process.
+    """
+
+    def __init__(self, host, failure_threshold, reset_seconds):
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self.lock = threading.Lock()
+
+    def before_call(self):
+        with self.lock:
+            if self.opened_at is None:
+                return
+            if time.monotonic() - self.opened_at < self.reset_seconds or self.trial_in_flight:
+                raise CircuitOpenError(f"Circuit open for {self.host}; failing fast")
+            self.trial_in_flight = True
+
+    def open_for(self):
+        """Seconds until the next trial call is let through; 0 while calls go through."""
+        with self.lock:
+            if self.opened_at is None:
+                return 0
+            return max(0.0, self.reset_seconds - (time.monotonic() - self.opened_at))
+
+    def record_success(self):
+        with self.lock:
+            if self.opened_at is not None:
+                logger.info(f"Circuit closed for {self.host}")
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    logger.warning(f"Circuit opened for {self.host} after {self.failures} failures")
+                self.opened_at = time.monotonic()
+
+
+class HostSession(requests.Session):
+    """
+    Keep-alive session for one upstream host with default timeouts, jittered retries of
+    idempotent requests and a circuit breaker. 5xx responses and connection errors count
+    as failures; a response is returned to the caller either way.
+    """
+
+    def __init__(self, host, retries):
+        super().__init__()
+        self.host = host
+        self.breaker = CircuitBreaker(
+            host,
+            _setting('HTTP_BREAKER_FAILURE_THRESHOLD', DEFAULT_BREAKER_FAILURE_THRESHOLD),
+            _setting('HTTP_BREAKER_RESET_SECONDS', DEFAULT_BREAKER_RESET_SECONDS),
+        )
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            status_forcelist=RETRY_STATUSES,
+            backoff_factor=0.5,
+            backoff_jitter=0.5,
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        pool_size = _setting('HTTP_POOL_SIZE', DEFAULT_POOL_SIZE)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.mount('https://', adapter)
+        self.mount('http://', adapter)
+
+    def request(self, method, url, **kwargs):
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = (
+                _setting('HTTP_CONNECT_TIMEOUT', DEFAULT_CONNECT_TIMEOUT),
+                _setting('HTTP_READ_TIMEOUT', DEFAULT_READ_TIMEOUT),
+            )
+        self.breaker.before_call()
+        try:
+            response = super().request(method, url, **kwargs)
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return response
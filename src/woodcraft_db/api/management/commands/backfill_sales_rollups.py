@@ -0,0 +1,35 @@
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from api.analytics import order_day, rebuild_rollups
+from api.models import Order
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the daily sales rollup tables from orders, a chunk of days at a time."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=date.fromisoformat, help="First day to rebuild (default: first order).")
+        parser.add_argument('--end', type=date.fromisoformat, help="Last day to rebuild (default: today).")
+        parser.add_argument('--chunk-days', type=int, default=31, help="Days rebuilt per transaction.")
+
+    def handle(self, *args, **options):
+        start = options['start']
+        if start is None:
+            first_order = Order.objects.order_by('created_at').first()
+            if first_order is None:
+                self.stdout.write("No orders to roll up")
+                return
+            start = order_day(first_order)
+        end = options['end'] or timezone.localdate()
+        if start > end:
+            raise CommandError("--start must not be after --end")
+        if options['chunk_days'] < 1:
+            raise CommandError("--chunk-days must be at least 1")
+
+        chunk_start = start
+        while chunk_start <= end:
+            chunk_end = min(end, chunk_start + timedelta(days=options['chunk_days'] - 1))
+            sales_rows, product_rows = rebuild_rollups(chunk_start, chunk_end)
+            self.stdout.write(f"{chunk_start} - {chunk_end}: {sales_rows} sales rows, {product_rows} product rows")
+            chunk_start = chunk_end + timedelta(days=1)
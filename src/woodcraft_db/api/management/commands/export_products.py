@@ -0,0 +1,18 @@
+import sys
+from django.core.management.base import BaseCommand
+from api.catalog_io import iter_export
+
+
+class Command(BaseCommand):
+    help = "Streams the product catalog as CSV or NDJSON in the format import_products reads."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=('csv', 'ndjson'), default='csv')
+        parser.add_argument('--output', help="File to write (default: stdout).")
+
+    def handle(self, *args, **options):
+        if options['output']:
+            with open(options['output'], 'w', newline='') as output:
+                output.writelines(iter_export(options['format']))
+        else:
+            sys.stdout.writelines(iter_export(options['format']))
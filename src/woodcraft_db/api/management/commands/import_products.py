@@ -0,0 +1,41 @@
+import json
+import zipfile
+from django.core.management.base import BaseCommand, CommandError
+from api.catalog_io import IMPORT_FORMATS, detect_format, import_products
+
+
+class Command(BaseCommand):
+    help = "Bulk imports products from a CSV, JSON or NDJSON file, with optional images from a zip archive."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV, JSON or NDJSON file of products.")
+        parser.add_argument('--format', choices=IMPORT_FORMATS, help="File format (default: from the extension).")
+        parser.add_argument('--images', help="Zip archive of images referenced by the image column.")
+        parser.add_argument('--dry-run', action='store_true', help="Validate rows without writing anything.")
+        parser.add_argument('--report', help="Write the row-level report as JSON to this path.")
+
+    def handle(self, *args, **options):
+        file_format = options['format'] or detect_format(options['path'])
+        images = None
+        try:
+            if options['images']:
+                images = open(options['images'], 'rb')
+            with open(options['path'], 'rb') as stream:
+                result = import_products(stream, file_format, images=images, dry_run=options['dry_run'])
+        except (OSError, ValueError, UnicodeDecodeError, zipfile.BadZipFile) as e:
+            raise CommandError(str(e))
+        finally:
+            if images is not None:
+                images.close()
+
+        for entry in result['rows']:
+            if entry['status'] == 'error':
+                self.stderr.write(f"Row {entry['row']}: {'; '.join(entry['errors'])}")
+        if options['report']:
+            with open(options['report'], 'w') as report:
+                json.dump(result, report, indent=2)
+        summary = result['summary']
+        self.stdout.write(
+            f"{summary['created']} created, {summary['updated']} updated, {summary['errors']} errors"
+            + (" (dry run)" if options['dry_run'] else "")
+        )
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from api.mirroring import designs_needing_mirror, mirror_design
+
+
+class Command(BaseCommand):
+    help = "Copies remote Tripo models and thumbnails of customer designs into local media storage."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=None, help="Maximum number of designs to mirror.")
+
+    def handle(self, *args, **options):
+        designs = designs_needing_mirror().order_by('id')
+        if options['limit']:
+            designs = designs[:options['limit']]
+
+        mirrored = failed = 0
+        for design in designs.iterator():
+            try:
+                if mirror_design(design):
+                    mirrored += 1
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f"Design {design.id}: {e}")
+        self.stdout.write(f"Mirrored {mirrored} design(s), {failed} failed")
@@ -0,0 +1,30 @@
+import time
+from django.core.management.base import BaseCommand
+from api.ai_service import dispatch_queued_generations, refresh_pending_designs, settle_finished_designs
+
+
+class Command(BaseCommand):
+    help = (
+        "Submits queued 3D model generations to Tripo as the shared rate limiter allows, and "
+        "attaches finished models to designs saved while their generation was pending. "
+        "Run it alongside the web process and set GENERATION_QUEUE_WORKER=true."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Drain what the limiter admits now, then exit.")
+        parser.add_argument('--interval', type=float, default=5, help="Seconds to sleep between passes.")
+
+    def handle(self, *args, **options):
+        while True:
+            dispatched = dispatch_queued_generations()
+            if dispatched:
+                self.stdout.write(f"Dispatched {dispatched} queued generation(s)")
+            settled = settle_finished_designs()
+            if settled:
+                self.stdout.write(f"Settled {settled} design(s) whose generation had already finished")
+            refreshed = refresh_pending_designs()
+            if refreshed:
+                self.stdout.write(f"Checked {refreshed} generation(s) with designs waiting on them")
+            if options['once']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,23 @@
+import time
+from django.core.management.base import BaseCommand
+from api.analytics import refresh_stale_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuilds the sales rollups of days whose orders were placed, cancelled or restored since the "
+        "last run. Run it as a worker, or from cron with --once."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Rebuild the days marked now, then exit.")
+        parser.add_argument('--interval', type=float, default=60, help="Seconds to sleep between passes.")
+
+    def handle(self, *args, **options):
+        while True:
+            refreshed = refresh_stale_rollups()
+            if refreshed:
+                self.stdout.write(f"Rebuilt sales rollups for {refreshed} day(s)")
+            if options['once']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,56 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from fake_services.faults import FaultInjector
+from fake_services.server import build_server
+
+
+class Command(BaseCommand):
+    help = (
+        "Serves local fakes of Stripe Checkout, Tripo3D and Fixer with optional latency and fault "
+        "injection. Point the backend at them with FAKE_SERVICES_URL=http://<host>:<port>."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--webhook-url', default='http://127.0.0.1:8000/api/webhook',
+                            help="Where completed checkouts are delivered; empty to only return the signed event.")
+        parser.add_argument('--webhook-secret', default=settings.STRIPE_WEBHOOK_SECRET or 'whsec_test',
+                            help="Signing secret (default: STRIPE_WEBHOOK_SECRET).")
+        parser.add_argument('--tripo-duration', type=float, default=5.0, help="Seconds a fake generation takes.")
+        parser.add_argument('--latency-ms', type=float, default=0.0, help="Added to every faked response.")
+        parser.add_argument('--jitter-ms', type=float, default=0.0, help="Random extra latency, up to this much.")
+        parser.add_argument('--error-rate', type=float, default=0.0, help="Share of requests answered with a 500.")
+        parser.add_argument('--burst-every', type=int, default=0,
+                            help="Start a 503 burst every N requests per service (0 disables bursts).")
+        parser.add_argument('--burst-length', type=int, default=0, help="Requests per 503 burst.")
+        parser.add_argument('--retry-after', type=int, default=1, help="Retry-After seconds sent with 503s.")
+        parser.add_argument('--seed', type=int, default=0, help="Seed for latency and error decisions.")
+
+    def handle(self, *args, **options):
+        faults = FaultInjector(
+            latency_ms=options['latency_ms'],
+            jitter_ms=options['jitter_ms'],
+            error_rate=options['error_rate'],
+            burst_every=options['burst_every'],
+            burst_length=options['burst_length'],
+            retry_after=options['retry_after'],
+            seed=options['seed'],
+        )
+        server = build_server(
+            host=options['host'],
+            port=options['port'],
+            webhook_secret=options['webhook_secret'],
+            webhook_url=options['webhook_url'] or None,
+            tripo_duration=options['tripo_duration'],
+            faults=faults,
+        )
+        host, port = server.server_address[:2]
+        self.stdout.write(f"Fake Stripe, Tripo and Fixer on http://{host}:{port}; set FAKE_SERVICES_URL to use them.")
+        self.stdout.write(f"Faults: {faults.config()}. Change them at runtime with POST /_fake/config.")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
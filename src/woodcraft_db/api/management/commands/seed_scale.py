@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+from api.seeding import SEED_EMAIL_DOMAIN, SEED_PASSWORD, ScaleSeeder
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates a deterministic synthetic dataset (users, carts, categories, products, designs, "
+        "addresses, orders and order items) for scale testing."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0, help="Random seed; the same seed gives the same data.")
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--categories', type=int, default=30)
+        parser.add_argument('--products', type=int, default=2000)
+        parser.add_argument('--designs', type=int, default=5000)
+        parser.add_argument('--orders', type=int, default=50000)
+        parser.add_argument('--cart-fraction', type=float, default=0.3, help="Share of users with items in their cart.")
+        parser.add_argument('--addresses-per-user', type=float, default=1.2, help="Mean saved addresses per user.")
+        parser.add_argument('--days', type=int, default=365, help="Spread timestamps over this many past days.")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Rows per bulk INSERT.")
+        parser.add_argument('--clear', action='store_true', help="Delete previously seeded rows first.")
+
+    def handle(self, *args, **options):
+        if options['categories'] < 1 or options['products'] < 1 or options['users'] < 1:
+            raise CommandError("--users, --categories and --products must be at least 1")
+        if not 0 <= options['cart_fraction'] <= 1:
+            raise CommandError("--cart-fraction must be between 0 and 1")
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1")
+
+        if options['clear']:
+            deleted = ScaleSeeder.clear()
+            self.stdout.write(f"Deleted {deleted} previously seeded rows")
+
+        seeder = ScaleSeeder(
+            seed=options['seed'], batch_size=options['batch_size'], days=options['days'], stdout=self.stdout
+        )
+        counts = seeder.run(
+            users=options['users'],
+            categories=options['categories'],
+            products=options['products'],
+            designs=options['designs'],
+            orders=options['orders'],
+            cart_fraction=options['cart_fraction'],
+            addresses_per_user=options['addresses_per_user'],
+        )
+        for model, count in counts.items():
+            self.stdout.write(f"  {model}: {count}")
+        self.stdout.write(
+            f"Seeded users sign in as user<N>.s{options['seed']}@{SEED_EMAIL_DOMAIN} / {SEED_PASSWORD}. "
+            "Run backfill_sales_rollups to populate analytics."
+        )
@@ -0,0 +1,86 @@
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Modules that should only load when first used; the report flags any that load at startup.
+LAZY_MODULES = ('stripe', 'requests', 'urllib3', 'numpy')
+
+# Runs in a fresh interpreter so nothing is already imported. Timings go to stdout as JSON;
+# `-X importtime` writes its per-module breakdown to stderr.
+PROFILE_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import django
+django.setup()
+setup_done = time.perf_counter()
+import importlib
+importlib.import_module(sys.argv[1])
+done = time.perf_counter()
+print(json.dumps({
+    'setup_ms': (setup_done - started) * 1000,
+    'urls_ms': (done - setup_done) * 1000,
+    'total_ms': (done - started) * 1000,
+    'loaded': [name for name in sys.argv[2:] if name in sys.modules],
+}))
+"""
+
+
+def parse_importtime(stderr):
+    """Returns [(module, self_us, cumulative_us, depth)] from `python -X importtime` output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+class Command(BaseCommand):
+    help = "Measures process startup (django.setup() plus the URLconf) and breaks import time down by package."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=3, help="Fresh interpreters to time; the fastest is reported.")
+        parser.add_argument('--top', type=int, default=15, help="Number of packages to list.")
+        parser.add_argument('--module', default=settings.ROOT_URLCONF,
+                            help="Module imported after django.setup() (default: ROOT_URLCONF).")
+
+    def handle(self, *args, **options):
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'woodcraft_db.settings')}
+        command = [sys.executable, '-X', 'importtime', '-c', PROFILE_SCRIPT, options['module'], *LAZY_MODULES]
+
+        best = None
+        for _ in range(max(1, options['runs'])):
+            result = subprocess.run(command, env=env, capture_output=True, text=True, cwd=settings.BASE_DIR)
+            if result.returncode != 0:
+                self.stderr.write(result.stderr[-2000:])
+                return
+            timings = json.loads(result.stdout.strip().splitlines()[-1])
+            if best is None or timings['total_ms'] < best[0]['total_ms']:
+                best = (timings, result.stderr)
+        timings, stderr = best
+
+        self.stdout.write(
+            f"Startup: {timings['total_ms']:.0f} ms "
+            f"(django.setup() {timings['setup_ms']:.0f} ms, {options['module']} {timings['urls_ms']:.0f} ms)"
+        )
+
+        # Attribute each top-level import's cumulative time to its root package.
+        by_package = defaultdict(int)
+        for name, _, cumulative_us, depth in parse_importtime(stderr):
+            if depth == 0:
+                by_package[name.split('.')[0]] += cumulative_us
+        self.stdout.write(f"\nImport time by package (top {options['top']}):")
+        for package, cumulative_us in sorted(by_package.items(), key=lambda item: -item[1])[:options['top']]:
+            self.stdout.write(f"  {cumulative_us / 1000:8.1f} ms  {package}")
+
+        loaded = timings['loaded']
+        if loaded:
+            self.stdout.write(self.style.WARNING(f"\nLoaded at startup but meant to be lazy: {', '.join(loaded)}"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"\nNot loaded at startup: {', '.join(LAZY_MODULES)}"))
@@ -0,0 +1,144 @@
+import logging
+import re
+import time
+import uuid
+from django.conf import settings
+from django.utils.cache import patch_vary_headers, set_response_etag
+from .compression import VariantCache, compress, mask_length, negotiate_encoding
+from .logging_pipeline import request_id_var
+from .tracing import finish_trace, slow_request_ms, start_trace
+
+logger = logging.getLogger('api.requests')
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+_VALID_REQUEST_ID = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+DEFAULT_COMPRESSION_MIN_SIZE = 1024
+DEFAULT_COMPRESSION_CACHE_ENTRIES = 128
+DEFAULT_COMPRESSION_CACHE_MAX_BYTES = 32 * 1024 * 1024
+DEFAULT_COMPRESSION_MAX_RANDOM_BYTES = 100
+COMPRESSIBLE_CONTENT_TYPES = ('application/json', 'text/', 'application/javascript', 'application/xml', 'image/svg+xml')
+
+
+class RequestLogMiddleware:
+    """
+    Gives every request an id (reusing a sane inbound X-Request-ID), exposes it to log
+    records through a context variable, echoes it on the response and logs one line per
+    request with its duration and outbound call time. Requests slower than
+    TRACE_SLOW_REQUEST_MS are logged as a warning with their full span tree.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request_id = request.headers.get(REQUEST_ID_HEADER, '')
+        if not _VALID_REQUEST_ID.match(request_id):
+            request_id = uuid.uuid4().hex
+        request.request_id = request_id
+        token = request_id_var.set(request_id)
+        trace_token = start_trace()
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+            duration_ms = round((time.perf_counter() - started) * 1000, 1)
+            trace = finish_trace(trace_token)
+            trace_token = None
+            outbound_calls, outbound_ms = trace.outbound()
+            response[REQUEST_ID_HEADER] = request_id
+            fields = {
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'duration_ms': duration_ms,
+                'outbound_calls': outbound_calls,
+                'outbound_ms': outbound_ms,
+            }
+            if duration_ms >= slow_request_ms():
+                logger.warning(
+                    f"Slow request {request.method} {request.path} {response.status_code}: {duration_ms}ms",
+                    extra={**fields, 'spans': trace.as_list()},
+                )
+            else:
+                logger.info(f"{request.method} {request.path} {response.status_code}", extra=fields)
+            return response
+        finally:
+            if trace_token is not None:
+                finish_trace(trace_token)
+            request_id_var.reset(token)
+
+
+class CompressionMiddleware:
+    """
+    Compresses response bodies with the best encoding the client accepts (brotli when
+    installed, else gzip), leaving small, streaming and already-encoded responses alone.
+    Successful GET responses are given an ETag if they lack one, and their compressed
+    variants are kept in an in-process LRU keyed by that ETag, so hot payloads such as
+    the order list are compressed once rather than on every request. ConditionalGetMiddleware,
+    listed before this one, answers a matching If-None-Match with a 304.
+
+    Responses to requests that carry a session or credentials, or that set cookies, may hold
+    secrets next to reflected input. They are only gzipped, with a random-length header field
+    added per response so their size cannot be used as a BREACH oracle.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.min_size = getattr(settings, 'COMPRESSION_MIN_SIZE', DEFAULT_COMPRESSION_MIN_SIZE)
+        self.max_random_bytes = getattr(
+            settings, 'COMPRESSION_MAX_RANDOM_BYTES', DEFAULT_COMPRESSION_MAX_RANDOM_BYTES
+        )
+        self.variants = VariantCache(
+            getattr(settings, 'COMPRESSION_CACHE_ENTRIES', DEFAULT_COMPRESSION_CACHE_ENTRIES),
+            getattr(settings, 'COMPRESSION_CACHE_MAX_BYTES', DEFAULT_COMPRESSION_CACHE_MAX_BYTES),
+        )
+
+    @staticmethod
+    def carries_secrets(request, response):
+        return bool(
+            settings.SESSION_COOKIE_NAME in request.COOKIES
+            or 'Authorization' in request.headers
+            or response.cookies
+        )
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (
+            response.streaming
+            or response.has_header('Content-Encoding')
+            or not response.get('Content-Type', '').startswith(COMPRESSIBLE_CONTENT_TYPES)
+        ):
+            return response
+        patch_vary_headers(response, ['Accept-Encoding'])
+        if len(response.content) < self.min_size:
+            return response
+        masked = self.max_random_bytes > 0 and self.carries_secrets(request, response)
+        if masked:
+            encoding = negotiate_encoding(request.headers.get('Accept-Encoding'), available=('gzip',))
+        else:
+            encoding = negotiate_encoding(request.headers.get('Accept-Encoding'))
+        if encoding is None:
+            return response
+
+        cacheable = request.method in ('GET', 'HEAD') and response.status_code == 200
+        if cacheable and not response.has_header('ETag'):
+            set_response_etag(response)
+        etag = response.get('ETag') if cacheable else None
+
+        body = self.variants.get((etag, encoding)) if etag else None
+        if body is None:
+            body = compress(response.content, encoding)
+            if len(body) >= len(response.content):
+                return response
+            if etag:
+                self.variants.set((etag, encoding), body)
+        if masked:
+            body = mask_length(body, self.max_random_bytes)
+
+        response.content = body
+        response['Content-Length'] = str(len(body))
+        response['Content-Encoding'] = encoding
+        if etag and not etag.startswith('W/'):
+            # The compressed body differs from the identity one, so the ETag can only be weak.
+            response['ETag'] = f'W/{etag}'
+        return response
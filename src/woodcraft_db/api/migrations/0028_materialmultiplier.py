@@ -0,0 +1,44 @@
+# Generated by Django 5.1.7 on 2026-10-19 12:51
+
+from decimal import Decimal
+from django.db import migrations, models
+
+DEFAULT_MATERIAL_MULTIPLIERS = {
+    'oak': Decimal('1.5'),
+    'maple': Decimal('1.8'),
+    'pine': Decimal('0.7'),
+    'mahogany': Decimal('1.2'),
+    'walnut': Decimal('2.0'),
+}
+
+
+def seed_material_multipliers(apps, schema_editor):
+    MaterialMultiplier = apps.get_model('api', 'MaterialMultiplier')
+    MaterialMultiplier.objects.bulk_create([
+        MaterialMultiplier(material=material, multiplier=multiplier)
+        for material, multiplier in DEFAULT_MATERIAL_MULTIPLIERS.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0027_customeraddress_barangay_customeraddress_city_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MaterialMultiplier',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('material', models.CharField(max_length=100, unique=True)),
+                ('multiplier', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['material'],
+            },
+        ),
+        migrations.RunPython(seed_material_multipliers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.1.7 on 2026-10-19 12:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0030_generation_queue_ratelimitbucket'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customerdesign',
+            name='mirrored_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='customerdesign',
+            name='model_checksum',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='customerdesign',
+            name='model_image_checksum',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='customerdesign',
+            name='model_image_source_url',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='customerdesign',
+            name='model_source_url',
+            field=models.TextField(blank=True, null=True),
+        ),
+    ]
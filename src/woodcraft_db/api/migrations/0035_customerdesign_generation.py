@@ -0,0 +1,19 @@
+# Generated by Django 5.1.7 on 2026-10-19 13:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0034_orderstatushistory'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customerdesign',
+            name='generation',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='designs', to='api.generationtask'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.7 on 2026-10-19 13:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0035_customerdesign_generation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='height_cm',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='length_cm',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='weight_kg',
+            field=models.DecimalField(decimal_places=3, default=1, max_digits=7),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='width_cm',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
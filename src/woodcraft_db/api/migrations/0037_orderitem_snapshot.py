@@ -0,0 +1,64 @@
+# Generated by Django 5.1.7 on 2026-10-19 13:13
+
+from django.db import migrations, models
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def backfill_order_item_snapshots(apps, schema_editor):
+    """Fills the snapshot from the current product/design, walking order items in primary key batches."""
+    OrderItem = apps.get_model('api', 'OrderItem')
+    last_id = 0
+    while True:
+        batch = list(
+            OrderItem.objects.filter(id__gt=last_id)
+            .select_related('product', 'customer_design')
+            .order_by('id')[:BACKFILL_BATCH_SIZE]
+        )
+        if not batch:
+            break
+        for item in batch:
+            if item.product is not None:
+                item.item_name = item.product.name
+                item.item_image = item.product.image.url if item.product.image else ''
+                item.item_material = item.product.default_material or ''
+            elif item.customer_design is not None:
+                item.is_custom_design = True
+                item.item_name = item.customer_design.design_description
+                item.item_image = item.customer_design.model_image or ''
+                item.item_material = item.customer_design.material or ''
+        OrderItem.objects.bulk_update(
+            batch, ['is_custom_design', 'item_name', 'item_image', 'item_material'], batch_size=BACKFILL_BATCH_SIZE
+        )
+        last_id = batch[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0036_product_shipping_dimensions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='is_custom_design',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='item_image',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='item_material',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='item_name',
+            field=models.CharField(blank=True, default='', max_length=500),
+        ),
+        migrations.RunPython(backfill_order_item_snapshots, migrations.RunPython.noop),
+    ]
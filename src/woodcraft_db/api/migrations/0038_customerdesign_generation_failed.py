@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-19 13:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0037_orderitem_snapshot'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='customerdesign',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('generating', 'Generating Model'), ('generation_failed', 'Generation Failed'), ('generated', 'Model Generated'), ('approved', 'Approved'), ('in_progress', 'In Progress'), ('completed', 'Completed'), ('rejected', 'Rejected')], default='pending', max_length=20),
+        ),
+    ]
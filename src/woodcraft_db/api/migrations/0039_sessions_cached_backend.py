@@ -0,0 +1,48 @@
+from django.db import migrations
+
+OLD_BACKEND = 'django.contrib.auth.backends.ModelBackend'
+NEW_BACKEND = 'api.backends.CachedModelBackend'
+BATCH_SIZE = 1000
+
+
+def move_sessions_to_cached_backend(apps, schema_editor):
+    """
+    ModelBackend is no longer listed in AUTHENTICATION_BACKENDS, so rewrite the backend recorded in
+    stored sessions instead of logging their users out. Cached copies are dropped so they reload.
+    """
+    from django.contrib.sessions.backends.cached_db import KEY_PREFIX
+    from django.contrib.sessions.backends.db import SessionStore
+    from django.core.cache import caches
+    from django.conf import settings
+
+    Session = apps.get_model('sessions', 'Session')
+    store = SessionStore()
+    cache = caches[settings.SESSION_CACHE_ALIAS]
+    last_key = ''
+    while True:
+        batch = list(Session.objects.filter(session_key__gt=last_key).order_by('session_key')[:BATCH_SIZE])
+        if not batch:
+            break
+        changed = []
+        for session in batch:
+            data = store.decode(session.session_data)
+            if data.get('_auth_user_backend') == OLD_BACKEND:
+                data['_auth_user_backend'] = NEW_BACKEND
+                session.session_data = store.encode(data)
+                changed.append(session)
+        if changed:
+            Session.objects.bulk_update(changed, ['session_data'])
+            cache.delete_many([KEY_PREFIX + session.session_key for session in changed])
+        last_key = batch[-1].session_key
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0038_customerdesign_generation_failed'),
+        ('sessions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(move_sessions_to_cached_backend, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,183 @@
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from . import http_client
+from .models import CustomerDesign
+
+logger = logging.getLogger(__name__)
+
+MIRROR_DIRECTORY = 'designs'
+ASSET_URL_PATH = '/api/design_assets/'
+MIRROR_CHUNK_SIZE = 64 * 1024
+MIRROR_MAX_BYTES = 200 * 1024 * 1024
+MIRROR_TIMEOUT = (5, 60)
+
+# Mirrored files are named after their SHA-256, so a name identifies its content forever.
+ASSET_NAME_PATTERN = re.compile(r'^[0-9a-f]{2}/[0-9a-f]{64}\.(glb|gltf|png|jpg|jpeg|webp)$')
+ASSET_CONTENT_TYPES = {
+    '.glb': 'model/gltf-binary',
+    '.gltf': 'model/gltf+json',
+    '.webp': 'image/webp',
+}
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='design-mirror')
+
+
+def asset_url(name):
+    return f"{settings.PUBLIC_BASE_URL}{ASSET_URL_PATH}{name}"
+
+
+def is_mirrored_url(url):
+    return bool(url) and url.startswith(f"{settings.PUBLIC_BASE_URL}{ASSET_URL_PATH}")
+
+
+def asset_content_type(name):
+    extension = os.path.splitext(name)[1].lower()
+    return ASSET_CONTENT_TYPES.get(extension) or mimetypes.guess_type(name)[0] or 'application/octet-stream'
+
+
+def is_mirrorable_url(url):
+    """
+    True for https URLs on MIRROR_ALLOWED_HOSTS (or any URL on the local fakes). Mirroring fetches
+    the URL from the server, so anything else could reach internal hosts or metadata endpoints.
+    """
+    try:
+        parsed = urlparse(url)
+        port = parsed.port
+    except (TypeError, ValueError):
+        return False
+    if settings.FAKE_SERVICES_URL:
+        fake = urlparse(settings.FAKE_SERVICES_URL)
+        if (parsed.scheme, parsed.netloc) == (fake.scheme, fake.netloc):
+            return True
+    host = (parsed.hostname or '').lower()
+    if parsed.scheme != 'https' or not host or port not in (None, 443):
+        return False
+    return any(
+        host == allowed or (allowed.startswith('.') and host.endswith(allowed))
+        for allowed in settings.MIRROR_ALLOWED_HOSTS
+    )
+
+
+def _extension_for(url, content_type, default):
+    extension = os.path.splitext(urlparse(url).path)[1].lower().lstrip('.')
+    if not extension and content_type:
+        guessed = mimetypes.guess_extension(content_type.split(';')[0].strip()) or ''
+        extension = guessed.lstrip('.')
+    return extension if extension in ('glb', 'gltf', 'png', 'jpg', 'jpeg', 'webp') else default
+
+
+def mirror_url(url, default_extension):
+    """
+    Streams a remote file into media storage in fixed-size chunks while hashing it.
+    Returns (asset_name, sha256). Content already mirrored is not written twice.
+    """
+    if not is_mirrorable_url(url):
+        raise ValueError(f"Refusing to mirror a URL outside MIRROR_ALLOWED_HOSTS: {url}")
+    digest = hashlib.sha256()
+    size = 0
+    # Redirects are not followed: they could lead off the allowlist.
+    with http_client.get(url, stream=True, timeout=MIRROR_TIMEOUT, allow_redirects=False) as response:
+        if response.is_redirect:
+            raise ValueError(f"Refusing to follow a redirect while mirroring: {url}")
+        response.raise_for_status()
+        extension = _extension_for(url, response.headers.get('Content-Type'), default_extension)
+        with tempfile.NamedTemporaryFile(suffix=f'.{extension}') as temporary:
+            for chunk in response.iter_content(chunk_size=MIRROR_CHUNK_SIZE):
+                size += len(chunk)
+                if size > MIRROR_MAX_BYTES:
+                    raise ValueError(f"Remote file exceeds {MIRROR_MAX_BYTES} bytes: {url}")
+                digest.update(chunk)
+                temporary.write(chunk)
+            temporary.flush()
+
+            checksum = digest.hexdigest()
+            name = f"{checksum[:2]}/{checksum}.{extension}"
+            storage_name = f"{MIRROR_DIRECTORY}/{name}"
+            if not default_storage.exists(storage_name):
+                temporary.seek(0)
+                saved = default_storage.save(storage_name, File(temporary))
+                if saved != storage_name:
+                    # Lost a race with another worker writing the same content.
+                    default_storage.delete(saved)
+    return name, checksum
+
+
+def mirror_design(design):
+    """Copies a design's remote model and thumbnail locally and points the design at the copies."""
+    updates = {}
+    if design.model_url and not is_mirrored_url(design.model_url):
+        name, checksum = mirror_url(design.model_url, 'glb')
+        updates.update(model_url=asset_url(name), model_source_url=design.model_url, model_checksum=checksum)
+    if design.model_image and not is_mirrored_url(design.model_image):
+        if is_mirrorable_url(design.model_image):
+            name, checksum = mirror_url(design.model_image, 'webp')
+            updates.update(model_image=asset_url(name), model_image_source_url=design.model_image, model_image_checksum=checksum)
+        else:
+            # Keep the remote thumbnail rather than failing the model's mirror on every run.
+            logger.warning(f"Not mirroring the thumbnail of design {design.pk}: host is not in MIRROR_ALLOWED_HOSTS")
+    if not updates:
+        return False
+
+    # Only rewrite the design if its URLs did not change while we were downloading.
+    updated = CustomerDesign.objects.filter(
+        pk=design.pk, model_url=design.model_url, model_image=design.model_image
+    ).update(mirrored_at=timezone.now(), **updates)
+    return bool(updated)
+
+
+def _mirror_design_id(design_id):
+    try:
+        design = CustomerDesign.objects.filter(pk=design_id).first()
+        if design:
+            mirror_design(design)
+    except Exception:
+        logger.exception(f"Failed to mirror assets for design {design_id}")
+    finally:
+        # Worker threads hold their own connection; do not leak it between jobs.
+        connection.close()
+
+
+def schedule_mirror(design_id):
+    """Mirrors a design in the background once the current transaction commits."""
+    transaction.on_commit(lambda: _executor.submit(_mirror_design_id, design_id))
+
+
+def _mirrorable_url_q(field):
+    """The SQL form of is_mirrorable_url(), so backfills never select URLs mirror_url() would refuse."""
+    hosts = '|'.join(
+        rf'[a-z0-9.-]+{re.escape(allowed)}' if allowed.startswith('.') else re.escape(allowed)
+        for allowed in settings.MIRROR_ALLOWED_HOSTS
+    )
+    condition = Q(**{f'{field}__iregex': rf'^https://({hosts})(:443)?([/?#]|$)'}) if hosts else Q(pk__in=[])
+    if settings.FAKE_SERVICES_URL:
+        fake = urlparse(settings.FAKE_SERVICES_URL)
+        condition |= Q(**{f'{field}__iregex': rf'^{re.escape(fake.scheme)}://{re.escape(fake.netloc)}([/?#]|$)'})
+    return condition
+
+
+def designs_needing_mirror():
+    return CustomerDesign.objects.filter(
+        _mirrorable_url_q('model_url') & Q(mirrored_at__isnull=True)
+    ).only('id', 'model_url', 'model_image')
+
+
+def open_asset(name):
+    """Returns (file, size) for a mirrored asset, or None if the name is invalid or missing."""
+    if not ASSET_NAME_PATTERN.match(name):
+        return None
+    storage_name = f"{MIRROR_DIRECTORY}/{name}"
+    if not default_storage.exists(storage_name):
+        return None
+    return default_storage.open(storage_name, 'rb'), default_storage.size(storage_name)
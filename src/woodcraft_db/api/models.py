@@ -15,6 +15,12 @@ class CustomUser(AbstractUser):
     def __str__(self):
         return self.email
 
+    def get_session_auth_hash(self):
+        # Users restored from the auth cache carry the hash instead of the password (see api.backends).
+        if 'password' in self.get_deferred_fields() and hasattr(self, 'cached_session_auth_hash'):
+            return self.cached_session_auth_hash
+        return super().get_session_auth_hash()
+
 class CustomerAddress(models.Model):
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
     customer_name = models.CharField(max_length=100)
@@ -45,12 +51,21 @@ class CustomerDesign(models.Model):
     material = models.CharField(max_length=100, blank=True, null=True) 
     model_url = models.TextField(null=True, blank=True) 
     model_image = models.TextField(null=True, blank=True) 
+    model_source_url = models.TextField(null=True, blank=True)
+    model_image_source_url = models.TextField(null=True, blank=True)
+    model_checksum = models.CharField(max_length=64, null=True, blank=True)
+    model_image_checksum = models.CharField(max_length=64, null=True, blank=True)
+    mirrored_at = models.DateTimeField(null=True, blank=True)
+    generation = models.ForeignKey(
+        'GenerationTask', related_name='designs', null=True, blank=True, on_delete=models.SET_NULL
+    )
     estimated_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True) 
     final_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     notes = models.TextField(blank=True) 
     status = models.CharField(max_length=20, choices=[ 
         ('pending', 'Pending'), 
         ('generating', 'Generating Model'), 
+        ('generation_failed', 'Generation Failed'),
         ('generated', 'Model Generated'), 
         ('approved', 'Approved'), 
         ('in_progress', 'In Progress'), 
@@ -64,9 +79,54 @@ class CustomerDesign(models.Model):
     class Meta:
         ordering = ['-updated_at']
     
-    def __str__(self): 
+    def __str__(self):
         return f'{self.user} - Custom Design'
-    
+
+class GenerationTask(models.Model):
+    prompt_hash = models.CharField(max_length=64, unique=True)
+    prompt = models.TextField()
+    generation_type = models.CharField(max_length=20, default='text_to_model')
+    preview_task_id = models.CharField(max_length=100, null=True, blank=True)
+    task_id = models.CharField(max_length=100, null=True, blank=True, db_index=True)
+    status = models.CharField(max_length=20, choices=[
+        ('queued', 'Queued'),
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('success', 'Success'),
+        ('failed', 'Failed')
+    ], default='pending')
+    model_url = models.TextField(null=True, blank=True)
+    thumbnail_url = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-updated_at']
+
+    def __str__(self):
+        return f'{self.generation_type} {self.task_id or self.prompt_hash[:12]} - {self.status}'
+
+class RateLimitBucket(models.Model):
+    name = models.CharField(max_length=50, unique=True)
+    tokens = models.FloatField()
+    refilled_at = models.DateTimeField()
+    blocked_until = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f'{self.name} ({self.tokens:.2f} tokens)'
+
+class MaterialMultiplier(models.Model):
+    material = models.CharField(max_length=100, unique=True)
+    multiplier = models.DecimalField(max_digits=5, decimal_places=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['material']
+
+    def __str__(self):
+        return f'{self.material} (x{self.multiplier})'
+
 
     
 class Category(models.Model):
@@ -91,6 +151,10 @@ class Product(models.Model):
     featured = models.BooleanField(default=False)
     image = models.ImageField(upload_to='products/', null=True, blank=True)
     default_material = models.CharField(max_length=50, default='oak')  
+    weight_kg = models.DecimalField(max_digits=7, decimal_places=3, default=1)
+    length_cm = models.FloatField(null=True, blank=True)
+    width_cm = models.FloatField(null=True, blank=True)
+    height_cm = models.FloatField(null=True, blank=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -126,7 +190,10 @@ class Order(models.Model):
 
     class Meta:
         ordering = ['-updated_at']
-        
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='order_user_created_idx'),
+        ]
+
     def __str__(self):
         return f'Order {self.id} - {self.status}'
     
@@ -137,18 +204,105 @@ class OrderItem(models.Model):
     customer_design = models.ForeignKey(CustomerDesign, null=True, blank=True, on_delete=models.SET_NULL)
     quantity = models.PositiveIntegerField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
+    # Snapshot of the line at purchase time; `price` is the unit price paid. Order history renders
+    # from these, so it survives later edits or deletion of the product or design.
+    is_custom_design = models.BooleanField(default=False)
+    item_name = models.CharField(max_length=500, blank=True, default='')
+    item_image = models.TextField(blank=True, default='')
+    item_material = models.CharField(max_length=100, blank=True, default='')
 
     def __str__(self):
-        if self.product:
-            return f'{self.product.name} (x{self.quantity})'
-        return f'Custom Design - {self.customer_design.design_description} (x{self.quantity})'
+        if self.is_custom_design:
+            return f'Custom Design - {self.item_name} (x{self.quantity})'
+        return f'{self.item_name} (x{self.quantity})'
+
+    @staticmethod
+    def snapshot(product=None, customer_design=None):
+        """Snapshot fields for a line of `product` or `customer_design`."""
+        if product is not None:
+            return {
+                'is_custom_design': False,
+                'item_name': product.name,
+                'item_image': product.image.url if product.image else '',
+                'item_material': product.default_material or '',
+            }
+        return {
+            'is_custom_design': True,
+            'item_name': customer_design.design_description,
+            'item_image': customer_design.model_image or '',
+            'item_material': customer_design.material or '',
+        }
 
     def clean(self):
         if not self.product and not self.customer_design:
             raise ValidationError('Either product or customer_design must be set')
         if self.product and self.customer_design:
             raise ValidationError('Cannot set both product and customer_design')
+
+class OrderStatusHistory(models.Model):
+    order = models.ForeignKey(Order, related_name='status_history', on_delete=models.CASCADE)
+    from_status = models.CharField(max_length=20)
+    to_status = models.CharField(max_length=20)
+    changed_by = models.ForeignKey(CustomUser, null=True, blank=True, on_delete=models.SET_NULL)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['order', 'created_at'], name='order_status_history_idx'),
+        ]
+
+    def __str__(self):
+        return f'Order {self.order_id}: {self.from_status} -> {self.to_status}'
         
+class DailySalesRollup(models.Model):
+    day = models.DateField()
+    currency = models.CharField(max_length=10)
+    payment_method = models.CharField(max_length=50)
+    orders = models.PositiveIntegerField(default=0)
+    units = models.PositiveIntegerField(default=0)
+    # What customers paid: order totals, shipping included.
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['day']
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'currency', 'payment_method'], name='daily_sales_rollup_unique')
+        ]
+
+    def __str__(self):
+        return f'{self.day} {self.currency} {self.payment_method}: {self.revenue}'
+
+class DailyProductSalesRollup(models.Model):
+    day = models.DateField(db_index=True)
+    currency = models.CharField(max_length=10)
+    product = models.ForeignKey(Product, null=True, blank=True, on_delete=models.SET_NULL, db_constraint=False)
+    product_name = models.CharField(max_length=200, blank=True)
+    category = models.ForeignKey(Category, null=True, blank=True, on_delete=models.SET_NULL, db_constraint=False)
+    category_name = models.CharField(max_length=200, blank=True)
+    is_custom_design = models.BooleanField(default=False)
+    orders = models.PositiveIntegerField(default=0)
+    units = models.PositiveIntegerField(default=0)
+    # Line totals only; shipping is not attributed to products, so these sum to less than DailySalesRollup.revenue.
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['day']
+
+    def __str__(self):
+        return f'{self.day} {self.product_name or "Custom designs"}: {self.units}'
+
+class StaleRollupDay(models.Model):
+    """A day whose orders changed since its sales rollups were last rebuilt."""
+    day = models.DateField(unique=True)
+    marked_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['marked_at']
+
+    def __str__(self):
+        return f'{self.day} (stale since {self.marked_at})'
+
 class Cart(models.Model):
     user = models.OneToOneField(CustomUser, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -249,7 +403,7 @@ class Payment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return f'Payment for Order {self.order.id}'
+        return f'Payment for Order {self.order_id}'
 
 class ShippingAddress(models.Model):
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
@@ -262,7 +416,7 @@ class ShippingAddress(models.Model):
     country = models.CharField(max_length=100)
 
     def __str__(self):
-        return f'Review by {self.user.email} for {self.product.name}'   
+        return f'Shipping for Order {self.order_id} - {self.city}, {self.country}'
         
 class Review(models.Model):
     product = models.ForeignKey(Product, related_name='reviews', on_delete=models.CASCADE)
@@ -0,0 +1,68 @@
+from collections import defaultdict
+from django.db import transaction
+from django.utils import timezone
+from .analytics import EXCLUDED_ORDER_STATUSES, mark_rollups_stale, order_day
+from .models import Order, OrderStatusHistory
+
+ORDER_STATUSES = [value for value, _ in Order._meta.get_field('status').choices]
+# Fulfilment only moves forward; delivered and cancelled orders are final.
+ALLOWED_TRANSITIONS = {
+    'pending': {'processing', 'shipped', 'cancelled'},
+    'processing': {'shipped', 'cancelled'},
+    'shipped': {'delivered'},
+    'delivered': set(),
+    'cancelled': set(),
+}
+MAX_BULK_ORDERS = 1000
+
+
+def transition_orders(order_ids, status, changed_by=None, enforce_transitions=True):
+    """
+    Moves the given orders to `status`. Orders are locked and grouped by their current
+    status, each group is moved with one UPDATE, and a history row is written per order.
+    With enforce_transitions=False any move is allowed, so staff can correct a mistaken status.
+    Returns one result dict per requested id, in request order.
+    """
+    if status not in ORDER_STATUSES:
+        raise ValueError(f"Invalid status '{status}'. Must be one of: {', '.join(ORDER_STATUSES)}")
+    order_ids = list(dict.fromkeys(order_ids))
+
+    results = {}
+    changed_days = set()
+    with transaction.atomic():
+        orders = {
+            order.id: order
+            for order in Order.objects.select_for_update().filter(id__in=order_ids).only('id', 'status', 'created_at')
+        }
+        by_source = defaultdict(list)
+        for order_id in order_ids:
+            order = orders.get(order_id)
+            if order is None:
+                results[order_id] = {'id': order_id, 'result': 'not_found'}
+            elif order.status == status:
+                results[order_id] = {'id': order_id, 'result': 'unchanged', 'status': status}
+            elif enforce_transitions and status not in ALLOWED_TRANSITIONS.get(order.status, set()):
+                results[order_id] = {
+                    'id': order_id, 'result': 'invalid_transition',
+                    'error': f"Cannot change a {order.status} order to {status}",
+                }
+            else:
+                by_source[order.status].append(order)
+
+        now = timezone.now()
+        history = []
+        for source, group in by_source.items():
+            ids = [order.id for order in group]
+            Order.objects.filter(id__in=ids, status=source).update(status=status, updated_at=now)
+            for order in group:
+                history.append(OrderStatusHistory(
+                    order_id=order.id, from_status=source, to_status=status, changed_by=changed_by,
+                ))
+                results[order.id] = {'id': order.id, 'result': 'updated', 'from_status': source, 'status': status}
+                if source in EXCLUDED_ORDER_STATUSES or status in EXCLUDED_ORDER_STATUSES:
+                    changed_days.add(order_day(order))
+        OrderStatusHistory.objects.bulk_create(history)
+        # Cancelling an order removes it from the sales rollups for its day.
+        mark_rollups_stale(changed_days)
+
+    return [results[order_id] for order_id in order_ids]
@@ -0,0 +1,26 @@
+import base64
+import json
+
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(values):
+    """Encodes the sort key of the last row on a page into an opaque, URL-safe cursor."""
+    raw = json.dumps(values, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Returns the list of values encoded by encode_cursor; raises ValueError for a malformed cursor."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, UnicodeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def page_size(limit):
+    return max(1, min(limit, MAX_PAGE_SIZE))
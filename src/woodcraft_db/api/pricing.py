@@ -0,0 +1,110 @@
+from django.core.cache import cache
+from .models import MaterialMultiplier
+
+BASE_PRICE = 2500
+DEFAULT_MATERIAL_FACTOR = 1.0
+MAX_BATCH_SIZE = 5000
+
+MATERIAL_MULTIPLIERS_CACHE_KEY = 'pricing:material_multipliers'
+MATERIAL_MULTIPLIERS_CACHE_TIMEOUT = 300
+
+
+def get_material_multipliers():
+    """Returns {material: multiplier}, read from the database at most once per cache timeout."""
+    multipliers = cache.get(MATERIAL_MULTIPLIERS_CACHE_KEY)
+    if multipliers is None:
+        multipliers = {
+            material: float(multiplier)
+            for material, multiplier in MaterialMultiplier.objects.values_list('material', 'multiplier')
+        }
+        cache.set(MATERIAL_MULTIPLIERS_CACHE_KEY, multipliers, MATERIAL_MULTIPLIERS_CACHE_TIMEOUT)
+    return multipliers
+
+
+def invalidate_material_multipliers():
+    cache.delete(MATERIAL_MULTIPLIERS_CACHE_KEY)
+
+
+def format_production_time(production_days):
+    if production_days > 14:
+        production_weeks = (production_days + 6) // 7
+        return f"{production_weeks} weeks"
+    return f"{production_days} days"
+
+
+def quote_batch(widths, heights, thicknesses, materials, design_descriptions=''):
+    """
+    Prices many width/height/thickness/material combinations in one vectorized pass.
+
+    `design_descriptions` is either a single description shared by every row or one
+    description per row. Returns a dict of NumPy arrays aligned with the inputs.
+    """
+    import numpy as np  # Deferred to the first quote so process startup doesn't pay for it.
+
+    width = np.asarray(widths, dtype=float)
+    height = np.asarray(heights, dtype=float)
+    thickness = np.asarray(thicknesses, dtype=float)
+
+    if isinstance(design_descriptions, str):
+        lengths = np.full(width.shape, len(design_descriptions), dtype=float)
+    else:
+        lengths = np.fromiter((len(d or '') for d in design_descriptions), dtype=float, count=width.size)
+
+    multipliers = get_material_multipliers()
+    unique_materials, material_index = np.unique(np.asarray(materials, dtype=str), return_inverse=True)
+    material_factor = np.array(
+        [multipliers.get(material, DEFAULT_MATERIAL_FACTOR) for material in unique_materials],
+        dtype=float,
+    )[material_index]
+
+    complexity_score = np.minimum(100, (lengths / 150) * 100)
+    size_factor = (height * width * thickness) / 1000
+    estimated_price = BASE_PRICE * (complexity_score / 100) * material_factor * np.maximum(1, size_factor)
+    production_days = np.trunc((complexity_score / 10) + (size_factor * 2)).astype(int) + 5
+
+    return {
+        'complexity_score': complexity_score,
+        'material_factor': material_factor,
+        'estimated_price': estimated_price,
+        'production_days': production_days,
+    }
+
+
+def quote_grid(widths, heights, thicknesses, materials, design_description=''):
+    """Prices the full cartesian product of the given dimension and material options."""
+    import numpy as np
+
+    index = np.meshgrid(
+        np.arange(len(widths)),
+        np.arange(len(heights)),
+        np.arange(len(thicknesses)),
+        np.arange(len(materials)),
+        indexing='ij',
+    )
+    width_index, height_index, thickness_index, material_index = (axis.ravel() for axis in index)
+    combinations = {
+        'width': np.asarray(widths, dtype=float)[width_index],
+        'height': np.asarray(heights, dtype=float)[height_index],
+        'thickness': np.asarray(thicknesses, dtype=float)[thickness_index],
+        'material': np.asarray(materials, dtype=str)[material_index],
+    }
+    quotes = quote_batch(
+        combinations['width'],
+        combinations['height'],
+        combinations['thickness'],
+        combinations['material'],
+        design_description,
+    )
+    return combinations, quotes
+
+
+def quote_design(width, height, thickness, material, design_description=''):
+    """Quotes a single design; the configurator uses this before any model generation."""
+    quotes = quote_batch([width], [height], [thickness], [material or ''], design_description)
+    production_days = int(quotes['production_days'][0])
+    return {
+        'estimated_price': float(quotes['estimated_price'][0]),
+        'complexity_score': float(quotes['complexity_score'][0]),
+        'production_days': production_days,
+        'production_time': format_production_time(production_days),
+    }
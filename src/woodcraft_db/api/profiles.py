@@ -0,0 +1,44 @@
+import time
+from django.core.cache import cache
+
+PROFILE_CACHE_TIMEOUT = 60 * 60
+
+
+def profile_cache_key(user_id):
+    return f'user_profile:{user_id}'
+
+
+def build_user_profile(user):
+    """The profile payload shared by /login and /user, stamped with the time it was built."""
+    profile = {
+        "id": user.id,
+        "email": user.email,
+        "firstName": user.first_name,
+        "lastName": user.last_name,
+    }
+    if user.is_superuser:
+        profile["is_admin"] = True
+    else:
+        profile.update({
+            "address": user.address,
+            "phoneNumber": user.phone_number,
+            "gender": user.gender,
+            "dateOfBirth": user.date_of_birth,
+            "profilePicture": user.profile_picture.url if user.profile_picture else None,
+            "is_admin": False,
+        })
+    profile["version"] = int(time.time() * 1000)
+    return profile
+
+
+def get_user_profile(user):
+    key = profile_cache_key(user.id)
+    profile = cache.get(key)
+    if profile is None:
+        profile = build_user_profile(user)
+        cache.set(key, profile, PROFILE_CACHE_TIMEOUT)
+    return profile
+
+
+def invalidate_user_profile(user_id):
+    cache.delete(profile_cache_key(user_id))
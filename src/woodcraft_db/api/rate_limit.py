@@ -0,0 +1,74 @@
+from datetime import timedelta
+from django.db import transaction
+from django.utils import timezone
+from .models import RateLimitBucket
+
+
+def _lock_bucket(name, capacity):
+    bucket, _ = RateLimitBucket.objects.select_for_update().get_or_create(
+        name=name,
+        defaults={'tokens': capacity, 'refilled_at': timezone.now()},
+    )
+    return bucket
+
+
+def _refill(bucket, rate_per_second, capacity, now):
+    # Tokens do not accumulate while the bucket is blocked.
+    start = bucket.refilled_at
+    if bucket.blocked_until and bucket.blocked_until > start:
+        start = min(bucket.blocked_until, now)
+    elapsed = max(0.0, (now - start).total_seconds())
+    bucket.tokens = min(capacity, bucket.tokens + elapsed * rate_per_second)
+    bucket.refilled_at = now
+
+
+def take_token(name, rate_per_second, capacity, admit=None):
+    """
+    Takes one token from the named bucket, shared by every worker through a locked row.
+
+    `admit`, when given, is called while the bucket is locked and returns the number of
+    seconds to wait (0 to admit); this serializes extra admission checks such as a
+    concurrency limit across workers. Returns 0 when a token was taken, otherwise the
+    estimated number of seconds until one will be available.
+    """
+    with transaction.atomic():
+        bucket = _lock_bucket(name, capacity)
+        now = timezone.now()
+        _refill(bucket, rate_per_second, capacity, now)
+
+        if bucket.blocked_until and bucket.blocked_until > now:
+            wait = (bucket.blocked_until - now).total_seconds()
+        elif bucket.tokens < 1:
+            wait = (1 - bucket.tokens) / rate_per_second
+        else:
+            wait = admit() if admit else 0
+            if not wait:
+                bucket.tokens -= 1
+
+        bucket.save(update_fields=['tokens', 'refilled_at'])
+        return wait
+
+
+def token_wait(name, rate_per_second, capacity):
+    """Seconds until the named bucket will next have a token, without taking one."""
+    bucket = RateLimitBucket.objects.filter(name=name).first()
+    if bucket is None:
+        return 0
+    now = timezone.now()
+    _refill(bucket, rate_per_second, capacity, now)
+    if bucket.blocked_until and bucket.blocked_until > now:
+        return (bucket.blocked_until - now).total_seconds()
+    if bucket.tokens >= 1:
+        return 0
+    return (1 - bucket.tokens) / rate_per_second
+
+
+def block(name, seconds, capacity):
+    """Empties the bucket and refuses tokens for `seconds`, e.g. after the upstream returned 503."""
+    with transaction.atomic():
+        bucket = _lock_bucket(name, capacity)
+        now = timezone.now()
+        bucket.tokens = 0
+        bucket.refilled_at = now
+        bucket.blocked_until = now + timedelta(seconds=seconds)
+        bucket.save(update_fields=['tokens', 'refilled_at', 'blocked_until'])
@@ -1,6 +1,6 @@
 from ninja import ModelSchema, Schema
 from .models import CustomUser as User, CustomerDesign, Category, Product, CartItem, Order, CustomerAddress
-from typing import List, Optional
+from typing import Dict, List, Optional
 import decimal
 
 class SignInSchema(ModelSchema):
@@ -30,8 +30,9 @@ class CreateCustomerDesignSchema(Schema):
     height: float
     thickness: float
     estimated_price: float
-    model_url: str
-    model_image: str
+    model_url: str = None
+    model_image: str = None
+    generation_id: str = None
     notes: str = None
     final_price: float = None
 
@@ -50,6 +51,30 @@ class FetchCustomerDesignsSchema(ModelSchema):
     def resolve_dimensions(obj):
         return f"{obj.width} x {obj.height} x {obj.thickness}"
 
+class DesignReviewItemSchema(ModelSchema):
+    name: str
+    dimensions: str
+    estimated_price: Optional[float]
+    final_price: Optional[float]
+    class Meta:
+        model = CustomerDesign
+        fields = ['id', 'user', 'design_description', 'decoration_type', 'material', 'width', 'height',
+                  'thickness', 'estimated_price', 'final_price', 'status', 'notes', 'is_added_to_cart',
+                  'created_at', 'updated_at']
+    @staticmethod
+    def resolve_name(obj):
+        return f"{obj.user.first_name} {obj.user.last_name}"
+    @staticmethod
+    def resolve_dimensions(obj):
+        return f"{obj.width} x {obj.height} x {obj.thickness}"
+
+class DesignReviewQueueSchema(Schema):
+    success: bool = None
+    items: List[DesignReviewItemSchema] = []
+    next_cursor: Optional[str] = None
+    counts: Dict[str, int] = {}
+    error: Optional[str] = None
+
 class ApproveDesignSchema(Schema):
     final_price: float
 
@@ -77,6 +102,9 @@ class ProductSchema(ModelSchema):
 
     @staticmethod
     def resolve_is_best_seller(obj):
+        # The catalog snapshot precomputes the best seller once instead of querying per product.
+        if hasattr(obj, 'best_seller_id'):
+            return obj.id == obj.best_seller_id
         return obj.is_best_seller
     
 class AddProductSchema(Schema):
@@ -112,12 +140,27 @@ class CartItemSchema(Schema):
 class UpdateCartItemSchema(Schema):
     quantity: int
 
+class GuestCartItemSchema(Schema):
+    product_id: int
+    quantity: int = 1
+
 class CheckoutSessionSchema(Schema):
     user_id: int
     currency: str
     success_url: str
     cancel_url: str
 
+class ShippingQuoteItemSchema(Schema):
+    product_id: int
+    quantity: int = 1
+
+class ShippingQuoteSchema(Schema):
+    user_id: Optional[int] = None
+    region: Optional[str] = None
+    province: Optional[str] = None
+    currency: str = 'php'
+    items: Optional[List[ShippingQuoteItemSchema]] = None
+
 class CheckoutSessionResponseSchema(Schema):
     session_id: str | None = None
     url: str | None = None
@@ -130,7 +173,7 @@ class OrderItemSchema(Schema):
     
     @staticmethod
     def resolve_product_name(obj):
-        return obj.product.name if obj.product else None
+        return obj.item_name
 
 class OrderSchema(Schema):
     order_id: int
@@ -154,6 +197,25 @@ class OrderSchema(Schema):
 class UpdateOrderStatusSchema(Schema):
     status: str
 
+class BulkOrderStatusSchema(Schema):
+    order_ids: List[int]
+    status: str
+
+class CustomerDirectoryItemSchema(Schema):
+    id: int
+    email: str
+    name: str
+    date_joined: str
+    order_count: int
+    lifetime_spend: float
+    last_order_at: Optional[str] = None
+
+class CustomerDirectorySchema(Schema):
+    success: bool = None
+    customers: List[CustomerDirectoryItemSchema] = []
+    next_cursor: Optional[str] = None
+    error: Optional[str] = None
+
 class UpdateCustomerInfoSchema(Schema):
     first_name:str 
     last_name: str
@@ -188,4 +250,21 @@ class BaseAddressSchema(Schema):
 class GetCustomerAddressSchema(Schema):
     success: bool = None
     addresses: List[BaseAddressSchema]
-    error: Optional[str] = None
\ No newline at end of file
+    error: Optional[str] = None
+
+class QuoteItemSchema(Schema):
+    width: float
+    height: float
+    thickness: float
+    material: str
+
+class QuoteGridSchema(Schema):
+    widths: List[float]
+    heights: List[float]
+    thicknesses: List[float]
+    materials: List[str]
+
+class QuoteBatchSchema(Schema):
+    design_description: str = ''
+    items: List[QuoteItemSchema] = []
+    grid: Optional[QuoteGridSchema] = None
@@ -0,0 +1,316 @@
+import logging
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+from .addresses import get_gazetteer
+from .catalog import bump_catalog_version
+from .models import (
+    Cart, CartItem, Category, CustomerAddress, CustomerDesign, CustomUser, Order, OrderItem, Product,
+)
+from .shipping import WOOD_DENSITY_KG_PER_CM3
+
+logger = logging.getLogger(__name__)
+
+# Seeded rows are recognisable by these markers, so they can be cleared without touching real data.
+SEED_EMAIL_DOMAIN = 'seed.woodcraft.test'
+SEED_CATEGORY_PREFIX = 'Seed '
+SEED_PASSWORD = 'seed-password'
+
+MATERIALS = ('oak', 'maple', 'pine', 'mahogany', 'walnut')
+MATERIAL_WEIGHTS = (30, 15, 25, 20, 10)
+PRODUCT_NOUNS = (
+    'Table', 'Chair', 'Bench', 'Shelf', 'Cabinet', 'Stool', 'Desk', 'Bed Frame', 'Wall Carving',
+    'Serving Tray', 'Jewelry Box', 'Plaque', 'Clock', 'Mirror Frame', 'Chopping Board',
+)
+PRODUCT_ADJECTIVES = ('Rustic', 'Carved', 'Classic', 'Modern', 'Heritage', 'Minimal', 'Handcrafted', 'Ornate')
+DESIGN_MOTIFS = (
+    'eagle', 'carabao', 'sampaguita', 'mountain landscape', 'family name', 'sunburst', 'fish',
+    'mango tree', 'church facade', 'jeepney', 'tribal pattern', 'rose vine',
+)
+ORDER_STATUSES = ('delivered', 'shipped', 'processing', 'pending', 'cancelled')
+ORDER_STATUS_WEIGHTS = (60, 10, 8, 12, 10)
+PAYMENT_METHODS = ('stripe', 'cash_on_delivery', 'gcash')
+PAYMENT_METHOD_WEIGHTS = (70, 20, 10)
+CURRENCIES = ('PHP', 'USD', 'CAD')
+CURRENCY_WEIGHTS = (85, 10, 5)
+DESIGN_STATUSES = ('generated', 'approved', 'pending', 'rejected', 'completed', 'in_progress')
+DESIGN_STATUS_WEIGHTS = (35, 25, 15, 10, 10, 5)
+# Share of a product's bounding box that is actually wood, for a plausible shipping weight.
+SOLID_FRACTION = 0.1
+FIRST_NAMES = ('Juan', 'Maria', 'Jose', 'Ana', 'Mark', 'Grace', 'Paolo', 'Liza', 'Carlo', 'Bea', 'Miguel', 'Joy')
+LAST_NAMES = ('Santos', 'Reyes', 'Cruz', 'Bautista', 'Garcia', 'Mendoza', 'Torres', 'Ramos', 'Flores', 'Aquino')
+
+
+@contextmanager
+def manual_timestamps(*models):
+    """Lets bulk_create write the generated created_at/updated_at instead of now()."""
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class ScaleSeeder:
+    """
+    Generates a deterministic synthetic dataset. Every choice comes from one Random(seed), and
+    rows are written with bulk_create a batch at a time, so memory stays flat at any volume.
+
+    Popularity is skewed like real traffic: a few products take most sales (Pareto weights) and
+    orders per customer follow a geometric distribution, so most customers order once or twice.
+    """
+
+    def __init__(self, seed=0, batch_size=5000, days=365, stdout=None):
+        self.rng = random.Random(seed)
+        self.seed = seed
+        self.batch_size = batch_size
+        self.days = days
+        # Anchored to midnight so the same seed gives the same timestamps all day.
+        self.now = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        self.stdout = stdout
+        self.counts = {}
+
+    def _log(self, message):
+        if self.stdout is not None:
+            self.stdout.write(message)
+        else:
+            logger.info(message)
+
+    def _timestamp(self, not_before=None):
+        start = not_before or self.now - timedelta(days=self.days)
+        span_seconds = max(1, int((self.now - start).total_seconds()))
+        return start + timedelta(seconds=self.rng.randrange(span_seconds))
+
+    def _insert(self, model, rows):
+        created = model.objects.bulk_create(rows, batch_size=self.batch_size)
+        self.counts[model.__name__] = self.counts.get(model.__name__, 0) + len(created)
+        return created
+
+    def _batches(self, total):
+        for start in range(0, total, self.batch_size):
+            yield start, min(self.batch_size, total - start)
+
+    @staticmethod
+    def clear():
+        """Deletes previously seeded rows; users cascade to their carts, designs, addresses and orders."""
+        users, _ = CustomUser.objects.filter(email__endswith=f'@{SEED_EMAIL_DOMAIN}').delete()
+        categories, _ = Category.objects.filter(name__startswith=SEED_CATEGORY_PREFIX).delete()
+        return users + categories
+
+    def run(self, users, categories, products, designs, orders, cart_fraction, addresses_per_user):
+        started = time.monotonic()
+        with manual_timestamps(CustomUser, Category, Product, CustomerDesign, CustomerAddress, Order, Cart):
+            category_ids = self.seed_categories(categories)
+            product_rows = self.seed_products(products, category_ids)
+            user_ids = self.seed_users(users)
+            self.seed_addresses(user_ids, addresses_per_user)
+            design_rows = self.seed_designs(user_ids, designs)
+            self.seed_carts(user_ids, product_rows, cart_fraction)
+            self.seed_orders(user_ids, product_rows, design_rows, orders)
+        bump_catalog_version()
+        elapsed = time.monotonic() - started
+        total = sum(self.counts.values())
+        self._log(f"Seeded {total} rows in {elapsed:.1f}s ({total / max(elapsed, 0.001):.0f} rows/s)")
+        return self.counts
+
+    def seed_categories(self, total):
+        rows = [
+            Category(name=f"{SEED_CATEGORY_PREFIX}{PRODUCT_NOUNS[i % len(PRODUCT_NOUNS)]}s {i // len(PRODUCT_NOUNS) + 1}",
+                     created_at=self._timestamp(), updated_at=self.now)
+            for i in range(total)
+        ]
+        return [category.id for category in self._insert(Category, rows)]
+
+    def seed_products(self, total, category_ids):
+        """Returns [(id, price, name, material, popularity)]; popularity drives cart and order picks."""
+        products = []
+        for start, size in self._batches(total):
+            rows = []
+            for i in range(start, start + size):
+                length, width, height = (round(self.rng.uniform(10, 200), 1) for _ in range(3))
+                rows.append(Product(
+                    category_id=self.rng.choice(category_ids),
+                    name=f"{self.rng.choice(PRODUCT_ADJECTIVES)} {self.rng.choice(PRODUCT_NOUNS)} #{i + 1}",
+                    description="Synthetic product for scale testing.",
+                    price=Decimal(f"{self.rng.lognormvariate(7.5, 0.8):.2f}"),
+                    stock=self.rng.randrange(0, 200),
+                    featured=self.rng.random() < 0.05,
+                    default_material=self.rng.choices(MATERIALS, MATERIAL_WEIGHTS)[0],
+                    weight_kg=Decimal(f"{length * width * height * WOOD_DENSITY_KG_PER_CM3 * SOLID_FRACTION:.3f}"),
+                    length_cm=length, width_cm=width, height_cm=height,
+                    created_at=self._timestamp(), updated_at=self.now,
+                ))
+            products.extend(
+                (product.id, product.price, product.name, product.default_material, self.rng.paretovariate(1.2))
+                for product in self._insert(Product, rows)
+            )
+        self._log(f"Products: {len(products)}")
+        return products
+
+    def seed_users(self, total):
+        password = make_password(SEED_PASSWORD)  # Hashing once keeps PBKDF2 off the per-row path.
+        user_ids = []
+        self.cart_ids = {}
+        for start, size in self._batches(total):
+            rows = []
+            for i in range(start, start + size):
+                email = f"user{i + 1}.s{self.seed}@{SEED_EMAIL_DOMAIN}"
+                rows.append(CustomUser(
+                    username=email, email=email, password=password,
+                    first_name=self.rng.choice(FIRST_NAMES), last_name=self.rng.choice(LAST_NAMES),
+                    phone_number=f"09{self.rng.randrange(10 ** 9):09d}",
+                    date_joined=self._timestamp(),
+                ))
+            user_ids.extend(user.id for user in self._insert(CustomUser, rows))
+            # Every account has a cart, as registration creates one.
+            carts = self._insert(Cart, [Cart(user_id=user_id, created_at=self.now) for user_id in user_ids[start:]])
+            self.cart_ids.update((cart.user_id, cart.id) for cart in carts)
+        self._log(f"Users: {len(user_ids)}")
+        return user_ids
+
+    def seed_addresses(self, user_ids, per_user):
+        places = [
+            (region['name'], province['name'], city['name'])
+            for region in get_gazetteer().regions
+            for province in region['provinces']
+            for city in province['cities']
+        ]
+        for start, size in self._batches(len(user_ids)):
+            rows = []
+            for user_id in user_ids[start:start + size]:
+                for n in range(max(0, round(self.rng.expovariate(1 / per_user))) if per_user else 0):
+                    region, province, city = self.rng.choice(places)
+                    street = f"{self.rng.randrange(1, 999)} Mabini St."
+                    rows.append(CustomerAddress(
+                        user_id=user_id,
+                        customer_name=f"{self.rng.choice(FIRST_NAMES)} {self.rng.choice(LAST_NAMES)}",
+                        customer_phone_number=f"09{self.rng.randrange(10 ** 9):09d}",
+                        region=region, province=province, city=city,
+                        barangay=f"Barangay {self.rng.randrange(1, 200)}",
+                        postal_code=f"{self.rng.randrange(1000, 9999)}",
+                        street=street,
+                        customer_address=f"{street}, {city}, {province}",
+                        is_default=n == 0,
+                        created_at=self._timestamp(), updated_at=self.now,
+                    ))
+            self._insert(CustomerAddress, rows)
+        self._log(f"Addresses: {self.counts.get('CustomerAddress', 0)}")
+
+    def seed_designs(self, user_ids, total):
+        """Returns {user_id: [(design_id, price)]} for designs that can be ordered."""
+        orderable = {}
+        for start, size in self._batches(total):
+            rows = []
+            for _ in range(size):
+                width, height = round(self.rng.uniform(6, 48), 1), round(self.rng.uniform(6, 48), 1)
+                status = self.rng.choices(DESIGN_STATUSES, DESIGN_STATUS_WEIGHTS)[0]
+                estimated = Decimal(f"{self.rng.lognormvariate(8, 0.6):.2f}")
+                rows.append(CustomerDesign(
+                    user_id=self.rng.choice(user_ids),
+                    design_description=f"{self.rng.choice(DESIGN_MOTIFS).title()} carving, {width}x{height} in",
+                    width=width, height=height, thickness=round(self.rng.uniform(0.5, 3), 1),
+                    decoration_type=self.rng.choice(('wall_decor', 'furniture', 'signage')),
+                    material=self.rng.choices(MATERIALS, MATERIAL_WEIGHTS)[0],
+                    estimated_price=estimated,
+                    final_price=estimated if status in ('approved', 'completed', 'in_progress') else None,
+                    status=status,
+                    created_at=self._timestamp(), updated_at=self.now,
+                ))
+            for design in self._insert(CustomerDesign, rows):
+                if design.final_price is not None:
+                    orderable.setdefault(design.user_id, []).append(
+                        (design.id, design.final_price, design.design_description, design.material)
+                    )
+        self._log(f"Designs: {self.counts.get('CustomerDesign', 0)}")
+        return orderable
+
+    def seed_carts(self, user_ids, products, fraction):
+        product_ids = [product[0] for product in products]
+        weights = [product[-1] for product in products]
+        rows = []
+        for user_id in user_ids:
+            if self.rng.random() >= fraction:
+                continue
+            picks = set(self.rng.choices(product_ids, weights, k=self.rng.randint(1, 5)))
+            rows.extend(
+                CartItem(cart_id=self.cart_ids[user_id], product_id=product_id, quantity=self.rng.randint(1, 3))
+                for product_id in picks
+            )
+            if len(rows) >= self.batch_size:
+                self._insert(CartItem, rows)
+                rows = []
+        self._insert(CartItem, rows)
+        self._log(f"Cart items: {self.counts.get('CartItem', 0)}")
+
+    def seed_orders(self, user_ids, products, designs, total):
+        products_by_id = {product[0]: product for product in products}
+        product_ids = list(products_by_id)
+        cumulative = []
+        running = 0.0
+        for product in products:
+            running += product[-1]
+            cumulative.append(running)
+
+        # Repeat customers: a geometric number of orders per customer, drawn until `total` is reached.
+        buyers = []
+        while len(buyers) < total:
+            user_id = self.rng.choice(user_ids)
+            repeats = 1
+            while self.rng.random() < 0.45 and len(buyers) + repeats < total:
+                repeats += 1
+            buyers.extend([user_id] * repeats)
+
+        for start, size in self._batches(total):
+            with transaction.atomic():
+                orders, lines = [], []
+                for user_id in buyers[start:start + size]:
+                    created_at = self._timestamp()
+                    order_lines = []
+                    for _ in range(min(8, 1 + int(self.rng.expovariate(0.8)))):
+                        quantity = self.rng.choices((1, 2, 3, 4), (70, 20, 7, 3))[0]
+                        user_designs = designs.get(user_id)
+                        if user_designs and self.rng.random() < 0.1:
+                            design_id, price, description, material = self.rng.choice(user_designs)
+                            order_lines.append(dict(
+                                customer_design_id=design_id, quantity=quantity, price=price,
+                                is_custom_design=True, item_name=description, item_material=material or '',
+                            ))
+                        else:
+                            product_id, price, name, material, _ = products_by_id[
+                                self.rng.choices(product_ids, cum_weights=cumulative)[0]
+                            ]
+                            order_lines.append(dict(
+                                product_id=product_id, quantity=quantity, price=price,
+                                item_name=name, item_material=material,
+                            ))
+                    total_price = sum(line['price'] * line['quantity'] for line in order_lines)
+                    status = self.rng.choices(ORDER_STATUSES, ORDER_STATUS_WEIGHTS)[0]
+                    orders.append(Order(
+                        user_id=user_id,
+                        status=status,
+                        address=f"{self.rng.randrange(1, 999)} Mabini St., Seed City",
+                        total_price=total_price,
+                        currency=self.rng.choices(CURRENCIES, CURRENCY_WEIGHTS)[0],
+                        payment_method=self.rng.choices(PAYMENT_METHODS, PAYMENT_METHOD_WEIGHTS)[0],
+                        created_at=created_at,
+                        updated_at=created_at if status == 'pending' else self._timestamp(created_at),
+                    ))
+                    lines.append(order_lines)
+                orders = self._insert(Order, orders)
+                self._insert(OrderItem, [
+                    OrderItem(order_id=order.id, **line)
+                    for order, order_lines in zip(orders, lines) for line in order_lines
+                ])
+            self._log(f"Orders: {start + size}/{total}")
@@ -0,0 +1,156 @@
+import math
+from decimal import ROUND_CEILING, Decimal
+from functools import lru_cache
+from .addresses import get_gazetteer
+
+# Parcels ship from Metro Manila. Rates are in PHP: the first kilogram, then each further kilogram.
+SHIPPING_SERVICES = {
+    'standard': 'Standard Shipping',
+    'express': 'Express Shipping',
+}
+SHIPPING_ZONES = {
+    'metro_manila': {
+        'standard': {'base': Decimal('100'), 'per_kg': Decimal('30'), 'days': (1, 3)},
+        'express': {'base': Decimal('180'), 'per_kg': Decimal('45'), 'days': (1, 1)},
+    },
+    'luzon': {
+        'standard': {'base': Decimal('150'), 'per_kg': Decimal('45'), 'days': (3, 7)},
+        'express': {'base': Decimal('250'), 'per_kg': Decimal('70'), 'days': (1, 3)},
+    },
+    'visayas': {
+        'standard': {'base': Decimal('180'), 'per_kg': Decimal('55'), 'days': (5, 10)},
+        'express': {'base': Decimal('300'), 'per_kg': Decimal('85'), 'days': (2, 4)},
+    },
+    'mindanao': {
+        'standard': {'base': Decimal('200'), 'per_kg': Decimal('60'), 'days': (5, 12)},
+        'express': {'base': Decimal('330'), 'per_kg': Decimal('95'), 'days': (2, 5)},
+    },
+}
+ZONE_BY_REGION_CODE = {
+    'NCR': 'metro_manila',
+    'CAR': 'luzon', 'I': 'luzon', 'II': 'luzon', 'III': 'luzon', 'IV-A': 'luzon', 'IV-B': 'luzon', 'V': 'luzon',
+    'VI': 'visayas', 'VII': 'visayas', 'NIR': 'visayas', 'VIII': 'visayas',
+    'IX': 'mindanao', 'X': 'mindanao', 'XI': 'mindanao', 'XII': 'mindanao', 'XIII': 'mindanao', 'BARMM': 'mindanao',
+}
+# Island provinces served by sea or small-aircraft hops cost more and take longer.
+REMOTE_PROVINCES = {
+    'Basilan', 'Batanes', 'Biliran', 'Camiguin', 'Catanduanes', 'Dinagat Islands', 'Guimaras', 'Marinduque',
+    'Masbate', 'Palawan', 'Romblon', 'Siquijor', 'Sulu', 'Tawi-Tawi',
+}
+REMOTE_SURCHARGE = Decimal('150')
+REMOTE_EXTRA_DAYS = 3
+# Without a known destination, quote the farthest domestic zone so checkout never undercharges.
+FALLBACK_ZONE = 'mindanao'
+
+VOLUMETRIC_DIVISOR = 5000  # cm³ per billable kg, the usual courier divisor.
+WEIGHT_STEP_KG = 0.5
+DEFAULT_PRODUCT_WEIGHT_KG = 1.0
+# Custom designs are priced from inches; solid wood averages about 0.7 g/cm³.
+CUBIC_INCH_CM3 = 16.387
+WOOD_DENSITY_KG_PER_CM3 = 0.0007
+
+
+def _build_zone_table():
+    """Maps every gazetteer province to (zone, remote), computed once from the region hierarchy."""
+    table = {}
+    for region in get_gazetteer().regions:
+        zone = ZONE_BY_REGION_CODE[region['code']]
+        for province in region['provinces']:
+            table[province['name']] = (zone, province['name'] in REMOTE_PROVINCES)
+    return table
+
+
+_zone_table = None
+
+
+def destination_zone(region=None, province=None):
+    """Returns (zone, remote) for a CustomerAddress-style region/province."""
+    global _zone_table
+    if _zone_table is None:
+        _zone_table = _build_zone_table()
+    gazetteer = get_gazetteer()
+    province_entry = gazetteer.find_province(province) if province else None
+    if province_entry is not None:
+        return _zone_table[province_entry['name']]
+    region_entry = gazetteer.find_region(region) if region else None
+    if region_entry is not None:
+        return ZONE_BY_REGION_CODE[region_entry['code']], False
+    return FALLBACK_ZONE, False
+
+
+def product_weight_kg(product):
+    """Billable weight of one unit: the greater of actual and volumetric weight."""
+    weight = float(product.weight_kg or DEFAULT_PRODUCT_WEIGHT_KG)
+    if product.length_cm and product.width_cm and product.height_cm:
+        weight = max(weight, product.length_cm * product.width_cm * product.height_cm / VOLUMETRIC_DIVISOR)
+    return weight
+
+
+def design_weight_kg(design):
+    volume_cm3 = (design.width or 0) * (design.height or 0) * (design.thickness or 0) * CUBIC_INCH_CM3
+    return max(volume_cm3 * WOOD_DENSITY_KG_PER_CM3, volume_cm3 / VOLUMETRIC_DIVISOR, WEIGHT_STEP_KG)
+
+
+def cart_weight_kg(cart_items):
+    """Total billable weight; expects product and customer_design to be loaded with the items."""
+    total = 0.0
+    for item in cart_items:
+        if item.product is not None:
+            total += product_weight_kg(item.product) * item.quantity
+        elif item.customer_design is not None:
+            total += design_weight_kg(item.customer_design) * item.quantity
+    return total
+
+
+@lru_cache(maxsize=1024)
+def _zone_rates(zone, remote, billable_steps):
+    billable_kg = Decimal(billable_steps) * Decimal(str(WEIGHT_STEP_KG))
+    extra_kg = max(Decimal('0'), billable_kg - 1).to_integral_value(rounding=ROUND_CEILING)
+    options = []
+    for service, rate in SHIPPING_ZONES[zone].items():
+        amount = rate['base'] + rate['per_kg'] * extra_kg
+        min_days, max_days = rate['days']
+        if remote:
+            amount += REMOTE_SURCHARGE
+            min_days, max_days = min_days + REMOTE_EXTRA_DAYS, max_days + REMOTE_EXTRA_DAYS
+        options.append({
+            'service': service,
+            'name': SHIPPING_SERVICES[service],
+            'amount': amount,
+            'min_days': min_days,
+            'max_days': max_days,
+        })
+    return tuple(options)
+
+
+def quote_shipping(weight_kg, region=None, province=None):
+    """Shipping options in PHP for a parcel of `weight_kg` to the given region/province."""
+    zone, remote = destination_zone(region, province)
+    billable_steps = max(1, math.ceil(weight_kg / WEIGHT_STEP_KG - 1e-9))
+    return {
+        'zone': zone,
+        'remote': remote,
+        'billable_weight_kg': billable_steps * WEIGHT_STEP_KG,
+        'options': [dict(option) for option in _zone_rates(zone, remote, billable_steps)],
+    }
+
+
+def stripe_shipping_options(quote, currency, exchange_rate):
+    """Converts a quote into Checkout `shipping_options` in the session currency's minor units."""
+    return [
+        {
+            "shipping_rate_data": {
+                "display_name": option['name'],
+                "type": "fixed_amount",
+                "fixed_amount": {
+                    "amount": int(option['amount'] * Decimal(str(exchange_rate)) * 100),
+                    "currency": currency,
+                },
+                "delivery_estimate": {
+                    "minimum": {"unit": "business_day", "value": option['min_days']},
+                    "maximum": {"unit": "business_day", "value": option['max_days']},
+                },
+            }
+        }
+        for option in quote['options']
+    ]
@@ -0,0 +1,24 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .backends import invalidate_cached_user
+from .catalog import schedule_catalog_bump
+from .models import Category, CustomUser, MaterialMultiplier, Product
+from .pricing import invalidate_material_multipliers
+from .profiles import invalidate_user_profile
+
+
+@receiver([post_save, post_delete], sender=MaterialMultiplier)
+def material_multiplier_changed(sender, **kwargs):
+    invalidate_material_multipliers()
+
+
+@receiver([post_save, post_delete], sender=CustomUser)
+def user_changed(sender, instance, **kwargs):
+    invalidate_cached_user(instance.pk)
+    invalidate_user_profile(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=Category)
+def catalog_changed(sender, **kwargs):
+    schedule_catalog_bump()
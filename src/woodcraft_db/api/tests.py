@@ -1,3 +1,1383 @@
-from django.test import TestCase
+import contextvars
+import gzip
+import hashlib
+import importlib
+import io
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from unittest import mock
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.contrib.sessions.backends.cached_db import KEY_PREFIX
+from django.contrib.sessions.backends.db import SessionStore as DatabaseSessionStore
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.http import HttpResponse
+from django.middleware.http import ConditionalGetMiddleware
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from fake_services.faults import FaultInjector
+from . import http_client
+from .addresses import AddressValidationError, get_gazetteer
+from .ai_service import (
+    _join_generation, _record_task_status, generation_cache_key, get_generation_status, initiate_task_id,
+    settle_finished_designs,
+)
+from .analytics import order_day, rebuild_rollups, refresh_stale_rollups
+from .backends import CachedModelBackend, user_cache_key
+from .catalog import _process_snapshot, build_catalog_snapshot, catalog_etag, catalog_version
+from .catalog_io import import_products
+from .compression import AVAILABLE_ENCODINGS, negotiate_encoding
+from .checks import check_generation_queue_worker
+from .guest_cart import GUEST_CART_COOKIE, load_guest_cart, merge_guest_cart, save_guest_cart
+from .http_client import CircuitBreaker, CircuitOpenError
+from .logging_pipeline import JsonFormatter, RequestContextFilter, request_id_var
+from .management.commands.startup_profile import LAZY_MODULES, PROFILE_SCRIPT
+from .middleware import CompressionMiddleware
+from .mirroring import MIRROR_DIRECTORY, designs_needing_mirror, is_mirrorable_url, mirror_url
+from .models import (
+    Cart, CartItem, Category, CustomerDesign, CustomUser, DailyProductSalesRollup, DailySalesRollup, GenerationTask,
+    MaterialMultiplier, Order, OrderItem, OrderStatusHistory, Product, StaleRollupDay,
+)
+from .order_status import transition_orders
+from .pagination import MAX_PAGE_SIZE, decode_cursor, encode_cursor, page_size
+from .pricing import BASE_PRICE, invalidate_material_multipliers, quote_batch, quote_design, quote_grid
+from .rate_limit import block, take_token, token_wait
+from .seeding import ScaleSeeder
+from .shipping import REMOTE_SURCHARGE, product_weight_kg, quote_shipping
+from .tracing import finish_trace, span, start_trace
+from .views import _order_items_from_line_items
 
-# Create your tests here.
+
+class PricingTests(TestCase):
+    def setUp(self):
+        MaterialMultiplier.objects.create(material='narra', multiplier=Decimal('2'))
+        invalidate_material_multipliers()
+        self.addCleanup(invalidate_material_multipliers)
+
+    def test_batch_matches_single_quotes(self):
+        rows = [(10, 20, 1, 'narra', 'x' * 75), (30, 40, 2, 'oak', 'x' * 300), (5, 5, 5, 'unknown', '')]
+
+        quotes = quote_batch(*zip(*rows))
+
+        for index, (width, height, thickness, material, description) in enumerate(rows):
+            single = quote_design(width, height, thickness, material, description)
+            self.assertAlmostEqual(quotes['estimated_price'][index], single['estimated_price'])
+            self.assertEqual(quotes['production_days'][index], single['production_days'])
+
+    def test_material_multiplier_and_size_scale_the_price(self):
+        # Materials without a multiplier are priced at the base rate.
+        self.assertEqual(quote_design(10, 10, 1, 'unlisted', 'x' * 150)['estimated_price'], BASE_PRICE)
+        self.assertEqual(quote_design(10, 10, 1, 'narra', 'x' * 150)['estimated_price'], 2 * BASE_PRICE)
+        self.assertEqual(quote_design(100, 10, 2, 'unlisted', 'x' * 150)['estimated_price'], 2 * BASE_PRICE)
+
+    def test_grid_covers_every_combination(self):
+        combinations, quotes = quote_grid([10, 20], [10], [1, 2, 3], ['oak', 'narra'])
+
+        self.assertEqual(len(quotes['estimated_price']), 12)
+        self.assertEqual(sorted(set(combinations['material'])), ['narra', 'oak'])
+
+
+class GenerationCacheKeyTests(SimpleTestCase):
+    def test_trivially_different_prompts_share_a_key(self):
+        key = generation_cache_key('text_to_model', 'A oak wooden  Shelf with dimensions: 12.0x4x1 inches')
+
+        self.assertEqual(key, generation_cache_key('text_to_model', 'a oak wooden shelf with dimensions: 12x4x1 inches '))
+        self.assertNotEqual(key, generation_cache_key('refine', 'a oak wooden shelf with dimensions: 12x4x1 inches'))
+        self.assertNotEqual(key, generation_cache_key('text_to_model', 'a oak wooden shelf with dimensions: 12x4x2 inches'))
+
+
+class RateLimitTests(TestCase):
+    def test_burst_is_admitted_then_callers_are_told_how_long_to_wait(self):
+        self.assertEqual([take_token('test', 1, 2), take_token('test', 1, 2)], [0, 0])
+
+        wait = take_token('test', 1, 2)
+
+        self.assertGreater(wait, 0)
+        self.assertLessEqual(wait, 1)
+
+    def test_admit_check_can_refuse_without_spending_a_token(self):
+        self.assertEqual(take_token('test', 1, 1, admit=lambda: 5), 5)
+        self.assertEqual(take_token('test', 1, 1), 0)
+
+    def test_block_refuses_tokens_until_it_expires(self):
+        block('test', 30, 3)
+
+        self.assertGreater(take_token('test', 1, 3), 29)
+        self.assertGreater(token_wait('test', 1, 3), 29)
+
+
+@override_settings(MIRROR_ALLOWED_HOSTS=['tripo-data.cdn.bcebos.com', '.tripo3d.com'], FAKE_SERVICES_URL='')
+class MirrorAllowlistTests(SimpleTestCase):
+    def test_only_https_urls_on_allowed_hosts_are_mirrored(self):
+        self.assertTrue(is_mirrorable_url('https://tripo-data.cdn.bcebos.com/task/model.glb'))
+        self.assertTrue(is_mirrorable_url('https://tripo-data.rg1.data.tripo3d.com/model.glb'))
+        for url in (
+            'http://tripo-data.cdn.bcebos.com/model.glb',
+            'https://tripo-data.cdn.bcebos.com:8443/model.glb',
+            'https://eviltripo3d.com/model.glb',
+            'https://169.254.169.254/latest/meta-data/',
+            'http://localhost:5432/',
+            'file:///etc/passwd',
+            'not a url',
+        ):
+            with self.subTest(url=url):
+                self.assertFalse(is_mirrorable_url(url))
+
+    def test_fake_services_host_is_allowed_when_configured(self):
+        with override_settings(FAKE_SERVICES_URL='http://127.0.0.1:8765'):
+            self.assertTrue(is_mirrorable_url('http://127.0.0.1:8765/tripo/files/model.glb'))
+            self.assertFalse(is_mirrorable_url('http://127.0.0.1:8000/admin/'))
+
+    def test_mirror_refuses_other_hosts_before_fetching(self):
+        with mock.patch('api.http_client.get') as get:
+            with self.assertRaises(ValueError):
+                mirror_url('http://169.254.169.254/latest/meta-data/', 'glb')
+        get.assert_not_called()
+
+
+class FakeDownload:
+    """Stands in for a streamed requests response."""
+
+    def __init__(self, body, content_type='model/gltf-binary'):
+        self.body = body
+        self.headers = {'Content-Type': content_type}
+        self.is_redirect = False
+        self.chunk_sizes = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size):
+        self.chunk_sizes.append(chunk_size)
+        for start in range(0, len(self.body), chunk_size):
+            yield self.body[start:start + chunk_size]
+
+
+@override_settings(MIRROR_ALLOWED_HOSTS=['tripo-data.cdn.bcebos.com', '.tripo3d.com'], FAKE_SERVICES_URL='')
+class MirrorDesignTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def stored(self, name):
+        with default_storage.open(f'{MIRROR_DIRECTORY}/{name}', 'rb') as stored:
+            return stored.read()
+
+    def test_download_is_streamed_in_chunks_and_named_by_its_sha256(self):
+        body = b'glTF' + bytes(range(256)) * 4
+        download = FakeDownload(body)
+
+        with mock.patch('api.mirroring.MIRROR_CHUNK_SIZE', 100), mock.patch('api.http_client.get', return_value=download):
+            name, checksum = mirror_url('https://tripo-data.cdn.bcebos.com/task/model', 'webp')
+
+        self.assertEqual(checksum, hashlib.sha256(body).hexdigest())
+        self.assertEqual(name, f'{checksum[:2]}/{checksum}.glb')
+        self.assertEqual(download.chunk_sizes, [100])
+        self.assertEqual(self.stored(name), body)
+
+    def test_downloads_over_the_size_cap_are_not_stored(self):
+        with mock.patch('api.mirroring.MIRROR_MAX_BYTES', 10), \
+                mock.patch('api.http_client.get', return_value=FakeDownload(b'x' * 11)):
+            with self.assertRaises(ValueError):
+                mirror_url('https://tripo-data.cdn.bcebos.com/task/model.glb', 'glb')
+
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, MIRROR_DIRECTORY)))
+
+    def test_backfill_skips_urls_that_cannot_be_mirrored(self):
+        user = CustomUser.objects.create_user(username='mirror', email='mirror@example.com', password='secret')
+        urls = [
+            'https://tripo-data.cdn.bcebos.com/a/model.glb', 'https://tripo-data.rg1.data.tripo3d.com/b/model.glb',
+            'https://TRIPO-DATA.CDN.BCEBOS.COM:443/c/model.glb', 'https://eviltripo3d.com/model.glb',
+            'http://tripo-data.cdn.bcebos.com/model.glb', 'https://169.254.169.254/latest/meta-data/', '',
+        ]
+        designs = [
+            CustomerDesign.objects.create(
+                user=user, design_description='Panel', width=10, height=20, thickness=1, material='oak', model_url=url,
+            )
+            for url in urls
+        ]
+
+        self.assertEqual(
+            sorted(design.id for design in designs_needing_mirror()), [design.id for design in designs[:3]]
+        )
+
+
+class DesignAssetTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.body = bytes(range(100))
+        checksum = hashlib.sha256(self.body).hexdigest()
+        self.name = f'{checksum[:2]}/{checksum}.glb'
+        self.etag = f'"{checksum}"'
+        default_storage.save(f'{MIRROR_DIRECTORY}/{self.name}', ContentFile(self.body))
+
+    def get(self, **headers):
+        return self.client.get(f'/api/design_assets/{self.name}', headers=headers)
+
+    def test_whole_asset_is_served_with_a_content_hash_etag(self):
+        response = self.get()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.body)
+        self.assertEqual((response['ETag'], response['Content-Type']), (self.etag, 'model/gltf-binary'))
+
+    def test_matching_if_none_match_is_not_modified(self):
+        self.assertEqual(self.get(if_none_match=self.etag).status_code, 304)
+
+    def test_ranges_are_served_partially(self):
+        response = self.get(range='bytes=10-19')
+        suffix = self.get(range='bytes=-5')
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), self.body[10:20])
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/100')
+        self.assertEqual(b''.join(suffix.streaming_content), self.body[-5:])
+
+    def test_unsatisfiable_range_is_rejected(self):
+        response = self.get(range='bytes=100-')
+
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */100')
+
+    def test_range_with_a_stale_if_range_gets_the_whole_asset(self):
+        response = self.get(range='bytes=10-19', if_range='"stale"')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.body)
+
+    def test_invalid_names_are_not_found(self):
+        self.assertEqual(self.client.get('/api/design_assets/../settings.py').status_code, 404)
+
+
+class CursorTests(SimpleTestCase):
+    def test_cursor_round_trips_the_sort_key(self):
+        values = ['2024-05-01T10:00:00+00:00', 42]
+
+        cursor = encode_cursor(values)
+
+        self.assertNotIn('=', cursor)
+        self.assertEqual(decode_cursor(cursor), values)
+
+    def test_tampered_cursor_is_rejected(self):
+        cursor = encode_cursor([42])
+        for tampered in (cursor[:-3], cursor + 'x', '!!!', encode_cursor({'id': 42})):
+            with self.subTest(cursor=tampered):
+                with self.assertRaisesMessage(ValueError, "Invalid cursor"):
+                    decode_cursor(tampered)
+
+    def test_page_size_is_capped(self):
+        self.assertEqual(page_size(25), 25)
+        self.assertEqual(page_size(10000), MAX_PAGE_SIZE)
+        self.assertEqual(page_size(0), 1)
+
+
+class DesignReviewQueueTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = CustomUser.objects.create_user(username='designer', email='designer@example.com', password='secret')
+        cls.designs = [
+            CustomerDesign.objects.create(
+                user=user, design_description=f'Panel {n}', width=10, height=20, thickness=1, material='oak',
+                status=status,
+            )
+            for n, status in enumerate(('pending', 'approved', 'pending'))
+        ]
+
+    def test_pages_follow_the_cursor_newest_first(self):
+        first = self.client.get('/api/design_review_queue', {'limit': 2}).json()
+        second = self.client.get('/api/design_review_queue', {'limit': 2, 'cursor': first['next_cursor']}).json()
+
+        ids = [design.id for design in reversed(self.designs)]
+        self.assertEqual([item['id'] for item in first['items']], ids[:2])
+        self.assertEqual([item['id'] for item in second['items']], ids[2:])
+        self.assertIsNone(second['next_cursor'])
+        self.assertEqual((first['counts']['all'], first['counts']['pending']), (3, 2))
+
+    def test_bad_cursor_and_status_are_reported(self):
+        self.assertFalse(self.client.get('/api/design_review_queue', {'cursor': 'bogus'}).json()['success'])
+        self.assertFalse(self.client.get('/api/design_review_queue', {'status': 'lost'}).json()['success'])
+
+
+class CustomerDirectoryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.light, cls.heavy, cls.new = (
+            CustomUser.objects.create_user(username=name, email=f'{name}@example.com', password='secret')
+            for name in ('light', 'heavy', 'new')
+        )
+        CustomUser.objects.create_superuser(username='owner', email='owner@example.com', password='secret')
+        for user, status, total in ((cls.light, 'delivered', '300'), (cls.light, 'cancelled', '1000'),
+                                    (cls.heavy, 'pending', '500')):
+            Order.objects.create(user=user, status=status, address='Manila', total_price=Decimal(total))
+
+    def test_spend_sort_pages_customers_with_their_order_stats(self):
+        first = self.client.get('/api/customers', {'sort': 'spend', 'limit': 2}).json()
+        second = self.client.get('/api/customers', {'sort': 'spend', 'limit': 2, 'cursor': first['next_cursor']}).json()
+
+        self.assertEqual(
+            [(row['email'], row['order_count'], row['lifetime_spend']) for row in first['customers']],
+            [('heavy@example.com', 1, 500.0), ('light@example.com', 2, 300.0)],
+        )
+        self.assertEqual([row['email'] for row in second['customers']], ['new@example.com'])
+        self.assertIsNone(second['next_cursor'])
+
+    def test_orders_are_indexed_by_customer_and_date(self):
+        indexes = {index.name: index.fields for index in Order._meta.indexes}
+
+        self.assertEqual(indexes['order_user_created_idx'], ['user', 'created_at'])
+
+
+class SalesRollupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = CustomUser.objects.create_user(username='shopper', email='shopper@example.com', password='secret')
+        cls.lamp = Product.objects.create(
+            category=Category.objects.create(name='Lighting'), name='Lamp', price=Decimal('250'), stock=10,
+        )
+        for status, quantity in (('pending', 2), ('delivered', 1), ('cancelled', 4)):
+            order = Order.objects.create(
+                user=user, status=status, address='Manila', currency='php', payment_method='stripe',
+                total_price=Decimal('250') * quantity,
+            )
+            OrderItem.objects.create(
+                order=order, product=cls.lamp, quantity=quantity, price=Decimal('250'),
+                **OrderItem.snapshot(product=cls.lamp),
+            )
+        cls.day = order_day(order)
+
+    def test_rollups_count_sales_and_skip_cancelled_orders(self):
+        rebuild_rollups(self.day, self.day)
+
+        sales = DailySalesRollup.objects.get()
+        self.assertEqual(
+            (sales.day, sales.currency, sales.payment_method, sales.orders, sales.units, sales.revenue),
+            (self.day, 'PHP', 'stripe', 2, 3, Decimal('750')),
+        )
+        product = DailyProductSalesRollup.objects.get()
+        self.assertEqual(
+            (product.product_id, product.product_name, product.category_name, product.orders, product.units),
+            (self.lamp.id, 'Lamp', 'Lighting', 2, 3),
+        )
+
+    def test_rebuilding_a_day_is_idempotent(self):
+        self.assertEqual(rebuild_rollups(self.day, self.day), (1, 1))
+        self.assertEqual(rebuild_rollups(self.day, self.day), (1, 1))
+        self.assertEqual(DailySalesRollup.objects.count(), 1)
+
+    def test_deleted_products_are_counted_under_their_snapshot_name(self):
+        self.lamp.delete()
+
+        rebuild_rollups(self.day, self.day)
+
+        product = DailyProductSalesRollup.objects.get()
+        self.assertEqual(
+            (product.product_id, product.product_name, product.is_custom_design, product.orders, product.units),
+            (None, 'Lamp', False, 2, 3),
+        )
+
+    def test_custom_design_lines_share_one_row(self):
+        order = Order.objects.get(status='pending')
+        for description in ('Carved eagle', 'Family name plaque'):
+            OrderItem.objects.create(
+                order=order, quantity=1, price=Decimal('1000'), is_custom_design=True, item_name=description,
+            )
+
+        rebuild_rollups(self.day, self.day)
+
+        custom = DailyProductSalesRollup.objects.get(is_custom_design=True)
+        self.assertEqual((custom.product_name, custom.units, custom.revenue), ('', 2, Decimal('2000')))
+
+    def test_status_changes_mark_the_day_for_the_refresh_worker(self):
+        rebuild_rollups(self.day, self.day)
+        order = Order.objects.get(status='pending')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            transition_orders([order.id], 'cancelled')
+
+        # Nothing is rebuilt on the request path.
+        self.assertEqual(DailySalesRollup.objects.get().orders, 2)
+        self.assertEqual(list(StaleRollupDay.objects.values_list('day', flat=True)), [self.day])
+
+        self.assertEqual(refresh_stale_rollups(), 1)
+        self.assertEqual(DailySalesRollup.objects.get().orders, 1)
+        self.assertFalse(StaleRollupDay.objects.exists())
+
+
+LOCAL_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class CachedModelBackendTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            username='cached', email='cached@example.com', password='secret', first_name='Ana',
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_user_is_loaded_once_then_served_from_the_cache(self):
+        backend = CachedModelBackend()
+        with self.assertNumQueries(1):
+            loaded = backend.get_user(self.user.id)
+
+        with self.assertNumQueries(0):
+            cached = backend.get_user(self.user.id)
+
+        self.assertEqual((cached.pk, cached.email, cached.first_name, cached.is_staff), (loaded.pk, 'cached@example.com', 'Ana', False))
+        self.assertEqual(cached.get_session_auth_hash(), self.user.get_session_auth_hash())
+
+    def test_password_hash_is_not_cached(self):
+        CachedModelBackend().get_user(self.user.id)
+
+        self.assertNotIn(self.user.password, repr(cache.get(user_cache_key(self.user.id))))
+        self.assertIn('password', CachedModelBackend().get_user(self.user.id).get_deferred_fields())
+
+    def test_saving_or_deactivating_the_user_drops_the_cached_copy(self):
+        backend = CachedModelBackend()
+        backend.get_user(self.user.id)
+
+        self.user.first_name = 'Bea'
+        self.user.save()
+        self.assertIsNone(cache.get(user_cache_key(self.user.id)))
+        self.assertEqual(backend.get_user(self.user.id).first_name, 'Bea')
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertIsNone(backend.get_user(self.user.id))
+
+    def test_session_stays_valid_across_cached_requests_until_the_password_changes(self):
+        self.client.force_login(self.user)
+
+        for _ in range(2):
+            self.assertEqual(self.client.get('/api/user').json()['email'], 'cached@example.com')
+
+        self.user.set_password('changed')
+        self.user.save()
+        self.assertEqual(self.client.get('/api/user').status_code, 401)
+
+    def test_migration_moves_sessions_to_the_cached_backend(self):
+        migration = importlib.import_module('api.migrations.0039_sessions_cached_backend')
+        sessions = {}
+        for backend in (migration.OLD_BACKEND, 'django.contrib.auth.backends.RemoteUserBackend'):
+            session = DatabaseSessionStore()
+            session.update({'_auth_user_id': str(self.user.id), '_auth_user_backend': backend})
+            session.create()
+            cache.set(KEY_PREFIX + session.session_key, {'_auth_user_backend': backend})
+            sessions[backend] = session.session_key
+
+        migration.move_sessions_to_cached_backend(django_apps, None)
+
+        moved, other = (DatabaseSessionStore(session_key=sessions[backend]).load() for backend in sessions)
+        self.assertEqual(moved['_auth_user_backend'], migration.NEW_BACKEND)
+        self.assertEqual(moved['_auth_user_id'], str(self.user.id))
+        self.assertEqual(other['_auth_user_backend'], 'django.contrib.auth.backends.RemoteUserBackend')
+        self.assertIsNone(cache.get(KEY_PREFIX + sessions[migration.OLD_BACKEND]))
+        self.assertIsNotNone(cache.get(KEY_PREFIX + sessions['django.contrib.auth.backends.RemoteUserBackend']))
+
+
+def json_upload(rows):
+    return io.BytesIO(json.dumps(rows).encode('utf-8'))
+
+
+class ProductImporterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Tables')
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def image_archive(self, *names):
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w') as zf:
+            for name in names:
+                zf.writestr(f'images/{name}', b'image bytes')
+        archive.seek(0)
+        return archive
+
+    def test_bad_rows_are_reported_without_stopping_the_import(self):
+        existing = Product.objects.create(category=self.category, name='Old', price=Decimal('10'), stock=1)
+        rows = [
+            1,
+            {'name': 'Bench', 'price': '1500', 'stock': '3', 'category': 'tables'},
+            {'name': 'No price', 'category': 'Tables'},
+            {'name': 'Negative', 'price': '10', 'stock': '-1', 'category': 'Tables'},
+            {'name': 'Nowhere', 'price': '10', 'category': 'Chairs'},
+            {'id': 'abc', 'name': 'Bad id'},
+            {'id': 999999, 'name': 'Missing'},
+            {'id': existing.id, 'stock': '7'},
+        ]
+
+        result = import_products(json_upload(rows), 'json')
+
+        self.assertEqual(result['summary'], {'created': 1, 'updated': 1, 'errors': 6})
+        by_row = {entry['row']: entry for entry in result['rows']}
+        self.assertEqual(by_row[1]['errors'], ['row must be an object'])
+        self.assertEqual(by_row[2]['status'], 'created')
+        self.assertEqual(by_row[3]['errors'], ['price is required'])
+        self.assertEqual(by_row[4]['errors'], ['stock must not be negative'])
+        self.assertEqual(by_row[5]['errors'], ["category 'Chairs' not found"])
+        self.assertEqual(by_row[6]['errors'], ["invalid id 'abc'"])
+        self.assertEqual(by_row[7]['errors'], ['product 999999 not found'])
+        self.assertEqual(by_row[8]['status'], 'updated')
+        existing.refresh_from_db()
+        self.assertEqual(existing.stock, 7)
+        self.assertEqual(Product.objects.get(name='Bench').category, self.category)
+
+    def test_dry_run_writes_nothing(self):
+        result = import_products(
+            json_upload([{'name': 'Bench', 'price': '1500', 'category_id': self.category.id}]), 'json', dry_run=True
+        )
+
+        self.assertEqual(result['rows'], [{'row': 1, 'status': 'valid', 'id': None}])
+        self.assertFalse(Product.objects.exists())
+
+    def test_image_must_be_in_the_archive(self):
+        result = import_products(
+            json_upload([{'name': 'Bench', 'price': '1500', 'category': 'Tables', 'image': 'bench.png'}]),
+            'json', images=self.image_archive('chair.png'),
+        )
+
+        self.assertEqual(result['rows'][0]['errors'], ["image 'bench.png' not found in the image archive"])
+
+    def test_rolled_back_chunk_leaves_no_image_files(self):
+        rows = [{'name': 'Bench', 'price': '1500', 'category': 'Tables', 'image': 'bench.png'}]
+
+        with mock.patch.object(Product.objects, 'bulk_create', side_effect=RuntimeError('database down')):
+            with self.assertRaises(RuntimeError):
+                import_products(json_upload(rows), 'json', images=self.image_archive('bench.png'))
+
+        self.assertFalse(Product.objects.exists())
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'products')), [])
+
+
+class TransitionOrdersTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='buyer', email='buyer@example.com', password='secret')
+
+    def make_order(self, status):
+        return Order.objects.create(user=self.user, status=status, address='Manila', total_price=Decimal('100'))
+
+    def test_moves_orders_forward_and_records_history(self):
+        pending, processing = self.make_order('pending'), self.make_order('processing')
+
+        results = transition_orders([pending.id, processing.id], 'shipped', changed_by=self.user)
+
+        self.assertEqual([result['result'] for result in results], ['updated', 'updated'])
+        self.assertEqual(
+            set(Order.objects.filter(id__in=[pending.id, processing.id]).values_list('status', flat=True)),
+            {'shipped'},
+        )
+        history = OrderStatusHistory.objects.order_by('order_id')
+        self.assertEqual(
+            [(entry.order_id, entry.from_status, entry.to_status) for entry in history],
+            [(pending.id, 'pending', 'shipped'), (processing.id, 'processing', 'shipped')],
+        )
+
+    def test_rejects_backward_and_final_transitions(self):
+        shipped, delivered, cancelled = self.make_order('shipped'), self.make_order('delivered'), self.make_order('cancelled')
+
+        self.assertEqual(transition_orders([shipped.id], 'processing')[0]['result'], 'invalid_transition')
+        self.assertEqual(transition_orders([delivered.id], 'cancelled')[0]['result'], 'invalid_transition')
+        self.assertEqual(transition_orders([cancelled.id], 'pending')[0]['result'], 'invalid_transition')
+        self.assertEqual(
+            list(Order.objects.filter(id__in=[shipped.id, delivered.id, cancelled.id]).order_by('id')
+                 .values_list('status', flat=True)),
+            ['shipped', 'delivered', 'cancelled'],
+        )
+        self.assertFalse(OrderStatusHistory.objects.exists())
+
+    def test_reports_unchanged_and_missing_orders_in_request_order(self):
+        shipped, pending = self.make_order('shipped'), self.make_order('pending')
+
+        results = transition_orders([0, shipped.id, pending.id, shipped.id], 'shipped')
+
+        self.assertEqual(
+            [(result['id'], result['result']) for result in results],
+            [(0, 'not_found'), (shipped.id, 'unchanged'), (pending.id, 'updated')],
+        )
+
+    def test_unknown_status_is_rejected(self):
+        with self.assertRaises(ValueError):
+            transition_orders([self.make_order('pending').id], 'lost')
+
+    def test_single_order_endpoint_can_correct_a_final_status(self):
+        delivered = self.make_order('delivered')
+
+        response = self.client.put(
+            f'/api/update_order_status/{delivered.id}', {'status': 'shipped'}, content_type='application/json',
+        )
+
+        self.assertEqual(response.json(), {'message': 'Order status updated successfully'})
+        delivered.refresh_from_db()
+        self.assertEqual(delivered.status, 'shipped')
+        self.assertEqual(
+            list(OrderStatusHistory.objects.values_list('from_status', 'to_status')), [('delivered', 'shipped')]
+        )
+
+    def test_bulk_endpoint_enforces_the_transition_table(self):
+        delivered = self.make_order('delivered')
+
+        response = self.client.post(
+            '/api/orders/bulk_status', {'order_ids': [delivered.id], 'status': 'shipped'},
+            content_type='application/json',
+        )
+
+        self.assertEqual(response.json()['results'][0]['result'], 'invalid_transition')
+
+
+class JsonLoggingTests(SimpleTestCase):
+    def make_record(self, exc_info=None, **extra):
+        record = logging.LogRecord('api.views', logging.INFO, __file__, 1, 'Paid %s', ('order 7',), exc_info)
+        record.__dict__.update(extra)
+        return record
+
+    def test_formatter_writes_one_json_object_with_extra_fields(self):
+        entry = json.loads(JsonFormatter().format(self.make_record(order_id=7)))
+
+        self.assertEqual(
+            (entry['level'], entry['logger'], entry['message'], entry['order_id']),
+            ('INFO', 'api.views', 'Paid order 7', 7),
+        )
+        self.assertNotIn('args', entry)
+        self.assertTrue(entry['ts'].endswith('+00:00'))
+
+    def test_formatter_includes_the_traceback(self):
+        try:
+            raise ValueError('boom')
+        except ValueError:
+            record = self.make_record(exc_info=sys.exc_info())
+
+        self.assertIn('ValueError: boom', json.loads(JsonFormatter().format(record))['exc'])
+
+    def test_request_context_filter_stamps_the_current_request_id(self):
+        token = request_id_var.set('req-1')
+        self.addCleanup(request_id_var.reset, token)
+        record, explicit = self.make_record(), self.make_record(request_id='req-2')
+
+        self.assertTrue(RequestContextFilter().filter(record))
+        RequestContextFilter().filter(explicit)
+
+        self.assertEqual(json.loads(JsonFormatter().format(record))['request_id'], 'req-1')
+        self.assertEqual(explicit.request_id, 'req-2')
+
+
+class TracingTests(SimpleTestCase):
+    def test_spans_nest_under_the_enclosing_span(self):
+        token = start_trace()
+        with span('stripe.create_checkout_session', mode='payment'):
+            with span('http.post'):
+                pass
+        with self.assertRaises(RuntimeError):
+            with span('fixer.latest'):
+                raise RuntimeError('timed out')
+        trace = finish_trace(token)
+
+        checkout, fixer = trace.as_list()
+        self.assertEqual(trace.outbound()[0], 2)
+        self.assertEqual((checkout['name'], checkout['attributes']), ('stripe.create_checkout_session', {'mode': 'payment'}))
+        self.assertEqual([child['name'] for child in checkout['children']], ['http.post'])
+        self.assertEqual(fixer['error'], 'RuntimeError: timed out')
+
+    def test_trace_follows_the_request_into_copied_contexts(self):
+        def call_tripo():
+            with span('tripo.get_task'):
+                pass
+
+        token = start_trace()
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            pool.submit(contextvars.copy_context().run, call_tripo).result()
+            # A thread that did not copy the request's context records nothing on its trace.
+            pool.submit(call_tripo).result()
+        trace = finish_trace(token)
+
+        self.assertEqual([entry['name'] for entry in trace.as_list()], ['tripo.get_task'])
+
+    @override_settings(TRACE_SLOW_CALL_MS=0)
+    def test_slow_calls_are_logged_even_outside_a_request(self):
+        with self.assertLogs('api.tracing', 'WARNING') as logs:
+            with span('tripo.get_task'):
+                pass
+
+        self.assertIn('Slow outbound call tripo.get_task', logs.output[0])
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def at(self, seconds):
+        return mock.patch('time.monotonic', return_value=seconds)
+
+    def test_opens_after_consecutive_failures(self):
+        breaker = CircuitBreaker('api.tripo3d.ai', failure_threshold=2, reset_seconds=30)
+
+        with self.at(100):
+            breaker.record_failure()
+            breaker.before_call()
+            breaker.record_success()
+            breaker.record_failure()
+            breaker.before_call()
+            breaker.record_failure()
+            with self.assertRaises(CircuitOpenError):
+                breaker.before_call()
+
+    def test_half_opens_for_a_single_trial_call(self):
+        breaker = CircuitBreaker('api.tripo3d.ai', failure_threshold=1, reset_seconds=30)
+        with self.at(100):
+            breaker.record_failure()
+
+        with self.at(131):
+            breaker.before_call()
+            with self.assertRaises(CircuitOpenError):
+                breaker.before_call()
+            breaker.record_failure()
+        with self.at(140):
+            with self.assertRaises(CircuitOpenError):
+                breaker.before_call()
+
+        with self.at(162):
+            breaker.before_call()
+            breaker.record_success()
+            breaker.before_call()
+            breaker.before_call()
+
+
+@override_settings(HTTP_MAX_SESSIONS=2)
+class SessionCacheTests(SimpleTestCase):
+    def setUp(self):
+        sessions = mock.patch.object(http_client, '_sessions', OrderedDict())
+        sessions.start()
+        self.addCleanup(sessions.stop)
+
+    def test_one_session_per_host_and_retry_policy(self):
+        session = http_client.session_for('https://api.tripo3d.ai/v2/openapi/task')
+
+        self.assertIs(http_client.session_for('https://api.tripo3d.ai/v2/openapi/task/abc'), session)
+        self.assertIsNot(http_client.session_for('https://api.tripo3d.ai/v2/openapi/task', retries=0), session)
+
+    def test_least_recently_used_session_is_closed_when_full(self):
+        stripe = http_client.session_for('https://api.stripe.com/v1/checkout/sessions')
+        tripo = http_client.session_for('https://api.tripo3d.ai/v2/openapi/task')
+        http_client.session_for('https://api.stripe.com/v1/refunds')
+
+        with mock.patch.object(tripo, 'close') as close, mock.patch.object(stripe, 'close') as stripe_close:
+            http_client.session_for('https://api.apilayer.com/fixer/latest')
+
+        close.assert_called_once_with()
+        stripe_close.assert_not_called()
+        self.assertEqual([host for host, _ in http_client._sessions], ['api.stripe.com', 'api.apilayer.com'])
+
+    def test_breaker_state_is_read_without_creating_a_session(self):
+        self.assertEqual(http_client.breaker_open_for('https://api.tripo3d.ai/v2/openapi/task'), 0)
+        self.assertEqual(len(http_client._sessions), 0)
+
+        session = http_client.session_for('https://api.tripo3d.ai/v2/openapi/task')
+        with mock.patch.object(session.breaker, 'open_for', return_value=12.5):
+            self.assertEqual(http_client.breaker_open_for('https://api.tripo3d.ai/v2/openapi/task/abc'), 12.5)
+
+
+class PendingGenerationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='maker', email='maker@example.com', password='secret')
+
+    def make_generation(self, **fields):
+        return GenerationTask.objects.create(
+            prompt_hash=generation_cache_key('text_to_model', str(fields)), prompt='shelf',
+            generation_type='text_to_model', **fields,
+        )
+
+    def make_design(self, generation):
+        return CustomerDesign.objects.create(
+            user=self.user, design_description='Shelf', width=10, height=20, thickness=1, material='oak',
+            generation=generation, status='generating',
+        )
+
+    def test_joiner_gets_the_first_requests_generation_without_blocking(self):
+        # The first request has claimed the generation and is still waiting on Tripo for a task_id.
+        first = GenerationTask.objects.create(
+            prompt_hash=generation_cache_key('text_to_model', 'A oak wooden shelf'), prompt='A oak wooden shelf',
+            generation_type='text_to_model', status='pending',
+        )
+
+        with mock.patch.dict(os.environ, {'API_KEY': 'test-key'}), \
+                mock.patch('api.http_client.post') as post, mock.patch('time.sleep') as sleep:
+            joined = initiate_task_id('shelf', 'oak')
+
+        post.assert_not_called()
+        sleep.assert_not_called()
+        self.assertEqual((joined['generation_id'], joined['task_id'], joined['queued']), (first.prompt_hash, None, True))
+        self.assertEqual(get_generation_status(joined['generation_id'])['status'], 'pending')
+
+    def test_joining_a_running_generation_returns_its_task(self):
+        running = self.make_generation(status='running', task_id='task-1')
+
+        joined = _join_generation(running)
+
+        self.assertEqual((joined['generation_id'], joined['task_id'], joined['cached']), (running.prompt_hash, 'task-1', True))
+
+    def test_finished_generation_completes_waiting_designs(self):
+        design = self.make_design(self.make_generation(status='running', task_id='task-2'))
+
+        _record_task_status('task-2', 'success', 'https://tripo-data.cdn.bcebos.com/m.glb', 'https://x.tripo3d.com/m.webp')
+
+        design.refresh_from_db()
+        self.assertEqual((design.status, design.model_url), ('pending', 'https://tripo-data.cdn.bcebos.com/m.glb'))
+
+    def test_failed_generation_fails_waiting_designs(self):
+        design = self.make_design(self.make_generation(status='running', task_id='task-3'))
+
+        _record_task_status('task-3', 'banned')
+
+        design.refresh_from_db()
+        self.assertEqual(design.status, 'generation_failed')
+        self.assertEqual(GenerationTask.objects.get(task_id='task-3').status, 'failed')
+
+    def test_design_saved_as_its_generation_finishes_gets_the_model(self):
+        generation = self.make_generation(status='running', task_id='task-4')
+        create = CustomerDesign.objects.create
+
+        def finish_then_create(**fields):
+            # Tripo reports success after the endpoint read 'running' but before the design is inserted.
+            _record_task_status('task-4', 'success', 'https://tripo-data.cdn.bcebos.com/4.glb', 'https://x.tripo3d.com/4.webp')
+            return create(**fields)
+
+        with mock.patch.object(CustomerDesign.objects, 'create', side_effect=finish_then_create):
+            response = self.client.post('/api/create_design', {
+                'user_id': self.user.id, 'material': 'oak', 'decoration_type': 'none', 'design_description': 'Shelf',
+                'width': 10, 'height': 20, 'thickness': 1, 'estimated_price': 500, 'generation_id': generation.prompt_hash,
+            }, content_type='application/json')
+
+        self.assertTrue(response.json()['success'])
+        design = CustomerDesign.objects.get(generation=generation)
+        self.assertEqual((design.status, design.model_url), ('pending', 'https://tripo-data.cdn.bcebos.com/4.glb'))
+
+    def test_worker_settles_designs_left_generating_after_their_generation_finished(self):
+        succeeded = self.make_design(self.make_generation(
+            status='success', task_id='task-5', model_url='https://tripo-data.cdn.bcebos.com/5.glb',
+        ))
+        failed = self.make_design(self.make_generation(status='failed', task_id='task-6'))
+        running = self.make_design(self.make_generation(status='running', task_id='task-7'))
+
+        self.assertEqual(settle_finished_designs(), 2)
+
+        for design in (succeeded, failed, running):
+            design.refresh_from_db()
+        self.assertEqual((succeeded.status, succeeded.model_url), ('pending', 'https://tripo-data.cdn.bcebos.com/5.glb'))
+        self.assertEqual((failed.status, running.status), ('generation_failed', 'generating'))
+
+    def test_missing_queue_worker_is_reported_by_a_system_check(self):
+        with self.settings(GENERATION_QUEUE_WORKER=False):
+            self.assertEqual([error.id for error in check_generation_queue_worker(None)], ['api.W001'])
+        with self.settings(GENERATION_QUEUE_WORKER=True):
+            self.assertEqual(check_generation_queue_worker(None), [])
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class CatalogResponseTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Cabinets')
+        Product.objects.bulk_create([
+            Product(category=cls.category, name=f'Cabinet {n}', price=Decimal('1500'), stock=4) for n in range(20)
+        ])
+
+    def setUp(self):
+        cache.clear()
+        _process_snapshot.clear()
+
+    def get_products(self, **headers):
+        return self.client.get('/api/get_products', headers=headers)
+
+    def test_snapshot_is_built_once_and_reused_across_requests(self):
+        with mock.patch('api.catalog.build_catalog_snapshot', wraps=build_catalog_snapshot) as build:
+            first, second = self.get_products(), self.get_products()
+            _process_snapshot.clear()  # Another worker process reads the snapshot from the shared cache.
+            third = self.get_products()
+
+        build.assert_called_once()
+        self.assertEqual(len(first.json()), 20)
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(first.content, third.content)
+
+    def test_product_and_category_changes_move_the_version(self):
+        versions = [catalog_version()]
+        product = Product.objects.first()
+        for change in (product.save, self.category.save, product.delete):
+            with self.captureOnCommitCallbacks(execute=True):
+                change()
+            versions.append(catalog_version())
+
+        self.assertEqual(len(set(versions)), len(versions))
+        self.assertEqual(len(self.get_products().json()), 19)
+
+    def test_each_encoding_has_its_own_etag(self):
+        identity = self.get_products(accept_encoding='identity')
+        gzipped = self.get_products(accept_encoding='gzip')
+
+        version = catalog_version()
+        self.assertEqual(identity['ETag'], catalog_etag(version))
+        self.assertEqual((gzipped['ETag'], gzipped['Content-Encoding']), (catalog_etag(version, 'gzip'), 'gzip'))
+
+    def test_matching_if_none_match_is_not_modified(self):
+        etag = self.get_products(accept_encoding='gzip')['ETag']
+
+        fresh = self.get_products(accept_encoding='gzip', if_none_match=etag)
+        other_encoding = self.get_products(accept_encoding='identity', if_none_match=etag)
+
+        self.assertEqual((fresh.status_code, fresh['ETag']), (304, etag))
+        self.assertEqual(other_encoding.status_code, 200)
+
+
+class CompressionMiddlewareTests(SimpleTestCase):
+    body = json.dumps([{'name': f'Table {n}', 'material': 'narra'} for n in range(100)]).encode('utf-8')
+
+    def respond(self, request, **cookies):
+        def view(request):
+            response = HttpResponse(self.body, content_type='application/json')
+            for name, value in cookies.items():
+                response.set_cookie(name, value)
+            return response
+
+        return ConditionalGetMiddleware(CompressionMiddleware(view))(request)
+
+    def test_negotiation_prefers_brotli_then_gzip_and_honours_q_values(self):
+        both = ('br', 'gzip')
+
+        self.assertEqual(negotiate_encoding('gzip, deflate, br', available=both), 'br')
+        self.assertEqual(negotiate_encoding('br;q=0.5, gzip', available=both), 'gzip')
+        self.assertEqual(negotiate_encoding('gzip;q=0, identity', available=both), None)
+        self.assertEqual(negotiate_encoding('*', available=('gzip',)), 'gzip')
+        self.assertEqual(negotiate_encoding(None), None)
+
+    def test_response_is_encoded_as_negotiated(self):
+        factory = RequestFactory()
+        for accept, expected in (('gzip', 'gzip'), ('identity', None), ('br, gzip', AVAILABLE_ENCODINGS[0])):
+            with self.subTest(accept=accept):
+                response = self.respond(factory.get('/api/get_all_orders', headers={'accept-encoding': accept}))
+
+                self.assertEqual(response.get('Content-Encoding'), expected)
+                self.assertIn('Accept-Encoding', response['Vary'])
+                if expected == 'gzip':
+                    self.assertEqual(gzip.decompress(response.content), self.body)
+                elif expected is None:
+                    self.assertEqual(response.content, self.body)
+
+    def test_weak_etag_of_a_compressed_response_gets_a_304(self):
+        factory = RequestFactory()
+        first = self.respond(factory.get('/api/get_all_orders', headers={'accept-encoding': 'gzip'}))
+
+        again = self.respond(factory.get(
+            '/api/get_all_orders', headers={'accept-encoding': 'gzip', 'if-none-match': first['ETag']},
+        ))
+
+        self.assertTrue(first['ETag'].startswith('W/"'))
+        self.assertEqual(again.status_code, 304)
+
+    def test_responses_with_secrets_are_only_gzipped_with_a_masked_length(self):
+        factory = RequestFactory()
+        with_session = factory.get('/api/get_all_orders', headers={'accept-encoding': 'br, gzip'})
+        with_session.COOKIES[settings.SESSION_COOKIE_NAME] = 'session-key'
+        cases = {
+            'session': (with_session, {}),
+            'authorization': (factory.get('/api/get_all_orders', headers={
+                'accept-encoding': 'br, gzip', 'authorization': 'Bearer token',
+            }), {}),
+            'set-cookie': (factory.get('/api/get_all_orders', headers={'accept-encoding': 'br, gzip'}), {'token': 'x'}),
+        }
+        for name, (request, cookies) in cases.items():
+            with self.subTest(name):
+                response = self.respond(request, **cookies)
+
+                self.assertEqual(response['Content-Encoding'], 'gzip')
+                self.assertTrue(response.content[3] & gzip.FNAME)
+                self.assertEqual(gzip.decompress(response.content), self.body)
+
+    def test_small_responses_are_left_alone(self):
+        request = RequestFactory().get('/api/get_all_orders', headers={'accept-encoding': 'gzip'})
+        response = CompressionMiddleware(lambda request: HttpResponse(b'[]', content_type='application/json'))(request)
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.content, b'[]')
+
+
+class GazetteerTests(SimpleTestCase):
+    def test_autocomplete_matches_name_prefixes(self):
+        matches = get_gazetteer().autocomplete('ceb')
+
+        self.assertIn({'level': 'province', 'name': 'Cebu', 'region': 'Region VII (Central Visayas)'}, matches)
+        self.assertIn('Cebu City', [match['name'] for match in matches if match['level'] == 'city'])
+
+    def test_normalize_address_canonicalizes_names(self):
+        address = get_gazetteer().normalize_address('region vii', 'cebu', 'cebu city', ' 6000 ')
+
+        self.assertEqual(address, {
+            'region': 'Region VII (Central Visayas)', 'province': 'Cebu', 'city': 'Cebu City', 'postal_code': '6000',
+        })
+
+    def test_normalize_address_rejects_inconsistent_or_unknown_parts(self):
+        gazetteer = get_gazetteer()
+        for region, province, postal_code in (('NCR', 'Cebu', '6000'), ('Region VII', 'Atlantis', '6000'),
+                                              ('Region VII', 'Cebu', '60')):
+            with self.subTest(region=region, province=province, postal_code=postal_code):
+                with self.assertRaises(AddressValidationError):
+                    gazetteer.normalize_address(region, province, 'Cebu City', postal_code)
+
+
+class QuoteShippingTests(SimpleTestCase):
+    def options(self, quote):
+        return {option['service']: option for option in quote['options']}
+
+    def test_zone_comes_from_province_then_region(self):
+        self.assertEqual(quote_shipping(1, region='NCR')['zone'], 'metro_manila')
+        self.assertEqual(quote_shipping(1, province='Cebu')['zone'], 'visayas')
+        self.assertEqual(quote_shipping(1, region='Region XI')['zone'], 'mindanao')
+
+    def test_unknown_destination_is_quoted_as_the_farthest_zone(self):
+        self.assertEqual(quote_shipping(1)['zone'], 'mindanao')
+        self.assertEqual(quote_shipping(1, province='Atlantis')['zone'], 'mindanao')
+
+    def test_remote_provinces_pay_a_surcharge_and_take_longer(self):
+        quote = quote_shipping(1, province='Palawan')
+        mainland = quote_shipping(1, region='Region IV-A')
+
+        self.assertTrue(quote['remote'])
+        self.assertEqual(quote['zone'], mainland['zone'])
+        standard, mainland_standard = self.options(quote)['standard'], self.options(mainland)['standard']
+        self.assertEqual(standard['amount'], mainland_standard['amount'] + REMOTE_SURCHARGE)
+        self.assertEqual(standard['min_days'], mainland_standard['min_days'] + 3)
+
+    def test_weight_is_billed_in_half_kilogram_steps_after_the_first_kilogram(self):
+        self.assertEqual(quote_shipping(0.1, region='NCR')['billable_weight_kg'], 0.5)
+        self.assertEqual(quote_shipping(2.2, region='NCR')['billable_weight_kg'], 2.5)
+        amounts = [self.options(quote_shipping(weight, region='NCR'))['standard']['amount'] for weight in (1, 1.5, 2, 2.2)]
+        self.assertEqual(amounts, [Decimal('100'), Decimal('130'), Decimal('130'), Decimal('160')])
+
+    def test_bulky_products_are_billed_by_volumetric_weight(self):
+        light = Product(weight_kg=Decimal('2'))
+        bulky = Product(weight_kg=Decimal('2'), length_cm=100, width_cm=50, height_cm=20)
+
+        self.assertEqual(product_weight_kg(light), 2.0)
+        self.assertEqual(product_weight_kg(bulky), 20.0)
+
+
+class ShippingEndpointTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='shipper', email='shipper@example.com', password='secret')
+        cls.product = Product.objects.create(
+            category=Category.objects.create(name='Chairs'), name='Chair', price=Decimal('500'), stock=3,
+            weight_kg=Decimal('2'),
+        )
+
+    def quote(self, **payload):
+        return self.client.post('/api/shipping/quote', payload, content_type='application/json')
+
+    def test_quote_for_unknown_products_is_not_found(self):
+        response = self.quote(items=[{'product_id': self.product.id}, {'product_id': self.product.id + 100}])
+
+        self.assertEqual(response.status_code, 404)
+        self.assertIn(str(self.product.id + 100), response.json()['error'])
+
+    def test_quote_without_items_or_cart_is_a_bad_request(self):
+        self.assertEqual(self.quote(region='NCR').status_code, 400)
+        self.assertEqual(self.quote(items=[{'product_id': self.product.id}], region='NCR').status_code, 200)
+
+    def test_checkout_only_collects_addresses_in_quoted_countries(self):
+        CartItem.objects.create(cart=Cart.objects.create(user=self.user), product=self.product, quantity=1)
+        stripe = mock.Mock()
+        stripe.checkout.Session.create.return_value = mock.Mock(id='cs_test', url='https://checkout.example/cs_test')
+
+        with mock.patch('api.http_client.get_stripe', return_value=stripe):
+            response = self.client.post('/api/create-checkout-session', {
+                'user_id': self.user.id, 'currency': 'php', 'success_url': 'https://a/ok', 'cancel_url': 'https://a/no',
+            }, content_type='application/json')
+
+        self.assertEqual(response.json()['session_id'], 'cs_test')
+        create = stripe.checkout.Session.create.call_args.kwargs
+        self.assertEqual(create['shipping_address_collection'], {'allowed_countries': ['PH']})
+
+
+class OrderHistoryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='collector', email='collector@example.com', password='secret')
+
+    def test_history_renders_from_snapshots_after_the_product_is_deleted(self):
+        product = Product.objects.create(
+            category=Category.objects.create(name='Benches'), name='Bench', price=Decimal('700'), stock=2,
+            default_material='acacia',
+        )
+        order = Order.objects.create(user=self.user, address='Davao', total_price=Decimal('700'))
+        OrderItem.objects.create(order=order, product=product, quantity=1, price=Decimal('700'), **OrderItem.snapshot(product))
+        product.delete()
+
+        [history] = self.client.get('/api/get_customer_orders', {'user_id': self.user.id}).json()
+        [admin_history] = self.client.get('/api/get_all_orders').json()
+
+        expected = {'product_name': 'Bench', 'customer_design': None, 'image': None, 'material': 'acacia', 'quantity': 1}
+        self.assertEqual({key: history['items'][0][key] for key in expected}, expected)
+        self.assertEqual({key: admin_history['items'][0][key] for key in expected}, expected)
+
+
+class AdminChangelistTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_superuser(username='admin', email='admin@example.com', password='secret')
+        cls.product = Product.objects.create(
+            category=Category.objects.create(name='Tables'), name='Table', price=Decimal('900'), stock=5,
+        )
+
+    def add_rows(self, count):
+        start = Order.objects.count()
+        for n in range(start, start + count):
+            user = CustomUser.objects.create_user(username=f'buyer{n}', email=f'buyer{n}@example.com', password='secret')
+            order = Order.objects.create(user=user, address='Manila', total_price=Decimal('900'))
+            OrderItem.objects.create(order=order, product=self.product, quantity=1, price=Decimal('900'))
+            CartItem.objects.create(cart=Cart.objects.create(user=user), product=self.product, quantity=1)
+
+    def changelist_queries(self, model_name):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(f'admin:api_{model_name}_changelist'))
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelist_queries_do_not_grow_with_the_page(self):
+        self.client.force_login(self.admin)
+        self.add_rows(1)
+        self.changelist_queries('order')  # Warms the cached session and user.
+        before = {name: self.changelist_queries(name) for name in ('order', 'orderitem', 'cartitem', 'customuser')}
+
+        self.add_rows(5)
+
+        self.assertEqual({name: self.changelist_queries(name) for name in before}, before)
+
+
+def stripe_line_item(description, quantity, amount_total, **metadata):
+    """A Checkout line item as listed with expand=['data.price.product']."""
+    from stripe import StripeObject
+
+    return StripeObject.construct_from({
+        'description': description,
+        'quantity': quantity,
+        'amount_total': amount_total,
+        'price': {'product': {'metadata': {key: str(value) for key, value in metadata.items()}}},
+    }, 'sk_test')
+
+
+class OrderItemsFromLineItemsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='payer', email='payer@example.com', password='secret')
+        other = CustomUser.objects.create_user(username='other', email='other@example.com', password='secret')
+        category = Category.objects.create(name='Shelves')
+        cls.shelf = Product.objects.create(category=category, name='Shelf', price=Decimal('800'), stock=5)
+        design_fields = {'width': 10, 'height': 20, 'thickness': 1, 'material': 'oak', 'status': 'approved'}
+        cls.design = CustomerDesign.objects.create(user=cls.user, design_description='Carved panel', **design_fields)
+        cls.other_design = CustomerDesign.objects.create(user=other, design_description='Carved panel', **design_fields)
+
+    def test_lines_are_resolved_by_primary_key(self):
+        line_items = [
+            stripe_line_item('Shelf (renamed since)', 2, 160000, product_id=self.shelf.id),
+            stripe_line_item('Custom Design - anything', 1, 250000, design_id=self.design.id),
+        ]
+
+        with self.assertNumQueries(2):
+            order_items, sold = _order_items_from_line_items(self.user, line_items)
+
+        self.assertEqual(sold, {self.shelf.id: 2})
+        shelf_line, design_line = order_items
+        self.assertEqual((shelf_line.product, shelf_line.quantity, shelf_line.price), (self.shelf, 2, Decimal('800')))
+        self.assertEqual((shelf_line.item_name, shelf_line.is_custom_design), ('Shelf', False))
+        self.assertEqual((design_line.customer_design, design_line.price), (self.design, Decimal('2500')))
+        self.assertTrue(design_line.is_custom_design)
+
+    def test_legacy_lines_fall_back_to_names(self):
+        line_items = [
+            stripe_line_item('Shelf', 1, 80000),
+            stripe_line_item('Custom Design - Carved panel', 1, 250000),
+        ]
+
+        order_items, sold = _order_items_from_line_items(self.user, line_items)
+
+        self.assertEqual(sold, {self.shelf.id: 1})
+        self.assertEqual([item.product for item in order_items], [self.shelf, None])
+        # The description matches designs of two users; only the buyer's own is used.
+        self.assertEqual(order_items[1].customer_design, self.design)
+
+    def test_unresolvable_lines_are_skipped(self):
+        line_items = [
+            stripe_line_item('Gone', 1, 1000, product_id=999999),
+            stripe_line_item('Custom Design - Not mine', 1, 1000, design_id=self.other_design.id),
+            stripe_line_item('Never existed', 1, 1000),
+        ]
+
+        order_items, sold = _order_items_from_line_items(self.user, line_items)
+
+        self.assertEqual((order_items, sold), ([], {}))
+
+
+class GuestCartTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='guest', email='guest@example.com', password='secret')
+        category = Category.objects.create(name='Chairs')
+        cls.chair = Product.objects.create(category=category, name='Chair', price=Decimal('500'), stock=10)
+        cls.stool = Product.objects.create(category=category, name='Stool', price=Decimal('300'), stock=10)
+
+    def test_merge_sums_existing_lines_and_adds_new_ones(self):
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=cart, product=self.chair, quantity=2)
+
+        merged = merge_guest_cart(self.user, {self.chair.id: 3, self.stool.id: 1})
+
+        self.assertEqual(merged, 2)
+        self.assertEqual(
+            dict(CartItem.objects.filter(cart=cart).values_list('product_id', 'quantity')),
+            {self.chair.id: 5, self.stool.id: 1},
+        )
+
+    def test_merge_creates_the_cart_and_skips_deleted_products(self):
+        merged = merge_guest_cart(self.user, {self.stool.id: 2, 999999: 1})
+
+        self.assertEqual(merged, 1)
+        self.assertEqual(
+            list(CartItem.objects.filter(cart__user=self.user).values_list('product_id', 'quantity')),
+            [(self.stool.id, 2)],
+        )
+
+    def test_merging_an_empty_cart_does_nothing(self):
+        self.assertEqual(merge_guest_cart(self.user, {}), 0)
+        self.assertFalse(Cart.objects.filter(user=self.user).exists())
+
+    def test_cookie_round_trip_and_tampering(self):
+        response = HttpResponse()
+        save_guest_cart(response, {self.chair.id: 2})
+        value = response.cookies[GUEST_CART_COOKIE].value
+        factory = RequestFactory()
+
+        request = factory.get('/')
+        request.COOKIES[GUEST_CART_COOKIE] = value
+        self.assertEqual(load_guest_cart(request), {self.chair.id: 2})
+
+        tampered = factory.get('/')
+        tampered.COOKIES[GUEST_CART_COOKIE] = value[:-2] + 'xx'
+        self.assertEqual(load_guest_cart(tampered), {})
+
+
+class LazyImportTests(SimpleTestCase):
+    def test_startup_does_not_import_heavy_sdks(self):
+        # A fresh interpreter, as the test process has imported everything already.
+        result = subprocess.run(
+            [sys.executable, '-c', PROFILE_SCRIPT, settings.ROOT_URLCONF, *LAZY_MODULES],
+            capture_output=True, text=True, cwd=settings.BASE_DIR, check=True,
+        )
+
+        self.assertEqual(json.loads(result.stdout.strip().splitlines()[-1])['loaded'], [])
+
+    def test_checking_tripos_breaker_does_not_import_requests(self):
+        script = (
+            "import django, json, sys; django.setup()\n"
+            "from api import ai_service, http_client\n"
+            "print(json.dumps([ai_service._tripo_open_for(), len(http_client._sessions), 'requests' in sys.modules]))"
+        )
+
+        result = subprocess.run(
+            [sys.executable, '-c', script], capture_output=True, text=True, cwd=settings.BASE_DIR, check=True,
+        )
+
+        self.assertEqual(json.loads(result.stdout.strip().splitlines()[-1]), [0, 0, False])
+
+
+class ScaleSeederTests(TestCase):
+    def seed(self, seed):
+        ScaleSeeder.clear()
+        ScaleSeeder(seed=seed, batch_size=4).run(
+            users=6, categories=2, products=5, designs=4, orders=12, cart_fraction=0.5, addresses_per_user=1,
+        )
+        return (
+            list(Product.objects.order_by('name').values_list('name', 'price', 'stock', 'created_at')),
+            list(Order.objects.order_by('user__email', 'created_at', 'total_price')
+                 .values_list('user__email', 'status', 'total_price', 'created_at')),
+            list(OrderItem.objects.order_by('order__user__email', 'order__created_at', 'item_name', 'quantity')
+                 .values_list('order__user__email', 'item_name', 'quantity', 'price')),
+        )
+
+    def test_same_seed_gives_the_same_rows(self):
+        first = self.seed(3)
+
+        self.assertEqual(self.seed(3), first)
+        self.assertNotEqual(self.seed(4)[0], first[0])
+
+
+class FaultInjectorTests(SimpleTestCase):
+    def decisions(self, faults, count=50, service='stripe'):
+        return [faults.decide(service) for _ in range(count)]
+
+    def test_same_seed_gives_the_same_faults(self):
+        fault_settings = {'latency_ms': 5, 'jitter_ms': 20, 'error_rate': 0.3, 'seed': 7}
+
+        first = self.decisions(FaultInjector(**fault_settings))
+
+        self.assertEqual(first, self.decisions(FaultInjector(**fault_settings)))
+        self.assertIn(500, [status for _, status in first])
+        self.assertNotEqual(first, self.decisions(FaultInjector(**{**fault_settings, 'seed': 8})))
+
+    def test_bursts_fail_the_first_requests_of_each_period_per_service(self):
+        faults = FaultInjector(burst_every=5, burst_length=2)
+
+        statuses = [status for _, status in self.decisions(faults, count=10)]
+
+        self.assertEqual(statuses, [503, 503, None, None, None] * 2)
+        self.assertEqual(faults.decide('tripo'), (0.0, 503))
+
+    def test_configure_reseeds_and_restarts_the_sequence(self):
+        faults = FaultInjector(error_rate=0.5, seed=1)
+        self.decisions(faults, count=3)
+
+        faults.configure(seed='2')
+
+        self.assertEqual(faults.config()['seed'], 2)
+        self.assertEqual(self.decisions(faults), self.decisions(FaultInjector(error_rate=0.5, seed=2)))
+
+    def test_invalid_settings_change_nothing(self):
+        faults = FaultInjector(error_rate=0.1)
+        before = faults.config()
+
+        with self.assertRaises(ValueError):
+            faults.configure(error_rate=0.9, bogus=1)
+        with self.assertRaises(ValueError):
+            faults.configure(error_rate=0.9, burst_every='often')
+
+        self.assertEqual(faults.config(), before)
@@ -0,0 +1,99 @@
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+
+logger = logging.getLogger('api.tracing')
+
+DEFAULT_SLOW_REQUEST_MS = 1000
+DEFAULT_SLOW_CALL_MS = 500
+
+_current_trace = ContextVar('current_trace', default=None)
+_current_span = ContextVar('current_span', default=None)
+
+
+class Span:
+    __slots__ = ('name', 'attributes', 'started', 'duration_ms', 'error', 'children')
+
+    def __init__(self, name, attributes):
+        self.name = name
+        self.attributes = attributes
+        self.started = time.perf_counter()
+        self.duration_ms = None
+        self.error = None
+        self.children = []
+
+    def as_dict(self, origin):
+        entry = {
+            'name': self.name,
+            'start_ms': round((self.started - origin) * 1000, 1),
+            'duration_ms': self.duration_ms,
+        }
+        if self.attributes:
+            entry['attributes'] = self.attributes
+        if self.error:
+            entry['error'] = self.error
+        if self.children:
+            entry['children'] = [child.as_dict(origin) for child in self.children]
+        return entry
+
+
+class Trace:
+    """The outbound calls made while handling one inbound request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = []
+
+    def outbound(self):
+        """Number of top-level spans and their total time in milliseconds."""
+        return len(self.spans), round(sum(span.duration_ms or 0 for span in self.spans), 1)
+
+    def as_list(self):
+        return [span.as_dict(self.started) for span in self.spans]
+
+
+def start_trace():
+    """Starts collecting spans for the current request; returns a token for finish_trace()."""
+    return _current_trace.set(Trace())
+
+
+def finish_trace(token):
+    trace = _current_trace.get()
+    _current_trace.reset(token)
+    return trace
+
+
+def slow_request_ms():
+    return getattr(settings, 'TRACE_SLOW_REQUEST_MS', DEFAULT_SLOW_REQUEST_MS)
+
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Times the enclosed outbound call. Spans nest under the enclosing span and attach to
+    the current request's trace; a call slower than TRACE_SLOW_CALL_MS is logged on its own.
+    """
+    current = Span(name, attributes)
+    parent = _current_span.get()
+    trace = _current_trace.get()
+    if parent is not None:
+        parent.children.append(current)
+    elif trace is not None:
+        trace.spans.append(current)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except Exception as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_span.reset(token)
+        current.duration_ms = round((time.perf_counter() - current.started) * 1000, 1)
+        if current.duration_ms >= getattr(settings, 'TRACE_SLOW_CALL_MS', DEFAULT_SLOW_CALL_MS):
+            logger.warning(
+                f"Slow outbound call {name}: {current.duration_ms}ms",
+                extra={'span': name, 'duration_ms': current.duration_ms, 'attributes': attributes},
+            )
+
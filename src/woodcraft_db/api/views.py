@@ -1,17 +1,98 @@
 from django.shortcuts import render
 from django.views.decorators.csrf import csrf_exempt
-from django.http import JsonResponse
-import stripe
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
 from django.conf import settings
+from django.db import transaction
+from django.db.models import F
 from .models import Cart, CartItem, Order, CustomUser, Product, OrderItem, CustomerDesign
 from decimal import Decimal
 import json
+import logging
+import re
 from api.ai_service import initiate_task_id
+from api.analytics import mark_rollups_stale, order_day
+from api.catalog import schedule_catalog_bump
+from api.http_client import get_stripe
+from api.pricing import quote_design
+from api.mirroring import asset_content_type, open_asset
+from api.tracing import span
+
+logger = logging.getLogger(__name__)
+
+CUSTOM_DESIGN_PREFIX = 'Custom Design - '
+
+
+def _metadata_value(metadata, key):
+    # StripeObject supports `in` and indexing but not dict.get.
+    return metadata[key] if metadata is not None and key in metadata else None
+
+
+def _line_item_ids(item):
+    """(product_id, design_id) from the metadata checkout attaches to each line item's product."""
+    metadata = item.price.product.metadata if item.price and not isinstance(item.price.product, str) else None
+    product_id = _metadata_value(metadata, 'product_id')
+    design_id = _metadata_value(metadata, 'design_id')
+    return (int(product_id) if product_id else None), (int(design_id) if design_id else None)
+
+
+def _order_items_from_line_items(user, line_items):
+    """
+    Builds unsaved OrderItems (without their order) from Stripe line items, resolving products and
+    designs by primary key in one query each. Sessions created before line items carried ids fall
+    back to a batched name lookup. Returns (order_items, {product_id: quantity sold}).
+    """
+    resolved = [(item, *_line_item_ids(item)) for item in line_items]
+    product_ids = {product_id for _, product_id, _ in resolved if product_id}
+    design_ids = {design_id for _, _, design_id in resolved if design_id}
+    legacy_names = {item.description for item, product_id, design_id in resolved if not (product_id or design_id)}
+
+    products = Product.objects.in_bulk(product_ids)
+    designs = CustomerDesign.objects.filter(user=user).in_bulk(design_ids)
+    products_by_name, designs_by_description = {}, {}
+    if legacy_names:
+        design_descriptions = {
+            name[len(CUSTOM_DESIGN_PREFIX):] for name in legacy_names if name.startswith(CUSTOM_DESIGN_PREFIX)
+        }
+        products_by_name = {product.name: product for product in Product.objects.filter(name__in=legacy_names)}
+        designs_by_description = {
+            design.design_description: design
+            for design in CustomerDesign.objects.filter(user=user, design_description__in=design_descriptions)
+        }
+
+    order_items, sold = [], {}
+    for item, product_id, design_id in resolved:
+        unit_price = Decimal(item.amount_total / (item.quantity * 100))
+        if product_id or design_id:
+            product = products.get(product_id)
+            design = designs.get(design_id)
+        elif item.description.startswith(CUSTOM_DESIGN_PREFIX):
+            product = None
+            design = designs_by_description.get(item.description[len(CUSTOM_DESIGN_PREFIX):])
+        else:
+            product = products_by_name.get(item.description)
+            design = None
+
+        if product is not None:
+            sold[product.id] = sold.get(product.id, 0) + item.quantity
+            order_items.append(OrderItem(
+                product=product, quantity=item.quantity, price=unit_price,
+                **OrderItem.snapshot(product=product),
+            ))
+        elif design is not None:
+            order_items.append(OrderItem(
+                customer_design=design, quantity=item.quantity, price=unit_price,
+                **OrderItem.snapshot(customer_design=design),
+            ))
+        else:
+            logger.warning(f"No product or design found for line item '{item.description}'")
+    return order_items, sold
+
 
 @csrf_exempt
 def stripe_webhook(request):
     payload = request.body
     sig_header = request.META.get("HTTP_STRIPE_SIGNATURE", "")
+    stripe = get_stripe()
     try:
         event = stripe.Webhook.construct_event(
             payload, sig_header, settings.STRIPE_WEBHOOK_SECRET
@@ -19,68 +100,48 @@ def stripe_webhook(request):
 
         if event.type == "checkout.session.completed":
             session = event.data.object
-            user_id = session.metadata.get("user_id")
-            currency = session.metadata.get("currency").upper()
+            user_id = _metadata_value(session.metadata, "user_id")
+            currency = _metadata_value(session.metadata, "currency").upper()
             total_price=Decimal(session.amount_total / 100)
             address = f"{session.shipping_details.address.line1}, {session.shipping_details.address.city}, {session.shipping_details.address.state}, {session.shipping_details.address.country}, {session.shipping_details.address.postal_code}"
             if user_id:
-                
                 user = CustomUser.objects.get(id=user_id)
-                order = Order.objects.create(
-                    user=user,
-                    total_price=total_price,
-                    address=address,
-                    currency=currency,
-                    status="pending",
-                )
-                
-                line_items = stripe.checkout.Session.list_line_items(session.id, limit=100)
-                for item in line_items.data:
-                        try:
-                            unit_price = Decimal(item.amount_total / (item.quantity * 100))
-                        # Check if this is a custom design by looking at the name prefix
-                            if item.description.startswith('Custom Design -'):
-
-                                design_description = item.description.replace('Custom Design - ', '')
-                                customer_design = CustomerDesign.objects.get(
-                                    user=user,
-                                    design_description=design_description
-                                )
-                                
-                                order_item = OrderItem.objects.create(
-                                    order=order,
-                                    customer_design=customer_design,
-                                    product=None,  # No product for custom designs
-                                    quantity=item.quantity,
-                                    price=unit_price,
-                                )
-                            else:
-                                # Regular product
-                                product = Product.objects.get(name=item.description)
-                                product.stock -= item.quantity
-                                product.purchase_count += item.quantity
-                                product.save()
-                                order_item = OrderItem.objects.create(
-                                    order=order,
-                                    product=product,
-                                    customer_design=None,  # No custom design for regular products
-                                    quantity=item.quantity,
-                                    price=unit_price,
-                                )
-                        except CustomerDesign.DoesNotExist:
-                          print(f"CustomerDesign not found for description: {design_description}")
-                          continue
-                        except Product.DoesNotExist:
-                            print(f"Product not found for description: {item.description}")
-                            continue
-
-                CartItem.objects.filter(cart__user_id=user_id).delete()
+                # Stripe round-trips happen before the transaction opens; it only covers the writes.
+                with span('stripe.checkout.Session.list_line_items'):
+                    line_items = list(stripe.checkout.Session.list_line_items(
+                        session.id, limit=100, expand=['data.price.product']
+                    ).auto_paging_iter())
+                order_items, sold = _order_items_from_line_items(user, line_items)
+
+                with transaction.atomic():
+                    order = Order.objects.create(
+                        user=user,
+                        total_price=total_price,
+                        address=address,
+                        currency=currency,
+                        status="pending",
+                    )
+                    for order_item in order_items:
+                        order_item.order = order
+                    OrderItem.objects.bulk_create(order_items)
+                    for product_id, quantity in sold.items():
+                        Product.objects.filter(id=product_id).update(
+                            stock=F('stock') - quantity,
+                            purchase_count=F('purchase_count') + quantity,
+                        )
+                    if sold:
+                        schedule_catalog_bump()
+
+                    CartItem.objects.filter(cart__user_id=user_id).delete()
+                    mark_rollups_stale([order_day(order)])
 
         return JsonResponse({"success": True})
 
     except stripe.error.SignatureVerificationError:
+        logger.warning("Rejected Stripe webhook with an invalid signature")
         return JsonResponse({"error": "Invalid signature"}, status=400)
     except Exception as e:
+        logger.exception("Stripe webhook failed")
         return JsonResponse({"error": str(e)}, status=400)
 
 
@@ -97,46 +158,129 @@ def product_configurator(request):
                 'thickness': payload.get('thickness')
             }
 
-            response_data = initiate_task_id(
-                design_prompt=design_prompt,
+            quote = quote_design(
+                width=payload.get('width', 0),
+                height=payload.get('height', 0),
+                thickness=payload.get('thickness', 0),
                 material=payload.get('material'),
-                dimensions=dimensions
+                design_description=payload.get('design_description', ''),
             )
 
+            quote_data = {
+                'estimated_price': quote['estimated_price'],
+                'complexity_score': quote['complexity_score'],
+                'production_time': quote['production_time'],
+            }
+
+            # The quote never depends on Tripo: if generation fails outright the customer still gets it.
+            try:
+                response_data = initiate_task_id(
+                    design_prompt=design_prompt,
+                    material=payload.get('material'),
+                    dimensions=dimensions
+                )
+            except Exception:
+                logger.exception("Failed to start model generation")
+                response_data = None
+
             if not response_data:
                 return JsonResponse({
                     'success': False,
+                    **quote_data,
                     'message': 'Failed to generate 3D model'
                 })
 
-            material_multipliers = {
-                'oak': 1.5,
-                'maple': 1.8,
-                'pine': 0.7,
-                'mahogany': 1.2,
-                'walnut': 2.0
-            }
-
-            complexity_score = min(100, (len(payload.get('design_description', '')) / 150) * 100)
-            size_factor = (payload.get('height', 0) * payload.get('width', 0) * payload.get('thickness', 0)) / 1000
-            base_price = 2500
-            material_factor = material_multipliers.get(payload.get('material'), 1.0)
-            estimated_price = base_price * (complexity_score / 100) * material_factor * max(1, size_factor)
-
-            production_days = int((complexity_score / 10) + (size_factor * 2)) + 5
-            production_time = f"{production_days} days"
-            if production_days > 14:
-                production_weeks = (production_days + 6) // 7
-                production_time = f"{production_weeks} weeks"
+            if response_data.get('queued'):
+                # Tripo is busy or unavailable; the generation is persisted and runs later. Designs
+                # saved with this generation_id stay pending generation until the model is ready.
+                return JsonResponse({
+                    'success': True,
+                    **quote_data,
+                    'task_id': None,
+                    'queued': True,
+                    'pending_generation': True,
+                    'generation_id': response_data.get('generation_id'),
+                    'estimated_wait': response_data.get('estimated_wait'),
+                    'message': 'Model generation queued',
+                })
 
             return JsonResponse({
                 'success': True,
-                'estimated_price': float(estimated_price),
-                'complexity_score': complexity_score,
-                'production_time': production_time,
+                **quote_data,
                 'task_id': response_data.get('task_id'),
+                'generation_id': response_data.get('generation_id'),
+                'model_url': response_data.get('model_url'),
+                'thumbnail_url': response_data.get('thumbnail_url'),
+                'cached': response_data.get('cached', False),
                 'message': 'Model generation started successfully',
             })
         except Exception as e:
             return JsonResponse({'success': False, 'error': str(e)}, status=500)
-    return JsonResponse({'success': False, 'message': 'Invalid request method'}, status=405)
\ No newline at end of file
+    return JsonResponse({'success': False, 'message': 'Invalid request method'}, status=405)
+
+RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+ASSET_STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def _iter_file_range(asset, start, length):
+    try:
+        asset.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = asset.read(min(ASSET_STREAM_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        asset.close()
+
+
+def serve_design_asset(request, name):
+    if request.method not in ("GET", "HEAD"):
+        return JsonResponse({'success': False, 'message': 'Invalid request method'}, status=405)
+
+    opened = open_asset(name)
+    if opened is None:
+        raise Http404("Asset not found")
+    asset, size = opened
+
+    # Asset names are content hashes, so the name doubles as a strong ETag.
+    etag = f'"{name.split("/")[-1].split(".")[0]}"'
+    headers = {
+        'ETag': etag,
+        'Accept-Ranges': 'bytes',
+        'Cache-Control': 'public, max-age=31536000, immutable',
+    }
+    content_type = asset_content_type(name)
+
+    if request.headers.get('If-None-Match') == etag:
+        asset.close()
+        return HttpResponseNotModified(headers=headers)
+
+    match = RANGE_PATTERN.match(request.headers.get('Range', '').strip())
+    if_range = request.headers.get('If-Range')
+    if match and (not if_range or if_range == etag) and any(match.groups()):
+        first, last = match.groups()
+        if first:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+        else:
+            start = max(0, size - int(last))
+            end = size - 1
+        if start > end or start >= size:
+            asset.close()
+            response = HttpResponse(status=416, headers=headers)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+        length = end - start + 1
+        response = StreamingHttpResponse(
+            _iter_file_range(asset, start, length), status=206, content_type=content_type, headers=headers
+        )
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(length)
+        return response
+
+    response = FileResponse(asset, content_type=content_type, headers=headers)
+    response['Content-Length'] = str(size)
+    return response
@@ -0,0 +1,8 @@
+"""
+Local stand-ins for the external services this backend calls: Stripe Checkout, Tripo3D
+task creation/polling and Fixer exchange rates. They implement only the endpoints the
+backend uses, keep state in memory and can inject latency, errors and 503 bursts, so
+checkout, generation and rate paths can be exercised offline and deterministically.
+
+Run with `manage.py run_fake_services` and set FAKE_SERVICES_URL to point the backend at it.
+"""
@@ -0,0 +1,77 @@
+import random
+import threading
+import time
+
+
+class FaultInjector:
+    """
+    Decides, per request, how long to stall and whether to fail. Decisions come from one
+    Random(seed) and a request counter per service, so the same request sequence sees the
+    same faults on every run.
+
+    - latency_ms / jitter_ms: added to every response.
+    - error_rate: share of requests answered with a 500.
+    - burst_every / burst_length: the first `burst_length` of every `burst_every` requests
+      to a service get a 503 with Retry-After, like an upstream shedding load.
+    """
+
+    FIELDS = {
+        'latency_ms': float,
+        'jitter_ms': float,
+        'error_rate': float,
+        'burst_every': int,
+        'burst_length': int,
+        'retry_after': int,
+        'seed': int,
+    }
+
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, burst_every=0, burst_length=0,
+                 retry_after=1, seed=0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.burst_every = burst_every
+        self.burst_length = burst_length
+        self.retry_after = retry_after
+        self.seed = seed
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.rng = random.Random(self.seed)
+            self.counters = {}
+
+    def configure(self, **values):
+        """Applies new settings and restarts the fault sequence; nothing changes unless every value is valid."""
+        for name in values:
+            if name not in self.FIELDS:
+                raise ValueError(f"Unknown fault setting '{name}'")
+        try:
+            converted = {name: self.FIELDS[name](value) for name, value in values.items()}
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid fault settings: {values}")
+        with self.lock:
+            for name, value in converted.items():
+                setattr(self, name, value)
+        self.reset()
+
+    def config(self):
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+    def decide(self, service):
+        """Returns (delay_seconds, status) where status is None for a normal response, or 500/503."""
+        with self.lock:
+            count = self.counters.get(service, 0)
+            self.counters[service] = count + 1
+            delay = (self.latency_ms + self.rng.uniform(0, self.jitter_ms)) / 1000
+            failed = self.rng.random() < self.error_rate
+        if self.burst_every and count % self.burst_every < self.burst_length:
+            return delay, 503
+        return delay, 500 if failed else None
+
+    def apply(self, service):
+        delay, status = self.decide(service)
+        if delay:
+            time.sleep(delay)
+        return status
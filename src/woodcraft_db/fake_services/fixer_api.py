@@ -0,0 +1,24 @@
+# EUR-based rates, as on Fixer's free plan.
+RATES = {
+    'EUR': 1.0,
+    'PHP': 63.2,
+    'USD': 1.09,
+    'CAD': 1.48,
+    'AUD': 1.64,
+    'GBP': 0.85,
+    'JPY': 163.5,
+    'SGD': 1.46,
+}
+
+
+class FakeFixer:
+    def latest(self, query):
+        params = dict(query)
+        if not params.get('access_key') or params['access_key'] == 'None':
+            return {'success': False, 'error': {'code': 101, 'type': 'missing_access_key'}}
+        symbols = [symbol.strip().upper() for symbol in params.get('symbols', '').split(',') if symbol.strip()]
+        unknown = [symbol for symbol in symbols if symbol not in RATES]
+        if unknown:
+            return {'success': False, 'error': {'code': 202, 'type': 'invalid_currency_codes'}}
+        rates = {symbol: RATES[symbol] for symbol in symbols} if symbols else dict(RATES)
+        return {'success': True, 'base': 'EUR', 'rates': rates}
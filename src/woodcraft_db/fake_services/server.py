@@ -0,0 +1,152 @@
+import json
+import logging
+import re
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+from .faults import FaultInjector
+from .fixer_api import FakeFixer
+from .stripe_api import FakeStripe, StripeError, parse_form
+from .tripo_api import FakeTripo, TripoError
+
+logger = logging.getLogger(__name__)
+
+
+class FakeServices:
+    """The three fakes behind one router; `faults` applies to every route except /_fake control routes."""
+
+    def __init__(self, stripe, tripo, fixer, faults):
+        self.stripe = stripe
+        self.tripo = tripo
+        self.fixer = fixer
+        self.faults = faults
+        self.routes = [
+            ('POST', r'/stripe/v1/checkout/sessions', 'stripe', self.stripe_create_session),
+            ('GET', r'/stripe/v1/checkout/sessions/(?P<session_id>[^/]+)', 'stripe', self.stripe_get_session),
+            ('GET', r'/stripe/v1/checkout/sessions/(?P<session_id>[^/]+)/line_items', 'stripe', self.stripe_line_items),
+            ('GET', r'/stripe/pay/(?P<session_id>[^/]+)', None, self.stripe_pay),
+            ('POST', r'/tripo/v2/openapi/task', 'tripo', self.tripo_create_task),
+            ('GET', r'/tripo/v2/openapi/task/(?P<task_id>[^/]+)', 'tripo', self.tripo_get_task),
+            ('GET', r'/tripo/files/(?P<name>[^/]+)', 'tripo', self.tripo_file),
+            ('GET', r'/fixer/api/latest', 'fixer', self.fixer_latest),
+            ('POST', r'/_fake/stripe/sessions/(?P<session_id>[^/]+)/complete', None, self.stripe_complete),
+            ('GET', r'/_fake/config', None, self.get_config),
+            ('POST', r'/_fake/config', None, self.set_config),
+        ]
+        self.routes = [(method, re.compile(f'^{pattern}$'), service, view) for method, pattern, service, view in self.routes]
+
+    def handle(self, request):
+        for method, pattern, service, view in self.routes:
+            match = pattern.match(request.path)
+            if match is None or method != request.method:
+                continue
+            if service is not None:
+                status = self.faults.apply(service)
+                if status == 503:
+                    return 503, {'Retry-After': str(self.faults.retry_after)}, {'error': 'Service Unavailable'}
+                if status == 500:
+                    return 500, {}, {'error': 'Injected failure'}
+            try:
+                return view(request, **match.groupdict())
+            except (StripeError, TripoError) as e:
+                return e.status, {}, e.body
+        return 404, {}, {'error': f"No fake for {request.method} {request.path}"}
+
+    def stripe_create_session(self, request):
+        return 200, {}, self.stripe.create_session(parse_form(request.body.decode()), request.base_url)
+
+    def stripe_get_session(self, request, session_id):
+        expand = [value for key, value in request.query if key.startswith('expand')]
+        return 200, {}, self.stripe.render_session(session_id, expand)
+
+    def stripe_line_items(self, request, session_id):
+        return 200, {}, self.stripe.list_line_items(session_id, request.query)
+
+    def stripe_pay(self, request, session_id):
+        # What a shopper's browser does on the hosted page: pay, then land on success_url.
+        self.stripe.complete(session_id)
+        session = self.stripe.render_session(session_id, [])
+        return 303, {'Location': session['success_url'] or '/'}, None
+
+    def stripe_complete(self, request, session_id):
+        params = json.loads(request.body or b'{}')
+        return 200, {}, self.stripe.complete(
+            session_id, params.get('shipping_details'), params.get('shipping_option', 0)
+        )
+
+    def tripo_create_task(self, request):
+        return 200, {}, self.tripo.create_task(request.headers, json.loads(request.body or b'{}'))
+
+    def tripo_get_task(self, request, task_id):
+        return 200, {}, self.tripo.get_task(request.headers, task_id, request.base_url)
+
+    def tripo_file(self, request, name):
+        content_type, body = self.tripo.get_file(name)
+        return 200, {'Content-Type': content_type}, body
+
+    def fixer_latest(self, request):
+        return 200, {}, self.fixer.latest(request.query)
+
+    def get_config(self, request):
+        return 200, {}, {**self.faults.config(), 'tripo_duration': self.tripo.duration}
+
+    def set_config(self, request):
+        params = json.loads(request.body or b'{}')
+        try:
+            tripo_duration = float(params.pop('tripo_duration', self.tripo.duration))
+            self.faults.configure(**params)
+        except (TypeError, ValueError) as e:
+            return 400, {}, {'error': str(e)}
+        self.tripo.duration = tripo_duration
+        return self.get_config(request)
+
+
+class FakeRequest:
+    def __init__(self, handler):
+        url = urlsplit(handler.path)
+        self.method = handler.command
+        self.path = url.path.rstrip('/') or '/'
+        self.query = parse_qsl(url.query, keep_blank_values=True)
+        self.headers = handler.headers
+        length = int(handler.headers.get('Content-Length') or 0)
+        self.body = handler.rfile.read(length) if length else b''
+        self.base_url = f"http://{handler.headers.get('Host') or '%s:%s' % handler.server.server_address[:2]}"
+
+
+def make_handler(services):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _dispatch(self):
+            status, headers, body = services.handle(FakeRequest(self))
+            if isinstance(body, bytes):
+                payload = body
+            else:
+                payload = b'' if body is None else json.dumps(body).encode()
+                headers.setdefault('Content-Type', 'application/json')
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        do_GET = do_POST = _dispatch
+
+        def log_message(self, format, *args):
+            logger.info(f"{self.address_string()} {format % args}")
+
+    return Handler
+
+
+def build_server(host='127.0.0.1', port=8765, webhook_secret='whsec_test', webhook_url=None, tripo_duration=5.0,
+                 faults=None):
+    services = FakeServices(
+        stripe=FakeStripe(webhook_secret, webhook_url),
+        tripo=FakeTripo(tripo_duration),
+        fixer=FakeFixer(),
+        faults=faults or FaultInjector(),
+    )
+    server = ThreadingHTTPServer((host, port), make_handler(services))
+    server.daemon_threads = True
+    server.services = services
+    return server
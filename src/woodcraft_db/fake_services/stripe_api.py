@@ -0,0 +1,212 @@
+import hashlib
+import hmac
+import itertools
+import json
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+from urllib.parse import parse_qsl
+
+API_VERSION = '2024-06-20'
+DEFAULT_SHIPPING_DETAILS = {
+    'name': 'Juan Dela Cruz',
+    'address': {
+        'line1': '123 Mabini St.', 'line2': None, 'city': 'Makati', 'state': 'Metro Manila',
+        'country': 'PH', 'postal_code': '1200',
+    },
+}
+
+
+def parse_form(body):
+    """Decodes Stripe's form encoding (`line_items[0][price_data][currency]=php`) into nested dicts and lists."""
+    root = {}
+    for key, value in parse_qsl(body, keep_blank_values=True):
+        parts = re.findall(r'[^\[\]]+|\[\]', key)
+        node = root
+        for part, following in zip(parts, parts[1:] + [None]):
+            if following is None:
+                if part == '[]':
+                    node.setdefault('[]', []).append(value)
+                else:
+                    node[part] = value
+            else:
+                node = node.setdefault(part, {})
+    return _listify(root)
+
+
+def _listify(node):
+    if not isinstance(node, dict):
+        return node
+    if set(node) == {'[]'}:
+        return node['[]']
+    if node and all(key.isdigit() for key in node):
+        return [_listify(node[key]) for key in sorted(node, key=int)]
+    return {key: _listify(value) for key, value in node.items()}
+
+
+def sign_payload(payload, secret, timestamp=None):
+    """Builds a Stripe-Signature header for `payload` (a str) the way Stripe signs webhooks."""
+    timestamp = int(timestamp or time.time())
+    signature = hmac.new(secret.encode(), f"{timestamp}.{payload}".encode(), hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={signature}"
+
+
+class StripeError(Exception):
+    def __init__(self, status, message, error_type='invalid_request_error'):
+        super().__init__(message)
+        self.status = status
+        self.body = {'error': {'type': error_type, 'message': message}}
+
+
+class FakeStripe:
+    """Checkout Sessions, their line items and checkout.session.completed webhooks."""
+
+    def __init__(self, webhook_secret, webhook_url=None):
+        self.webhook_secret = webhook_secret
+        self.webhook_url = webhook_url
+        self.sessions = {}
+        self.ids = itertools.count(1)
+        self.lock = threading.Lock()
+
+    def _id(self, prefix):
+        return f"{prefix}_test_{next(self.ids):08d}"
+
+    def create_session(self, params, base_url):
+        line_items = []
+        for index, item in enumerate(params.get('line_items', [])):
+            price_data = item.get('price_data', {})
+            product_data = price_data.get('product_data', {})
+            quantity = int(item.get('quantity', 1))
+            unit_amount = int(price_data.get('unit_amount', 0))
+            currency = price_data.get('currency', params.get('currency', 'php'))
+            line_items.append({
+                'id': self._id('li'),
+                'object': 'item',
+                'description': product_data.get('name', ''),
+                'quantity': quantity,
+                'currency': currency,
+                'amount_subtotal': unit_amount * quantity,
+                'amount_total': unit_amount * quantity,
+                'price': {
+                    'id': self._id('price'),
+                    'object': 'price',
+                    'currency': currency,
+                    'unit_amount': unit_amount,
+                    'product': {
+                        'id': self._id('prod'),
+                        'object': 'product',
+                        'name': product_data.get('name', ''),
+                        'images': product_data.get('images', []),
+                        'metadata': product_data.get('metadata', {}),
+                    },
+                },
+            })
+        subtotal = sum(item['amount_total'] for item in line_items)
+        session_id = self._id('cs')
+        session = {
+            'id': session_id,
+            'object': 'checkout.session',
+            'mode': params.get('mode', 'payment'),
+            'status': 'open',
+            'payment_status': 'unpaid',
+            'currency': params.get('currency'),
+            'customer_email': params.get('customer_email'),
+            'customer_details': None,
+            'metadata': params.get('metadata', {}),
+            'amount_subtotal': subtotal,
+            'amount_total': subtotal,
+            'shipping_options': params.get('shipping_options', []),
+            'shipping_details': None,
+            'success_url': params.get('success_url'),
+            'cancel_url': params.get('cancel_url'),
+            'url': f"{base_url}/stripe/pay/{session_id}",
+            'created': int(time.time()),
+        }
+        with self.lock:
+            self.sessions[session_id] = (session, line_items)
+        return self.render_session(session_id, [])
+
+    def _get(self, session_id):
+        with self.lock:
+            found = self.sessions.get(session_id)
+        if found is None:
+            raise StripeError(404, f"No such checkout.session: '{session_id}'")
+        return found
+
+    def render_session(self, session_id, expand):
+        session, line_items = self._get(session_id)
+        session = dict(session)
+        if 'line_items' in expand:
+            session['line_items'] = self._list(session_id, line_items, expand=[], limit=100)
+        return session
+
+    def list_line_items(self, session_id, query):
+        _, line_items = self._get(session_id)
+        expand = [value for key, value in query if key.startswith('expand')]
+        params = dict(query)
+        return self._list(
+            session_id, line_items, expand=expand,
+            limit=int(params.get('limit', 10)), starting_after=params.get('starting_after'),
+        )
+
+    @staticmethod
+    def _list(session_id, line_items, expand, limit, starting_after=None):
+        start = 0
+        if starting_after:
+            start = next((i + 1 for i, item in enumerate(line_items) if item['id'] == starting_after), len(line_items))
+        page = line_items[start:start + limit]
+        if 'data.price.product' not in expand:
+            page = [{**item, 'price': {**item['price'], 'product': item['price']['product']['id']}} for item in page]
+        return {
+            'object': 'list',
+            'url': f"/v1/checkout/sessions/{session_id}/line_items",
+            'has_more': start + limit < len(line_items),
+            'data': page,
+        }
+
+    def complete(self, session_id, shipping_details=None, shipping_option=0):
+        """
+        Marks the session paid, adds the chosen shipping rate, then signs a
+        checkout.session.completed event and, when a webhook URL is set, delivers it.
+        """
+        session, line_items = self._get(session_id)
+        with self.lock:
+            if session['status'] != 'complete':
+                options = session['shipping_options']
+                if options:
+                    rate = options[min(int(shipping_option), len(options) - 1)]['shipping_rate_data']
+                    session['amount_total'] = session['amount_subtotal'] + int(rate['fixed_amount']['amount'])
+                session['status'] = 'complete'
+                session['payment_status'] = 'paid'
+                session['shipping_details'] = shipping_details or DEFAULT_SHIPPING_DETAILS
+                session['customer_details'] = {'email': session['customer_email'], 'name': session['shipping_details']['name']}
+        event = {
+            'id': self._id('evt'),
+            'object': 'event',
+            'api_version': API_VERSION,
+            'created': int(time.time()),
+            'type': 'checkout.session.completed',
+            'livemode': False,
+            'data': {'object': dict(session)},
+        }
+        payload = json.dumps(event)
+        signature = sign_payload(payload, self.webhook_secret)
+        delivered = None
+        if self.webhook_url:
+            delivered = self.deliver(payload, signature)
+        return {'event': event, 'signature': signature, 'webhook_status': delivered}
+
+    def deliver(self, payload, signature):
+        request = urllib.request.Request(
+            self.webhook_url, data=payload.encode(), method='POST',
+            headers={'Content-Type': 'application/json', 'Stripe-Signature': signature},
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+        except urllib.error.URLError:
+            return None
@@ -0,0 +1,85 @@
+import itertools
+import struct
+import threading
+import time
+
+
+def _minimal_glb():
+    """Smallest valid binary glTF: a header and a JSON chunk declaring an empty asset."""
+    chunk = b'{"asset":{"version":"2.0"}}'
+    chunk += b' ' * (-len(chunk) % 4)
+    return struct.pack('<4sII', b'glTF', 2, 20 + len(chunk)) + struct.pack('<I4s', len(chunk), b'JSON') + chunk
+
+
+GLB_BYTES = _minimal_glb()
+# A 1x1 PNG, so mirroring downloads real image bytes.
+PNG_BYTES = bytes.fromhex(
+    '89504e470d0a1a0a0000000d4948445200000001000000010806000000'
+    '1f15c4890000000d49444154789c6360000002000100e221bc330000000049454e44ae426082'
+)
+
+
+class TripoError(Exception):
+    def __init__(self, status, code, message):
+        super().__init__(message)
+        self.status = status
+        self.body = {'code': code, 'message': message}
+
+
+class FakeTripo:
+    """
+    Text-to-model tasks that move from queued to running to success over `duration`
+    seconds, with model and thumbnail files served by the fake itself.
+    """
+
+    def __init__(self, duration=5.0):
+        self.duration = duration
+        self.tasks = {}
+        self.ids = itertools.count(1)
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _check_auth(headers):
+        if not (headers.get('Authorization') or '').startswith('Bearer ') or headers['Authorization'] == 'Bearer None':
+            raise TripoError(401, 1002, 'Authentication failed')
+
+    def create_task(self, headers, payload):
+        self._check_auth(headers)
+        if not payload.get('type') or (payload.get('type') != 'refine' and not payload.get('prompt')):
+            raise TripoError(400, 2002, 'Invalid task parameters')
+        task_id = f"fake-{next(self.ids):08d}"
+        with self.lock:
+            self.tasks[task_id] = {'type': payload['type'], 'prompt': payload.get('prompt'), 'created': time.monotonic()}
+        return {'code': 0, 'data': {'task_id': task_id}}
+
+    def get_task(self, headers, task_id, base_url):
+        self._check_auth(headers)
+        with self.lock:
+            task = self.tasks.get(task_id)
+        if task is None:
+            raise TripoError(404, 2001, 'Task not found')
+        elapsed = time.monotonic() - task['created']
+        progress = 100 if not self.duration else min(100, int(elapsed / self.duration * 100))
+        if progress >= 100:
+            status = 'success'
+        elif progress < 10:
+            status = 'queued'
+        else:
+            status = 'running'
+        data = {'task_id': task_id, 'type': task['type'], 'status': status, 'progress': progress, 'output': {}}
+        if status == 'success':
+            data['output'] = {
+                'pbr_model': f"{base_url}/tripo/files/{task_id}.glb",
+                'rendered_image': f"{base_url}/tripo/files/{task_id}.png",
+            }
+        return {'code': 0, 'data': data}
+
+    def get_file(self, name):
+        task_id, _, extension = name.rpartition('.')
+        with self.lock:
+            known = task_id in self.tasks
+        if not known or extension not in ('glb', 'png'):
+            raise TripoError(404, 2001, 'File not found')
+        if extension == 'glb':
+            return 'model/gltf-binary', GLB_BYTES
+        return 'image/png', PNG_BYTES
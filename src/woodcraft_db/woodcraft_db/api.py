@@ -6,23 +6,40 @@ from django.middleware.csrf import get_token
 from ninja.security import django_auth
 from api.schemas import *
 import logging
-from api.ai_service import initiate_task_id, poll_task_status
+from api.catalog import catalog_response
+from api.catalog_io import detect_format, import_products, iter_export
+from api.ai_service import get_generation_status, initiate_task_id, poll_task_status, settle_new_design
+from api import http_client
+from api.guest_cart import (
+    GuestCartError, load_guest_cart, merge_guest_cart, price_guest_cart, save_guest_cart, set_item_quantity,
+)
+from api.addresses import LEVELS as ADDRESS_LEVELS, MAX_AUTOCOMPLETE_LIMIT, AddressValidationError, get_gazetteer
+from api.mirroring import is_mirrorable_url, is_mirrored_url, schedule_mirror
+from api.order_status import MAX_BULK_ORDERS, transition_orders
+from api.profiles import get_user_profile
+from api.shipping import cart_weight_kg, product_weight_kg, quote_shipping, stripe_shipping_options
+from api.tracing import span
+from api.pagination import decode_cursor, encode_cursor, page_size
+from api.pricing import MAX_BATCH_SIZE, format_production_time, quote_batch, quote_grid
 from django.views.decorators.csrf import csrf_exempt, ensure_csrf_cookie
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 from django.http import JsonResponse as JSONResponse
-import stripe
 from django.conf import settings
+from django.db import transaction
 import os
-from dotenv import load_dotenv
-import requests
+import zipfile
+from datetime import date, timedelta
 from decimal import Decimal
+from django.db.models import Count, DecimalField, Max, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 
-load_dotenv()
 logger = logging.getLogger(__name__)
 
 api = NinjaAPI(csrf=True)
 FIXER_API_KEY = os.getenv("FIXER_API_KEY")
-FIXER_API_URL = f"http://data.fixer.io/api/latest?access_key={FIXER_API_KEY}&base=EUR"
+FIXER_API_URL = f"{settings.FIXER_API_BASE}/latest?access_key={FIXER_API_KEY}&base=EUR"
 
 @api.post("/csrf")
 @ensure_csrf_cookie
@@ -38,34 +55,16 @@ def set_csrf_token(request):
 def login_view(request, payload: SignInSchema):
     user = authenticate(request, username = payload.email, password = payload.password)
     if user is not None:
-        if user.is_superuser:
-            login(request, user)
-            user_data = {
-                "email": user.email,
-                "firstName": user.first_name,
-                "lastName": user.last_name,
-                "is_admin": True
-            }
-            response = JSONResponse({"success": True,
-                    "user": user_data}
-            )
-            return response
-        else:
-            login(request, user)
-            user_data = {
-                "email": user.email,
-                "firstName": user.first_name,
-                "lastName": user.last_name,
-                "address": user.address,
-                "phoneNumber": user.phone_number,
-                "gender": user.gender,
-                "dateOfBirth": user.date_of_birth,
-                "profilePicture": user.profile_picture.url if user.profile_picture else None,
-            }
-            response = JSONResponse({"success": True,
-                    "user": user_data}
-            )
-            return response
+        login(request, user)
+        guest_items = load_guest_cart(request)
+        if guest_items:
+            merge_guest_cart(user, guest_items)
+        response = JSONResponse({"success": True,
+                "user": get_user_profile(user)}
+        )
+        if guest_items:
+            save_guest_cart(response, {})
+        return response
     return {"success": False, "message": "Invalid Credentials"}
 
 @api.post("/logout", auth=django_auth)
@@ -88,28 +87,8 @@ def register_view(request, payload: SignUpSchema):
 def get_user(request):
     user = request.user
     if user:
-        if user.is_superuser:
-            return {
-                "success": True,
-                "id": request.user.id,
-                "email": request.user.email,
-                "firstName": request.user.first_name,
-                "lastName": request.user.last_name,
-                "is_admin": True
-            }
-        else:
-            return{ 
-                "success": True,
-                "id": request.user.id,
-                "email": request.user.email,
-                "firstName": request.user.first_name,
-                "lastName": request.user.last_name,
-                "address": request.user.address,
-                "phoneNumber": request.user.phone_number,
-                "gender": request.user.gender,
-                "dateOfBirth": request.user.date_of_birth,
-                "is_admin": False
-            }
+        # Served from the cache: with a cached session and user this costs no queries.
+        return {"success": True, **get_user_profile(user)}
     else:
         return{
             "message": "User not logged in"
@@ -171,6 +150,57 @@ def get_user(request):
 #             'message': 'Model generation started successfully',
 #         })
 
+@api.post("/quote/batch")
+def quote_batch_prices(request, payload: QuoteBatchSchema):
+    try:
+        if payload.grid:
+            grid = payload.grid
+            combinations = len(grid.widths) * len(grid.heights) * len(grid.thicknesses) * len(grid.materials)
+        else:
+            combinations = len(payload.items)
+
+        if combinations == 0:
+            return {"success": False, "error": "No combinations to quote"}
+        if combinations > MAX_BATCH_SIZE:
+            return {"success": False, "error": f"Too many combinations (max {MAX_BATCH_SIZE})"}
+
+        if payload.grid:
+            rows, quotes = quote_grid(
+                grid.widths, grid.heights, grid.thicknesses, grid.materials,
+                payload.design_description,
+            )
+            widths, heights, thicknesses, materials = (
+                rows['width'].tolist(), rows['height'].tolist(),
+                rows['thickness'].tolist(), rows['material'].tolist(),
+            )
+        else:
+            widths = [item.width for item in payload.items]
+            heights = [item.height for item in payload.items]
+            thicknesses = [item.thickness for item in payload.items]
+            materials = [item.material for item in payload.items]
+            quotes = quote_batch(widths, heights, thicknesses, materials, payload.design_description)
+
+        prices = quotes['estimated_price'].round(2).tolist()
+        production_days = quotes['production_days'].tolist()
+        return {
+            "success": True,
+            "complexity_score": float(quotes['complexity_score'][0]),
+            "quotes": [
+                {
+                    "width": widths[i],
+                    "height": heights[i],
+                    "thickness": thicknesses[i],
+                    "material": materials[i],
+                    "estimated_price": prices[i],
+                    "production_days": production_days[i],
+                    "production_time": format_production_time(production_days[i]),
+                }
+                for i in range(combinations)
+            ],
+        }
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
 @api.get("/get_task_status")
 def get_task_status(request, task_id: str):
     response_data = poll_task_status(task_id)
@@ -198,21 +228,68 @@ def get_task_status(request, task_id: str):
         'data': response_data
     }
 
+@api.get("/generation_status/{generation_id}")
+def generation_status(request, generation_id: str):
+    try:
+        # Read-only: queued generations are submitted by the process_generation_queue worker.
+        response_data = get_generation_status(generation_id)
+        if not response_data:
+            return {
+                'success': False,
+                'message': 'Generation not found'
+            }
+        return {
+            'success': True,
+            **response_data
+        }
+    except Exception as e:
+        return {
+            'success': False,
+            'error': str(e),
+            'message': 'Failed to retrieve generation status'
+        }
+
 @api.post("/create_design")
 def create_customer_design(request, payload: CreateCustomerDesignSchema):
-    customer_design = CustomerDesign.objects.create(
-        user = CustomUser.objects.get(id=payload.user_id),
-        design_description=payload.design_description,
-        width=payload.width,
-        height=payload.height,
-        thickness=payload.thickness,
-        decoration_type=payload.decoration_type,
-        material=payload.material,
-        model_url=payload.model_url,
-        model_image=payload.model_image,
-        estimated_price=payload.estimated_price,
-        status='pending',
-    )
+    model_url, model_image, status = payload.model_url, payload.model_image, 'pending'
+    for url in (model_url, model_image):
+        if url and not is_mirrored_url(url) and not is_mirrorable_url(url):
+            return {"success": False, "message": "Model URLs must point to the generation service's file host"}
+    generation = None
+    if payload.generation_id:
+        generation = GenerationTask.objects.filter(prompt_hash=payload.generation_id).first()
+        if generation is None:
+            return {"success": False, "message": "Generation not found"}
+        if generation.status == 'success':
+            model_url, model_image = generation.model_url, generation.thumbnail_url
+        elif generation.status == 'failed' and not model_url:
+            return {"success": False, "message": "Generation failed"}
+        elif not model_url:
+            # Saved while Tripo is still working on (or has not yet accepted) the model.
+            status = 'generating'
+    elif not model_url:
+        return {"success": False, "message": "Either model_url or generation_id is required"}
+
+    with transaction.atomic():
+        customer_design = CustomerDesign.objects.create(
+            user = CustomUser.objects.get(id=payload.user_id),
+            design_description=payload.design_description,
+            width=payload.width,
+            height=payload.height,
+            thickness=payload.thickness,
+            decoration_type=payload.decoration_type,
+            material=payload.material,
+            model_url=model_url,
+            model_image=model_image,
+            generation=generation,
+            estimated_price=payload.estimated_price,
+            status=status,
+        )
+        if status == 'generating':
+            # The generation may have finished since it was read above.
+            settle_new_design(customer_design)
+    if model_url:
+        schedule_mirror(customer_design.id)
     return {
         "success": True,
         "message": "Customer design created successfully",
@@ -221,7 +298,7 @@ def create_customer_design(request, payload: CreateCustomerDesignSchema):
 @api.get("/get_customer_designs", response=list[FetchCustomerDesignsSchema])
 def get_customer_designs(request, user: int):
     try:
-        customer_designs = CustomerDesign.objects.filter(user=user)
+        customer_designs = CustomerDesign.objects.filter(user=user).select_related('user')
         return customer_designs
     except Exception as e:
         return {
@@ -233,7 +310,7 @@ def get_customer_designs(request, user: int):
 @api.get("/get_all_customer_designs", response=list[FetchCustomerDesignsSchema])
 def get_all_customer_designs(request):
     try:
-        customer_designs = CustomerDesign.objects.all()
+        customer_designs = CustomerDesign.objects.select_related('user')
         return customer_designs
     except Exception as e:
         return {
@@ -242,6 +319,44 @@ def get_all_customer_designs(request):
             "message": "Failed to retrieve customer designs",
         }
 
+DESIGN_STATUSES = [status for status, _ in CustomerDesign._meta.get_field('status').choices]
+
+@api.get("/design_review_queue", response=DesignReviewQueueSchema)
+def design_review_queue(request, status: str = None, cursor: str = None, limit: int = 25):
+    try:
+        if status and status not in DESIGN_STATUSES:
+            return {"success": False, "error": f"Unknown status '{status}'"}
+
+        # One aggregate query for every facet count.
+        counts = CustomerDesign.objects.aggregate(
+            all=Count('id'),
+            **{value: Count('id', filter=Q(status=value)) for value in DESIGN_STATUSES},
+        )
+
+        designs = (
+            CustomerDesign.objects.select_related('user')
+            .defer('model_url', 'model_image', 'model_source_url', 'model_image_source_url')
+            .order_by('-id')
+        )
+        if status:
+            designs = designs.filter(status=status)
+        if cursor:
+            (last_id,) = decode_cursor(cursor)
+            designs = designs.filter(id__lt=last_id)
+
+        size = page_size(limit)
+        items = list(designs[:size + 1])
+        next_cursor = encode_cursor([items[size - 1].id]) if len(items) > size else None
+
+        return {
+            "success": True,
+            "items": items[:size],
+            "next_cursor": next_cursor,
+            "counts": counts,
+        }
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
 @api.put("/approve_design/{design_id}")
 def approve_design(request, design_id: int, payload: ApproveDesignSchema):
     try:
@@ -297,8 +412,7 @@ def get_categories(request):
 
 @api.get("/get_products", response=list[ProductSchema])
 def get_products(request):
-    products = Product.objects.all()
-    return products
+    return catalog_response(request)
 
 @api.post("/categories", response=CategorySchema)
 def create_category(request, payload: CategorySchema):
@@ -309,7 +423,7 @@ def create_category(request, payload: CategorySchema):
 def create_product(request):
     try:
         payload = request.POST
-        print("Payload:", payload)  # Debugging    
+        logger.debug("Create product payload", extra={'fields': sorted(payload.keys())})
         category_id = payload.get("category_id")
         if not category_id:
             return {"error": "Category ID is required"}
@@ -320,7 +434,6 @@ def create_product(request):
             return {"error": "Category not found"}
 
         image = request.FILES.get("image")
-        print("Image:", image)  
         if not image:
             image = None
 
@@ -334,10 +447,10 @@ def create_product(request):
             default_material=payload.get("default_material"),
             category=category,
         )
-        print("Product created:", product) 
+        logger.info(f"Product created: {product.id}", extra={'product_id': product.id})
         return {"success": True, "product": product.id}
     except Exception as e:
-        print("Error:", str(e))  # Debugging
+        logger.exception("Failed to create product")
         return {"error": str(e)}
 
 @api.post("/edit_product/{product_id}")
@@ -367,11 +480,10 @@ def edit_product(request, product_id: int):
         
         if image:
             product.image = image
-            print("Image:", image)  
-            
+            logger.debug("Replacing product image", extra={'product_id': product.id, 'image': image.name})
         
         product.save()
-        print("Product edited:", product) 
+        logger.info(f"Product edited: {product.id}", extra={'product_id': product.id})
        
         
         return {"success": True, "product": product.id}
@@ -380,6 +492,29 @@ def edit_product(request, product_id: int):
     except Exception as e:
         return {"error": str(e)}
 
+@api.post("/products/import")
+def import_product_catalog(request):
+    upload = request.FILES.get("file")
+    if not upload:
+        return {"error": "An import file is required"}
+    file_format = request.POST.get("format") or detect_format(upload.name)
+    dry_run = request.POST.get("dry_run") == "true"
+    try:
+        return import_products(upload, file_format, images=request.FILES.get("images"), dry_run=dry_run)
+    except (ValueError, UnicodeDecodeError) as e:
+        return {"error": f"Could not read import file: {e}"}
+    except zipfile.BadZipFile:
+        return {"error": "Images must be a zip archive"}
+
+@api.get("/products/export")
+def export_product_catalog(request, format: str = 'csv'):
+    if format not in ('csv', 'ndjson'):
+        return {"error": "Format must be csv or ndjson"}
+    content_type = 'text/csv' if format == 'csv' else 'application/x-ndjson'
+    response = StreamingHttpResponse(iter_export(format), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="products.{format}"'
+    return response
+
 @api.delete("/delete_product/{product_id}")
 def delete_product(request, product_id: int):
     try:
@@ -530,6 +665,38 @@ def get_cart(request, user: int):
     except Exception as e:
         return {"error": str(e)}
     
+@api.get("/guest_cart", response=CartItemSchema)
+def get_guest_cart(request):
+    # Guest carts never touch the database: the cookie holds the lines, the catalog snapshot the prices.
+    return price_guest_cart(load_guest_cart(request))
+
+@api.post("/guest_cart/items")
+def add_to_guest_cart(request, payload: GuestCartItemSchema, response: HttpResponse):
+    items = load_guest_cart(request)
+    try:
+        set_item_quantity(items, payload.product_id, items.get(payload.product_id, 0) + payload.quantity)
+    except GuestCartError as e:
+        return {"error": str(e)}
+    save_guest_cart(response, items)
+    return price_guest_cart(items)
+
+@api.put("/guest_cart/items/{product_id}")
+def update_guest_cart_item(request, product_id: int, payload: UpdateCartItemSchema, response: HttpResponse):
+    items = load_guest_cart(request)
+    try:
+        set_item_quantity(items, product_id, payload.quantity)
+    except GuestCartError as e:
+        return {"error": str(e)}
+    save_guest_cart(response, items)
+    return price_guest_cart(items)
+
+@api.delete("/guest_cart/items/{product_id}")
+def delete_guest_cart_item(request, product_id: int, response: HttpResponse):
+    items = load_guest_cart(request)
+    items.pop(product_id, None)
+    save_guest_cart(response, items)
+    return price_guest_cart(items)
+
 @api.put("/update_cart_item/{cart_item_id}")
 def update_cart_item(request, cart_item_id: int, payload: UpdateCartItemSchema):
     try:
@@ -565,8 +732,9 @@ def get_exchange_rate(currency: str) -> float:
         "access_key": FIXER_API_KEY,
         "symbols": "PHP," + currency.upper(),
     }
-    resp = requests.get(FIXER_API_URL, params=params)
-    data = resp.json()
+    with span('fixer.latest', currency=currency.upper()):
+        resp = http_client.get(FIXER_API_URL, params=params)
+        data = resp.json()
     if not data.get("success"):
         raise Exception("Failed to fetch exchange rates")
 
@@ -578,12 +746,55 @@ def get_exchange_rate(currency: str) -> float:
 
     return float(conversion_rate)
 
+def default_shipping_address(user):
+    return CustomerAddress.objects.filter(user=user).order_by('-is_default', '-updated_at').first()
+
+@api.post("/shipping/quote")
+def get_shipping_quote(request, payload: ShippingQuoteSchema):
+    """
+    Quotes shipping for the given items, or for the user's cart when no items are sent.
+    Region/province default to the user's default address.
+    """
+    try:
+        user = CustomUser.objects.get(id=payload.user_id) if payload.user_id else None
+        if payload.items:
+            products = Product.objects.in_bulk({item.product_id for item in payload.items})
+            missing = [item.product_id for item in payload.items if item.product_id not in products]
+            if missing:
+                return JSONResponse({"error": f"Products not found: {missing}"}, status=404)
+            weight = sum(product_weight_kg(products[item.product_id]) * item.quantity for item in payload.items)
+        elif user is not None:
+            weight = cart_weight_kg(
+                CartItem.objects.filter(cart__user=user).select_related('product', 'customer_design')
+            )
+        else:
+            return JSONResponse({"error": "Provide items or a user_id with a cart"}, status=400)
+
+        region, province = payload.region, payload.province
+        if not (region or province) and user is not None:
+            address = default_shipping_address(user)
+            if address is not None:
+                region, province = address.region, address.province
+
+        currency = payload.currency.lower()
+        exchange_rate = 1 if currency == "php" else get_exchange_rate(currency)
+        quote = quote_shipping(weight, region, province)
+        for option in quote['options']:
+            option['amount'] = round(float(option['amount']) * exchange_rate, 2)
+        quote['currency'] = currency
+        return quote
+    except CustomUser.DoesNotExist:
+        return JSONResponse({"error": "User not found"}, status=404)
+    except Exception as e:
+        return {"error": str(e)}
+
 @api.post("/create-checkout-session")
 def create_checkout_session(request, payload: CheckoutSessionSchema):
+    stripe = http_client.get_stripe()
     try:
         user = CustomUser.objects.get(id=payload.user_id)
         cart = Cart.objects.get(user=user)
-        cart_items = CartItem.objects.filter(cart=cart)
+        cart_items = list(CartItem.objects.filter(cart=cart).select_related('product', 'customer_design'))
 
         currency = payload.currency.lower()
         if currency == "PHP" or currency == "php":
@@ -597,14 +808,15 @@ def create_checkout_session(request, payload: CheckoutSessionSchema):
         line_items = []
         for item in cart_items:
             if item.product:
-                image_url = f"https://woodcraft-backend.onrender.com{item.product.image.url}"
+                images = [f"{settings.PUBLIC_BASE_URL}{item.product.image.url}"] if item.product.image else []
                 unit_amount = int(item.product.price * Decimal(str(exchange_rate)) * 100)
                 line_items.append({
                     'price_data': {
                         'currency': currency,
                         'product_data': {
                             'name': item.product.name,
-                            'images': [image_url],
+                            'images': images,
+                            'metadata': {'product_id': item.product.id},
                         },
                         'unit_amount': unit_amount,
                     },
@@ -619,6 +831,7 @@ def create_checkout_session(request, payload: CheckoutSessionSchema):
                         'product_data': {
                             'name': f'Custom Design - {item.customer_design.design_description}',
                             'images': [item.customer_design.model_image] if item.customer_design.model_image else [],
+                            'metadata': {'design_id': item.customer_design.id},
                         },
                         'unit_amount': unit_amount,
                     },
@@ -628,48 +841,29 @@ def create_checkout_session(request, payload: CheckoutSessionSchema):
         if not line_items:
             return CheckoutSessionResponseSchema(error="No valid items in cart")
 
-        session = stripe.checkout.Session.create(
-            customer_email=user.email,
-            payment_method_types=['card'],
-            billing_address_collection='required',
-            shipping_address_collection={'allowed_countries': ['PH', 'US', 'CA']},
-            line_items=line_items,
-            mode='payment',
-            currency=currency,
-            success_url=payload.success_url,
-            cancel_url=payload.cancel_url,
-            metadata={'user_id': user.id, 'currency': currency},
-            shipping_options=[
-                {
-                    "shipping_rate_data": {
-                        "display_name": "Standard Shipping",
-                        "type": "fixed_amount",
-                        "fixed_amount": {
-                            "amount": 15000,
-                            "currency": currency,
-                        },
-                        "delivery_estimate": {
-                            "minimum": {"unit": "business_day", "value": 3},
-                            "maximum": {"unit": "business_day", "value": 7},
-                        },
-                    }
-                },
-                {
-                    "shipping_rate_data": {
-                        "display_name": "Express Shipping",
-                        "type": "fixed_amount",
-                        "fixed_amount": {
-                            "amount": 25000,
-                            "currency": currency,
-                        },
-                        "delivery_estimate": {
-                            "minimum": {"unit": "business_day", "value": 1},
-                            "maximum": {"unit": "business_day", "value": 2},
-                        },
-                    }
-                }
-            ]
-            )
+        address = default_shipping_address(user)
+        quote = quote_shipping(
+            cart_weight_kg(cart_items),
+            address.region if address else None,
+            address.province if address else None,
+        )
+        shipping_options = stripe_shipping_options(quote, currency, exchange_rate)
+
+        with span('stripe.checkout.Session.create', line_items=len(line_items), currency=currency):
+            session = stripe.checkout.Session.create(
+                customer_email=user.email,
+                payment_method_types=['card'],
+                billing_address_collection='required',
+                # Shipping is only quoted for Philippine zones.
+                shipping_address_collection={'allowed_countries': ['PH']},
+                line_items=line_items,
+                mode='payment',
+                currency=currency,
+                success_url=payload.success_url,
+                cancel_url=payload.cancel_url,
+                metadata={'user_id': user.id, 'currency': currency},
+                shipping_options=shipping_options,
+                )
 
         return CheckoutSessionResponseSchema(session_id=session.id, url=session.url)
 
@@ -684,14 +878,16 @@ def create_checkout_session(request, payload: CheckoutSessionSchema):
 
 @api.get("/stripe/session/{session_id}")
 def get_stripe_session(request, session_id: str):
+    stripe = http_client.get_stripe()
     try:
         # Retrieve the session with line items
-        session = stripe.checkout.Session.retrieve(
-            session_id,
-            expand=['line_items', 'customer_details']
-        )
+        with span('stripe.checkout.Session.retrieve'):
+            session = stripe.checkout.Session.retrieve(
+                session_id,
+                expand=['line_items', 'customer_details']
+            )
         
-        return session
+        return session.to_dict()
     except stripe.error.StripeError as e:
         return {"error": str(e)}
     except Exception as e:
@@ -701,16 +897,18 @@ def get_stripe_session(request, session_id: str):
 def get_customer_orders(request, user_id: int):
     try:
         user = CustomUser.objects.get(id=user_id)
-        orders = Order.objects.filter(user=user).order_by('-created_at')
+        orders = Order.objects.filter(user=user).order_by('-created_at').prefetch_related('items')
         
         order_list = []
         for order in orders:
-            order_items = OrderItem.objects.filter(order=order)
             items_list = []
-            for item in order_items:
+            for item in order.items.all():
                 items_list.append({
-                    "product_name": item.product.name if item.product else None,
-                    "customer_design": item.customer_design.design_description if item.customer_design else None,
+                    # Snapshots store '' for missing values; history reports them as null like before.
+                    "product_name": None if item.is_custom_design else item.item_name or None,
+                    "customer_design": item.item_name or None if item.is_custom_design else None,
+                    "image": item.item_image or None,
+                    "material": item.item_material or None,
                     "quantity": item.quantity,
                     "price": float(item.price),
                 })
@@ -734,16 +932,16 @@ def get_customer_orders(request, user_id: int):
 @api.get("/get_all_orders")
 def get_all_orders(request):
     try:
-        orders = Order.objects.all().order_by('-created_at')
+        orders = Order.objects.select_related('user').prefetch_related('items').order_by('-created_at')
         order_list = []
         for order in orders: 
-            order_items = OrderItem.objects.filter(order=order)
-            
             items_list = []
-            for item in order_items:
+            for item in order.items.all():
                 items_list.append({
-                    "product_name": item.product.name if item.product else None,
-                    "customer_design": item.customer_design.design_description if item.customer_design else None,
+                    "product_name": None if item.is_custom_design else item.item_name or None,
+                    "customer_design": item.item_name or None if item.is_custom_design else None,
+                    "image": item.item_image or None,
+                    "material": item.item_material or None,
                     "quantity": item.quantity,
                     "price": item.price,
                 })
@@ -766,15 +964,137 @@ def get_all_orders(request):
 
 @api.put("/update_order_status/{order_id}")
 def update_order_status(request, order_id: int, payload: UpdateOrderStatusSchema):
+    changed_by = request.user if request.user.is_authenticated else None
     try:
-        order = Order.objects.get(id=order_id)
-        order.status = payload.status
-        order.save()
-        return {"message": "Order status updated successfully"}
-    except Order.DoesNotExist:
+        # Unlike /orders/bulk_status, a single order may be moved to any status, e.g. to undo a mistake.
+        [result] = transition_orders([order_id], payload.status, changed_by=changed_by, enforce_transitions=False)
+    except ValueError as e:
+        return {"error": str(e)}
+    if result['result'] == 'not_found':
         return {"error": "Order not found"}
-    except Exception as e:
+    return {"message": "Order status updated successfully"}
+
+@api.post("/orders/bulk_status")
+def bulk_update_order_status(request, payload: BulkOrderStatusSchema):
+    if not payload.order_ids:
+        return {"error": "No order ids provided"}
+    if len(payload.order_ids) > MAX_BULK_ORDERS:
+        return {"error": f"At most {MAX_BULK_ORDERS} orders can be updated at once"}
+    changed_by = request.user if request.user.is_authenticated else None
+    try:
+        results = transition_orders(payload.order_ids, payload.status, changed_by=changed_by)
+    except ValueError as e:
         return {"error": str(e)}
+    return {
+        "status": payload.status,
+        "updated": sum(1 for result in results if result['result'] == 'updated'),
+        "results": results,
+    }
+
+def _rollup_range(start, end):
+    end = end or timezone.localdate()
+    start = start or end - timedelta(days=29)
+    return start, end
+
+def _rollup_totals(row):
+    return {
+        "orders": row["total_orders"],
+        "units": row["total_units"],
+        "revenue": float(row["total_revenue"] or 0),
+    }
+
+ROLLUP_TOTALS = {
+    "total_orders": Sum('orders'),
+    "total_units": Sum('units'),
+    "total_revenue": Sum('revenue'),
+}
+
+SALES_GROUPINGS = ['day', 'currency', 'payment_method']
+
+@api.get("/analytics/sales")
+def sales_analytics(request, start: date = None, end: date = None, currency: str = None, group_by: str = 'day'):
+    try:
+        if group_by not in SALES_GROUPINGS:
+            return {"success": False, "error": f"Unknown grouping '{group_by}'"}
+        start, end = _rollup_range(start, end)
+        rollups = DailySalesRollup.objects.filter(day__gte=start, day__lte=end)
+        if currency:
+            rollups = rollups.filter(currency=currency.upper())
+
+        # Revenue is only summed within a currency.
+        fields = [group_by] if group_by == 'currency' else [group_by, 'currency']
+        rows = rollups.values(*fields).annotate(**ROLLUP_TOTALS).order_by(*fields)
+        return {
+            "success": True,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "rows": [
+                {
+                    **{field: row[field].isoformat() if field == 'day' else row[field] for field in fields},
+                    **_rollup_totals(row),
+                }
+                for row in rows
+            ],
+        }
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+@api.get("/analytics/products")
+def product_sales_analytics(request, start: date = None, end: date = None, currency: str = None, limit: int = 10):
+    try:
+        start, end = _rollup_range(start, end)
+        rollups = DailyProductSalesRollup.objects.filter(day__gte=start, day__lte=end)
+        if currency:
+            rollups = rollups.filter(currency=currency.upper())
+
+        rows = rollups.values(
+            'product_id', 'product_name', 'is_custom_design', 'currency'
+        ).annotate(**ROLLUP_TOTALS).order_by('-total_revenue')[:page_size(limit)]
+        return {
+            "success": True,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "rows": [
+                {
+                    "product_id": row["product_id"],
+                    "product_name": row["product_name"] or ("Custom designs" if row["is_custom_design"] else None),
+                    "is_custom_design": row["is_custom_design"],
+                    "currency": row["currency"],
+                    **_rollup_totals(row),
+                }
+                for row in rows
+            ],
+        }
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+@api.get("/analytics/categories")
+def category_sales_analytics(request, start: date = None, end: date = None, currency: str = None):
+    try:
+        start, end = _rollup_range(start, end)
+        rollups = DailyProductSalesRollup.objects.filter(day__gte=start, day__lte=end)
+        if currency:
+            rollups = rollups.filter(currency=currency.upper())
+
+        rows = rollups.values(
+            'category_id', 'category_name', 'currency'
+        ).annotate(**ROLLUP_TOTALS).order_by('-total_revenue')
+        return {
+            "success": True,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "rows": [
+                {
+                    "category_id": row["category_id"],
+                    "category_name": row["category_name"] or None,
+                    "currency": row["currency"],
+                    **_rollup_totals(row),
+                }
+                for row in rows
+            ],
+        }
+    except Exception as e:
+        return {"success": False, "error": str(e)}
 
 @api.get("/get_customers")
 def get_customers(request):
@@ -792,13 +1112,74 @@ def get_customers(request):
     except Exception as e:
         return {"error": str(e)}
 
+CUSTOMER_DIRECTORY_SORTS = {
+    'recent': 'date_joined',
+    'spend': 'lifetime_spend',
+}
+
+@api.get("/customers", response=CustomerDirectorySchema)
+def customer_directory(request, search: str = None, sort: str = 'recent', cursor: str = None, limit: int = 25):
+    try:
+        if sort not in CUSTOMER_DIRECTORY_SORTS:
+            return {"success": False, "error": f"Unknown sort '{sort}'"}
+        sort_field = CUSTOMER_DIRECTORY_SORTS[sort]
+
+        # Order stats for the whole page come from one grouped query.
+        customers = CustomUser.objects.filter(is_superuser=False).annotate(
+            order_count=Count('order'),
+            lifetime_spend=Coalesce(
+                Sum('order__total_price', filter=~Q(order__status='cancelled')),
+                Value(Decimal('0')),
+                output_field=DecimalField(max_digits=12, decimal_places=2),
+            ),
+            last_order_at=Max('order__created_at'),
+        )
+        if search:
+            customers = customers.filter(
+                Q(email__icontains=search) | Q(first_name__icontains=search) | Q(last_name__icontains=search)
+            )
+        if cursor:
+            last_value, last_id = decode_cursor(cursor)
+            last_value = Decimal(last_value) if sort == 'spend' else parse_datetime(last_value)
+            if last_value is None:
+                raise ValueError("Invalid cursor")
+            customers = customers.filter(
+                Q(**{f'{sort_field}__lt': last_value}) | Q(**{sort_field: last_value, 'id__lt': last_id})
+            )
+
+        size = page_size(limit)
+        rows = list(customers.order_by(f'-{sort_field}', '-id')[:size + 1])
+        next_cursor = None
+        if len(rows) > size:
+            last = rows[size - 1]
+            last_value = getattr(last, sort_field)
+            next_cursor = encode_cursor([str(last_value) if sort == 'spend' else last_value.isoformat(), last.id])
+
+        return {
+            "success": True,
+            "customers": [
+                {
+                    "id": customer.id,
+                    "email": customer.email,
+                    "name": customer.first_name + " " + customer.last_name,
+                    "date_joined": customer.date_joined.strftime('%Y-%m-%d'),
+                    "order_count": customer.order_count,
+                    "lifetime_spend": float(customer.lifetime_spend),
+                    "last_order_at": customer.last_order_at.isoformat() if customer.last_order_at else None,
+                }
+                for customer in rows[:size]
+            ],
+            "next_cursor": next_cursor,
+        }
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
 @api.post("/update_customer_info/{customer_id}")
 def update_customer_info(request, customer_id: int):
     try:
         customer = CustomUser.objects.get(id=customer_id)
-        print("Updating customer:", customer.email)
         payload = request.POST
-        print("Payload:", payload)
+        logger.debug("Update customer payload", extra={'customer_id': customer.id, 'fields': sorted(payload.keys())})
         customer.first_name = payload.get('first_name', customer.first_name)
         customer.last_name = payload.get('last_name', customer.last_name)
         customer.email = payload.get('email', customer.email)
@@ -816,7 +1197,7 @@ def update_customer_info(request, customer_id: int):
             customer.profile_picture = profile_picture
 
         customer.save()
-        print("Customer updated:", customer.email)
+        logger.info(f"Customer updated: {customer.id}", extra={'customer_id': customer.id})
         return {
             "success": True,
             "message": "Customer information updated successfully",
@@ -827,19 +1208,50 @@ def update_customer_info(request, customer_id: int):
     except Exception as e:
         return {"error": str(e)}
     
+@api.get("/address/autocomplete")
+def address_autocomplete(request, q: str, level: str = None, region: str = None, province: str = None, limit: int = 10):
+    if level and level not in ADDRESS_LEVELS:
+        return {"error": f"Level must be one of: {', '.join(ADDRESS_LEVELS)}"}
+    limit = max(1, min(limit, MAX_AUTOCOMPLETE_LIMIT))
+    return {"results": get_gazetteer().autocomplete(q, level=level, region=region, province=province, limit=limit)}
+
+@api.get("/address/regions")
+def address_regions(request):
+    return {"regions": [{"name": region['name'], "code": region['code']} for region in get_gazetteer().regions]}
+
+@api.get("/address/provinces")
+def address_provinces(request, region: str):
+    provinces = get_gazetteer().provinces(region)
+    if provinces is None:
+        return {"error": f"Unknown region '{region}'"}
+    return {"provinces": provinces}
+
+@api.get("/address/cities")
+def address_cities(request, province: str):
+    cities = get_gazetteer().cities(province)
+    if cities is None:
+        return {"error": f"Unknown province '{province}'"}
+    return {"cities": cities}
+
 @api.post("/create_customer_address")
 def create_customer_address(request, payload: CreateCustomerAddressSchema):
+    try:
+        location = get_gazetteer().normalize_address(
+            payload.region, payload.province, payload.city, payload.postal_code
+        )
+    except AddressValidationError as e:
+        return {"error": str(e)}
     try:
         user = CustomUser.objects.get(id=payload.user)
         address = CustomerAddress.objects.create(
             user=user,
             customer_name=payload.customer_name,
             customer_phone_number=payload.customer_phone_number,
-            region=payload.region,
-            province=payload.province,
-            city=payload.city,
-            barangay=payload.barangay,
-            postal_code=payload.postal_code,
+            region=location['region'],
+            province=location['province'],
+            city=location['city'],
+            barangay=payload.barangay.strip(),
+            postal_code=location['postal_code'],
             street=payload.street,
             customer_address=payload.customer_address,
             is_default=payload.is_default,
@@ -921,15 +1333,21 @@ def set_default_address(request, address_id: int):
 @api.put("/update_customer_address/{address_id}")
 def update_customer_address(request, address_id: int, payload: BaseAddressSchema):
     try:
-        print(payload)
+        logger.debug("Update address payload", extra={'address_id': address_id})
+        try:
+            location = get_gazetteer().normalize_address(
+                payload.region, payload.province, payload.city, payload.postal_code
+            )
+        except AddressValidationError as e:
+            return {"error": str(e)}
         address = CustomerAddress.objects.get(id=address_id)
         address.customer_name = payload.customer_name
         address.customer_phone_number = payload.customer_phone_number
-        address.region = payload.region
-        address.province = payload.province
-        address.city = payload.city
-        address.barangay = payload.barangay
-        address.postal_code = payload.postal_code
+        address.region = location['region']
+        address.province = location['province']
+        address.city = location['city']
+        address.barangay = payload.barangay.strip()
+        address.postal_code = location['postal_code']
         address.street = payload.street
         address.customer_address = payload.customer_address
         address.latitude = payload.latitude
@@ -14,8 +14,8 @@ from pathlib import Path
 import os
 from dotenv import load_dotenv
 from urllib.parse import urlparse
-import stripe
 
+# The only place .env is read; everything else sees it through os.environ or settings.
 load_dotenv()
 tmpPostgres = urlparse(os.getenv("DATABASE_URL"))
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -34,6 +34,12 @@ ALLOWED_HOSTS = ['woodcraft-backend.onrender.com', 'localhost']
 
 AUTH_USER_MODEL = 'api.CustomUser'
 
+# CachedModelBackend subclasses ModelBackend, so it is the only backend; listing both would hash a
+# wrong password twice. Sessions saved under ModelBackend were moved over by migration 0039.
+AUTHENTICATION_BACKENDS = [
+    'api.backends.CachedModelBackend',
+]
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -49,6 +55,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.RequestLogMiddleware',
+    'django.middleware.http.ConditionalGetMiddleware',
+    'api.middleware.CompressionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -72,6 +81,10 @@ CSRF_COOKIE_SAMESITE = 'None'
 CSRF_COOKIE_DOMAIN = None 
 CSRF_COOKIE_HTTPONLY = False
 
+# Sessions are read from the cache and only fall back to the database on a miss. Set
+# SESSION_ENGINE=django.contrib.sessions.backends.signed_cookies to skip storage entirely
+# (sessions then cannot be revoked server-side before they expire).
+SESSION_ENGINE = os.getenv("SESSION_ENGINE", "django.contrib.sessions.backends.cached_db")
 SESSION_COOKIE_SECURE = True
 SESSION_COOKIE_SAMESITE = 'None'
 SESSION_COOKIE_HTTPONLY = True
@@ -124,6 +137,28 @@ DATABASES = {
 
 
 
+# Cache
+# A file-based cache is shared by every worker on a host, so invalidations are seen by all
+# of them; set REDIS_URL to share it across hosts instead.
+
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv("REDIS_URL"),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            # Sessions are stored here, so this must be a private directory, never /tmp
+            # (checked at startup, see api.checks).
+            'LOCATION': os.getenv("CACHE_DIR", os.path.join(BASE_DIR, '.cache')),
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -161,6 +196,8 @@ USE_TZ = True
 STATIC_URL = 'static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media/')
+# Absolute origin used when handing out links to files served by this backend.
+PUBLIC_BASE_URL = os.getenv("PUBLIC_BASE_URL", "https://woodcraft-backend.onrender.com")
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -168,8 +205,92 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 API_KEY = os.getenv("API_KEY")
 
+# Tripo generation limits, shared by all workers through the database.
+TRIPO_RATE_LIMIT_PER_MINUTE = float(os.getenv("TRIPO_RATE_LIMIT_PER_MINUTE", 10))
+TRIPO_RATE_LIMIT_BURST = int(os.getenv("TRIPO_RATE_LIMIT_BURST", 3))
+TRIPO_MAX_IN_FLIGHT = int(os.getenv("TRIPO_MAX_IN_FLIGHT", 5))
+TRIPO_UNAVAILABLE_COOLDOWN = int(os.getenv("TRIPO_UNAVAILABLE_COOLDOWN", 30))
+TRIPO_AVERAGE_GENERATION_SECONDS = int(os.getenv("TRIPO_AVERAGE_GENERATION_SECONDS", 60))
+# Set once manage.py process_generation_queue runs alongside the web process. Queued generations, and the
+# designs saved against them, only move while it runs; the api.W001 check warns until this is set.
+GENERATION_QUEUE_WORKER = os.getenv("GENERATION_QUEUE_WORKER", "false").lower() == "true"
+# Read timeout for submitting a generation from the configurator; slower submissions are queued instead.
+TRIPO_SUBMIT_TIMEOUT = float(os.getenv("TRIPO_SUBMIT_TIMEOUT", 5))
+
 STRIPE_PUBLIC_KEY = os.getenv("STRIPE_PUBLIC_KEY")
 STRIPE_SECRET_KEY = os.getenv("STRIPE_SECRET_KEY")
 STRIPE_WEBHOOK_SECRET = os.getenv("STRIPE_WEBHOOK_SECRET")
 
-stripe.api_key = STRIPE_SECRET_KEY
\ No newline at end of file
+# Point Stripe, Tripo and Fixer at the local fakes (manage.py run_fake_services), e.g. http://127.0.0.1:8765.
+FAKE_SERVICES_URL = os.getenv("FAKE_SERVICES_URL", "").rstrip("/")
+STRIPE_API_BASE = f"{FAKE_SERVICES_URL}/stripe" if FAKE_SERVICES_URL else "https://api.stripe.com"
+TRIPO_API_BASE = f"{FAKE_SERVICES_URL}/tripo/v2/openapi" if FAKE_SERVICES_URL else "https://api.tripo3d.ai/v2/openapi"
+FIXER_API_BASE = f"{FAKE_SERVICES_URL}/fixer/api" if FAKE_SERVICES_URL else "http://data.fixer.io/api"
+# Hosts design models and thumbnails may be mirrored from over https; a leading dot also matches subdomains.
+# The fake services host is allowed as well when FAKE_SERVICES_URL is set.
+MIRROR_ALLOWED_HOSTS = [
+    host.strip().lower()
+    for host in os.getenv("MIRROR_ALLOWED_HOSTS", "tripo-data.cdn.bcebos.com,.tripo3d.com").split(",")
+    if host.strip()
+]
+
+# Logs are written as JSON lines by a background thread; request threads only enqueue records.
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+# Fraction of requests whose DEBUG records are kept when LOG_LEVEL is DEBUG.
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", 0.1))
+
+# Reject customer addresses whose city is not in the bundled gazetteer (which lists cities, not municipalities).
+ADDRESS_STRICT_VALIDATION = os.getenv("ADDRESS_STRICT_VALIDATION", "false").lower() == "true"
+
+# Anonymous carts live only in a signed cookie (api.guest_cart) and are merged into the account cart on login.
+GUEST_CART_MAX_AGE = int(os.getenv("GUEST_CART_MAX_AGE", 30 * 24 * 60 * 60))
+GUEST_CART_MAX_ITEMS = int(os.getenv("GUEST_CART_MAX_ITEMS", 50))
+
+# Outbound HTTP (api.http_client): per-host keep-alive pools, timeouts, retries and circuit breaking.
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 3.05))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", 30))
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", 10))
+# Upstream hosts with a pooled session kept open; the least recently used is closed beyond this.
+HTTP_MAX_SESSIONS = int(os.getenv("HTTP_MAX_SESSIONS", 32))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", 2))
+HTTP_BREAKER_FAILURE_THRESHOLD = int(os.getenv("HTTP_BREAKER_FAILURE_THRESHOLD", 5))
+HTTP_BREAKER_RESET_SECONDS = float(os.getenv("HTTP_BREAKER_RESET_SECONDS", 30))
+
+# Response compression: bodies below the minimum go out as-is; compressed variants of
+# GET responses are kept per process, keyed by ETag.
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", 1024))
+COMPRESSION_CACHE_ENTRIES = int(os.getenv("COMPRESSION_CACHE_ENTRIES", 128))
+COMPRESSION_CACHE_MAX_BYTES = int(os.getenv("COMPRESSION_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+# Upper bound of the random padding added to compressed responses of logged-in requests (BREACH); 0 disables it.
+COMPRESSION_MAX_RANDOM_BYTES = int(os.getenv("COMPRESSION_MAX_RANDOM_BYTES", 100))
+
+# Requests slower than this are logged with the span tree of their outbound calls.
+TRACE_SLOW_REQUEST_MS = float(os.getenv("TRACE_SLOW_REQUEST_MS", 1000))
+# Any single Stripe/Tripo/Fixer call slower than this is logged on its own.
+TRACE_SLOW_CALL_MS = float(os.getenv("TRACE_SLOW_CALL_MS", 500))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'request_context': {'()': 'api.logging_pipeline.RequestContextFilter'},
+        'debug_sampling': {'()': 'api.logging_pipeline.DebugSamplingFilter', 'rate': LOG_DEBUG_SAMPLE_RATE},
+    },
+    'handlers': {
+        'background_json': {
+            '()': 'api.logging_pipeline.BackgroundJsonHandler',
+            'filters': ['request_context', 'debug_sampling'],
+        },
+    },
+    'root': {
+        'handlers': ['background_json'],
+        'level': LOG_LEVEL,
+    },
+    'loggers': {
+        'django': {
+            'handlers': ['background_json'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
\ No newline at end of file
@@ -19,11 +19,12 @@ from django.urls import path
 from .api import api
 from django.conf import settings
 from django.conf.urls.static import static
-from api.views import stripe_webhook, product_configurator
+from api.views import stripe_webhook, product_configurator, serve_design_asset
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', api.urls),
     path("api/webhook", stripe_webhook, name="stripe-webhook"),
     path("api/initiate_task_id", product_configurator, name="product_configurator"),
+    path("api/design_assets/<path:name>", serve_design_asset, name="design-asset"),
 ]
 urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file